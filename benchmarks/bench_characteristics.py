@@ -0,0 +1,71 @@
+"""Memory/CPU benchmark for exporting characteristics of a full database.
+
+Compares the former list-of-ints representation (and hashing its str())
+with the bytes representation for every slot of a sensor.
+
+    Usage:
+        python -m benchmarks.bench_characteristics [--slots 1000]
+"""
+import argparse
+import hashlib
+import os
+import time
+import tracemalloc
+
+## A template is downloaded as 4 data packets of 128 bytes
+PACKETS_PER_TEMPLATE = 4
+PACKET_SIZE = 128
+
+
+def export_as_lists(templates):
+    database = []
+    for packets in templates:
+        completePayload = []
+        for receivedPacketPayload in packets:
+            for i in range(0, len(receivedPacketPayload)):
+                completePayload.append(receivedPacketPayload[i])
+        database.append((completePayload,
+                         hashlib.sha256(str(completePayload).encode('utf-8')).hexdigest()))
+    return database
+
+
+def export_as_bytes(templates):
+    database = []
+    for packets in templates:
+        characteristics = b''.join(packets)
+        database.append((characteristics, hashlib.sha256(characteristics).hexdigest()))
+    return database
+
+
+def measure(func, templates):
+    """
+    Returns:
+        (CPU seconds, peak traced memory in bytes)
+    """
+    tracemalloc.start()
+    start = time.process_time()
+    result = func(templates)
+    elapsed = time.process_time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--slots', type=int, default=1000)
+    args = parser.parse_args()
+
+    ## Simulated packet payloads as returned by __readPacket
+    templates = [[os.urandom(PACKET_SIZE) for _ in range(PACKETS_PER_TEMPLATE)]
+                 for _ in range(args.slots)]
+
+    print('%-8s %10s %12s' % ('format', 'cpu [ms]', 'peak [KiB]'))
+    for name, func in (('list', export_as_lists), ('bytes', export_as_bytes)):
+        elapsed, peak = measure(func, templates)
+        print('%-8s %10.1f %12.1f' % (name, elapsed * 1000, peak / 1024.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Transfer speed of the default link against the fast link.
+
+Downloads images and characteristics from the simulator (with the wire
+time of every response simulated at the sensor baud rate) once at the
+sensor defaults and once after PyFingerprint.enableFastLink().
+
+    Usage:
+        python -m benchmarks.bench_fastlink [--iterations 5] [--transport url]
+"""
+import argparse
+import time
+from functions.config import Finger
+from functions.R305 import PyFingerprint
+from functions.simulator import R305Simulator, makeCharacteristics
+
+
+def measure(func, iterations):
+    """
+    Returns:
+        The mean duration of a call in seconds
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+
+def run(fast, iterations, transport):
+    sim = R305Simulator(simulateBaudRate=True)
+    port = sim.openPty() if transport == 'pty' else sim.register('fastlink')
+    f = PyFingerprint(port)
+    f.verifyPassword()
+
+    if fast:
+        f.enableFastLink()
+
+    sim.placeFinger(makeCharacteristics(0))
+    f.readImage()
+    f.convertImage(Finger.CHARBUFFER1)
+
+    results = {
+        'link': '%d baud/%d bytes' % (sim.baudRate, sim.packetSize),
+        'downloadImageData': measure(f.downloadImageData, iterations),
+        'downloadCharacteristics': measure(f.downloadCharacteristics, iterations),
+    }
+
+    f.close()
+    sim.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--transport', choices=('pty', 'url'), default='url')
+    args = parser.parse_args()
+
+    default = run(False, args.iterations, args.transport)
+    fast = run(True, args.iterations, args.transport)
+
+    print('%-24s %20s %20s %8s' % ('transfer [ms]', default['link'], fast['link'], 'speedup'))
+    for name in ('downloadImageData', 'downloadCharacteristics'):
+        print('%-24s %20.1f %20.1f %7.2fx' % (name, default[name] * 1000, fast[name] * 1000,
+                                              default[name] / fast[name]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Identity database cost per operation at 10k and 100k users.
+
+Compares the former whole-file handling of data/database.csv (read the
+file and split it for every check, parse and rewrite it for every
+removal) with functions.identity.IdentityStore and SQLiteIdentityStore
+(load = CSV import). The former one-row pandas append is approximated
+with the csv module, so its real cost was higher.
+
+    Usage:
+        python -m benchmarks.bench_identity [--users 10000 100000] [--operations 20]
+"""
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+import time
+from functions.identity import IdentityStore, SQLiteIdentityStore
+
+
+def write_database(path, users):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['Index', 'Name'])
+        for position in range(users):
+            writer.writerow([position, 'user%d' % position])
+
+
+def legacy_lookup(path, name):
+    return name in open(path, 'r').read().split()
+
+
+def legacy_insert(path, position, name):
+    db = open(path, 'r').read()
+    if name not in db.split():
+        with open(path, 'a', newline='') as f:
+            csv.writer(f, lineterminator='\n').writerow([position, name])
+
+
+def legacy_delete(path, name):
+    lines = []
+    position = None
+    with open(path, 'r') as readfile:
+        for row in csv.reader(readfile):
+            if row[1] == name:
+                position = row[0]
+            else:
+                lines.append(row)
+    with open(path, 'w', newline='') as writefile:
+        csv.writer(writefile, lineterminator='\n').writerows(lines)
+    return position
+
+
+def per_call(func, operations):
+    start = time.perf_counter()
+    for i in range(operations):
+        func(i)
+    return (time.perf_counter() - start) / operations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--operations', type=int, default=20)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    print('%-8s %-8s %12s %12s %12s %12s' % ('users', 'store', 'load [ms]', 'lookup [ms]',
+                                             'insert [ms]', 'delete [ms]'))
+
+    try:
+        for users in args.users:
+            path = os.path.join(directory, 'database.csv')
+            ops = args.operations
+
+            write_database(path, users)
+            results = ('legacy', 0.0,
+                       per_call(lambda i: legacy_lookup(path, 'user%d' % (i * 7)), ops),
+                       per_call(lambda i: legacy_insert(path, users + i, 'new%d' % i), ops),
+                       per_call(lambda i: legacy_delete(path, 'user%d' % i), ops))
+            print('%-8d %-8s %12.3f %12.3f %12.3f %12.3f' % ((users,) + results))
+
+            write_database(path, users)
+            start = time.perf_counter()
+            store = IdentityStore(path)
+            load = (time.perf_counter() - start) * 1000
+            results = ('dict', load,
+                       per_call(lambda i: store.position('user%d' % (i * 7)), ops),
+                       per_call(lambda i: store.add(users + i, 'new%d' % i), ops),
+                       per_call(lambda i: store.remove('user%d' % i), ops))
+            print('%-8d %-8s %12.3f %12.3f %12.3f %12.3f' % ((users,) + results))
+
+            start = time.perf_counter()
+            store.compact()
+            print('%-8d %-8s compaction %.1f ms' % (users, 'dict',
+                                                   (time.perf_counter() - start) * 1000))
+            store.close()
+
+            db_path = os.path.join(directory, 'identities.db')
+            write_database(path, users)
+            start = time.perf_counter()
+            store = SQLiteIdentityStore(db_path)
+            store.import_csv(path)
+            load = (time.perf_counter() - start) * 1000
+            results = ('sqlite', load,
+                       per_call(lambda i: store.position('user%d' % (i * 7)), ops),
+                       per_call(lambda i: store.add(users + i, 'new%d' % i), ops),
+                       per_call(lambda i: store.remove('user%d' % i), ops))
+            print('%-8d %-8s %12.3f %12.3f %12.3f %12.3f' % ((users,) + results))
+
+            start = time.perf_counter()
+            with store.batch():
+                for i in range(1000):
+                    store.add(2 * users + i, 'batch%d' % i)
+            print('%-8d %-8s batch of 1000 inserts %.3f ms per row' % (
+                users, 'sqlite', (time.perf_counter() - start) / 1000 * 1000))
+            store.close()
+            os.remove(db_path)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Cost of the driver metrics and where a recognition spends its time.
+
+Runs --commands readImage/getTemplateCount pairs against a simulated
+sensor without processing time (so the host side dominates) with
+metrics never enabled, enabled and disabled again. Then recognizes
+with a simulated sensor at 57600 baud and prints the phases per
+instruction: encode and parse (Python), write, wait (sensor processing
+and wire time of the answer header) and read (rest of the answer).
+
+    Usage:
+        python -m benchmarks.bench_metrics [--commands 2000] [--prometheus]
+"""
+import argparse
+import time
+from functions.R305 import PyFingerprint
+from functions.config import Finger
+from functions.simulator import R305Simulator, makeCharacteristics
+
+
+def per_command(f, commands):
+    start = time.perf_counter()
+    for _ in range(commands // 2):
+        f.readImage()
+        f.getTemplateCount()
+    return (time.perf_counter() - start) / commands * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=2000)
+    parser.add_argument('--prometheus', action='store_true',
+                        help='print the Prometheus text of the recognition run')
+    args = parser.parse_args()
+
+    f = PyFingerprint(R305Simulator(latency=0).register('metrics-overhead'))
+    per_command(f, 200)
+    never = per_command(f, args.commands)
+    f.enableMetrics()
+    enabled = per_command(f, args.commands)
+    f.disableMetrics()
+    disabled = per_command(f, args.commands)
+    f.close()
+    print('per command: never enabled %.1f us, enabled %.1f us, disabled %.1f us' % (
+        never, enabled, disabled))
+
+    sim = R305Simulator(latency=0.01, searchLatency=0.0002, simulateBaudRate=True)
+    for position in range(200):
+        sim.enrollTemplate(position, makeCharacteristics(position))
+    sim.placeFinger(makeCharacteristics(42))
+
+    f = PyFingerprint(sim.register('metrics-recognize'))
+    metrics = f.enableMetrics()
+    for _ in range(10):
+        f.readImage()
+        f.convertImage(Finger.CHARBUFFER1)
+        position = f.searchOccupied()[0]
+        f.loadTemplate(position, Finger.CHARBUFFER1)
+        f.downloadCharacteristics(Finger.CHARBUFFER1)
+    f.close()
+
+    stats = metrics.stats()
+    print('%-24s %6s %9s %9s %9s %9s %9s %9s' % ('instruction', 'count', 'roundtrip', 'encode',
+                                                 'write', 'wait', 'read', 'parse'))
+    for name, entry in sorted(stats['opcodes'].items()):
+        print('%-24s %6d' % (name, entry['roundtrip']['count']) + ''.join(
+            ' %6.2f ms' % ((entry[phase]['mean'] or 0.0) * 1000)
+            for phase in ('roundtrip', 'encode', 'write', 'wait', 'read', 'parse')))
+
+    if args.prometheus:
+        print(metrics.prometheus())
+
+
+if __name__ == '__main__':
+    main()
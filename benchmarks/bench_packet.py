@@ -0,0 +1,118 @@
+"""Micro-benchmark for R305 packet framing.
+
+Compares the old byte-at-a-time writer with the single-write encoder.
+
+    Usage:
+        python -m benchmarks.bench_packet [--seconds 1.0]
+"""
+import argparse
+import struct
+import time
+from functions.config import Finger
+from functions.R305 import encodePacket, packetHeader
+
+
+class NullSerial(object):
+    """
+        Serial stand-in that only counts write calls and bytes.
+    """
+
+    def __init__(self):
+        self.writes = 0
+        self.bytes = 0
+
+    def write(self, data):
+        self.writes += 1
+        self.bytes += len(data)
+        return len(data)
+
+
+def legacy_write(serial, address, packetType, packetPayload):
+    """
+        The previous `__writePacket` implementation (one write per byte).
+    """
+    def byte(n):
+        return struct.pack('@B', n & 0xFF)
+
+    serial.write(byte(Finger.STARTCODE >> 8))
+    serial.write(byte(Finger.STARTCODE))
+    serial.write(byte(address >> 24))
+    serial.write(byte(address >> 16))
+    serial.write(byte(address >> 8))
+    serial.write(byte(address))
+    serial.write(byte(packetType))
+
+    packetLength = len(packetPayload) + 2
+    serial.write(byte(packetLength >> 8))
+    serial.write(byte(packetLength))
+
+    packetChecksum = packetType + (packetLength >> 8 & 0xFF) + (packetLength & 0xFF)
+    for i in range(0, len(packetPayload)):
+        serial.write(byte(packetPayload[i]))
+        packetChecksum += packetPayload[i]
+
+    serial.write(byte(packetChecksum >> 8))
+    serial.write(byte(packetChecksum))
+
+
+def single_write(serial, address, packetType, packetPayload):
+    serial.write(encodePacket(packetHeader(address), packetType, packetPayload))
+
+
+def cached_write(serial, frames, address, packetType, packetPayload):
+    instruction = packetPayload[0]
+    packet = frames.get(instruction)
+    if packet is None:
+        packet = encodePacket(packetHeader(address), packetType, packetPayload)
+        frames[instruction] = packet
+    serial.write(packet)
+
+
+def measure(seconds, func, *args):
+    """
+        Runs `func(serial, *args)` for about `seconds` seconds.
+
+    Returns:
+        (frames per second, write calls per frame)
+    """
+    serial = NullSerial()
+    frames = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            func(serial, *args)
+        frames += 100
+    elapsed = time.perf_counter() - start
+    return frames / elapsed, serial.writes / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=1.0)
+    args = parser.parse_args()
+
+    address = 0xFFFFFFFF
+    cases = [
+        ('READIMAGE', Finger.COMMANDPACKET, (Finger.READIMAGE,)),
+        ('SEARCHTEMPLATE', Finger.COMMANDPACKET,
+         (Finger.SEARCHTEMPLATE, Finger.CHARBUFFER1, 0, 0, 0x03, 0xE8)),
+        ('DATAPACKET 128B', Finger.DATAPACKET, tuple(range(128))),
+    ]
+
+    print('%-16s %-8s %14s %12s' % ('packet', 'path', 'frames/s', 'writes/frame'))
+    for name, packetType, payload in cases:
+        results = [
+            ('legacy', measure(args.seconds, legacy_write, address, packetType, payload)),
+            ('single', measure(args.seconds, single_write, address, packetType, payload)),
+        ]
+        if len(payload) == 1:
+            results.append(('cached', measure(args.seconds, cached_write, {}, address,
+                                              packetType, payload)))
+        for path, (fps, writes) in results:
+            print('%-16s %-8s %14.0f %12.1f' % (name, path, fps, writes))
+        print('%-16s %-8s %13.1fx' % ('', 'speedup', results[-1][1][0] / results[0][1][0]))
+
+
+if __name__ == '__main__':
+    main()
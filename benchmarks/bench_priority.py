@@ -0,0 +1,96 @@
+"""Recognition latency while a bulk export runs on the same sensor.
+
+A client thread asks SensorWorker for a recognition every --interval
+seconds while all stored templates are exported. Compares the export
+as one request (the former behaviour: the UART is busy until the export
+is done) with the export as a background job split per template, and
+prints the recognition p50/p99 latency measured during the export.
+
+    Usage:
+        python -m benchmarks.bench_priority [--templates 200] [--latency 0.005] [--interval 0.05]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from functions.services import FingerPrint
+from functions.simulator import R305Simulator, makeCharacteristics
+from functions.worker import SensorWorker
+
+
+def run(port, directory, split, interval):
+    """
+    Returns:
+        (export seconds, sorted latencies of the recognitions started during the export)
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        fp = FingerPrint(port, cache_path=None)
+
+    path = os.path.join(directory, 'backup-%d.bin' % split)
+    worker = SensorWorker(fp)
+    start = time.perf_counter()
+    if split:
+        export = worker.export_templates(path)
+    else:
+        export = worker.submit('export_templates',
+                               lambda service: list(service.export_templates(path)))
+
+    latencies = []
+
+    def client():
+        while not export.done():
+            queued = time.perf_counter()
+            worker.recognize().result()
+            latencies.append(time.perf_counter() - queued)
+            time.sleep(interval)
+
+    thread = threading.Thread(target=client)
+    thread.start()
+    export.result()
+    seconds = time.perf_counter() - start
+    thread.join()
+
+    worker.shutdown()
+    fp.close()
+    return seconds, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--templates', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='simulated processing time per command in seconds')
+    parser.add_argument('--interval', type=float, default=0.05,
+                        help='pause between two recognitions in seconds')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    sim = R305Simulator(latency=args.latency)
+    for position in range(args.templates):
+        sim.enrollTemplate(position, makeCharacteristics(position))
+    sim.placeFinger(makeCharacteristics(3))
+    port = sim.register('priority')
+
+    directory = tempfile.mkdtemp()
+    print('%-14s %12s %10s %16s %16s' % ('export', 'export [ms]', 'recognized',
+                                         'recognize p50', 'recognize p99'))
+    try:
+        for label, split in (('one request', False), ('background', True)):
+            seconds, latencies = run(port, directory, split, args.interval)
+            count = len(latencies)
+            print('%-14s %12.1f %10d %13.1f ms %13.1f ms' % (
+                label, seconds * 1000, count, latencies[count // 2] * 1000,
+                latencies[min(count - 1, int(count * 0.99))] * 1000))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
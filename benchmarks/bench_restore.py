@@ -0,0 +1,81 @@
+"""Re-imaging a replacement sensor: one template at a time against restoreTemplates().
+
+Restores --templates characteristics onto a simulated sensor that still
+holds old templates. The former path uploads every template with the
+read-back check of uploadCharacteristics() and stores it on its own,
+the new one is PyFingerprint.restoreTemplates(clear=True) with each
+verification mode. Wire time is simulated at the sensor baud rate.
+
+    Usage:
+        python -m benchmarks.bench_restore [--templates 100] [--latency 0.005]
+"""
+import argparse
+import time
+from functions.config import Finger
+from functions.R305 import PyFingerprint
+from functions.simulator import R305Simulator, makeCharacteristics
+
+
+def _one_by_one(f, records):
+    for position, characteristics in records:
+        f.uploadCharacteristics(Finger.CHARBUFFER1, characteristics)
+        f.storeTemplate(position, Finger.CHARBUFFER1)
+
+
+def restore_paths(templates, latency=0.0, wire=True, transport='url'):
+    """
+    Returns:
+        A list of (path, seconds, round trips, wire bytes) per restore path
+    """
+    records = [(position, makeCharacteristics(position)) for position in range(templates)]
+    paths = [('one_by_one', lambda f: _one_by_one(f, records))]
+    for verify in ('full', 'sampled', 'checksum'):
+        paths.append(('restore_%s' % verify, lambda f, verify=verify:
+                      f.restoreTemplates(records, verify=verify, clear=True)))
+
+    results = []
+    for name, restore in paths:
+        sim = R305Simulator(latency=latency, simulateBaudRate=wire)
+        ## The replacement sensor was used before
+        for position in range(0, templates * 2, 3):
+            sim.enrollTemplate(position, makeCharacteristics(templates * 10 + position))
+        port = sim.openPty() if transport == 'pty' else sim.register('restore-' + name)
+        f = PyFingerprint(port)
+        f.verifyPassword()
+
+        sim.resetStats()
+        start = time.perf_counter()
+        restore(f)
+        seconds = time.perf_counter() - start
+        stats = sim.stats
+        results.append((name, seconds, stats['commands'],
+                        stats['bytesReceived'] + stats['bytesSent']))
+
+        f.close()
+        sim.close()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--templates', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='simulated processing time per command in seconds')
+    parser.add_argument('--transport', choices=('pty', 'url'), default='url')
+    args = parser.parse_args()
+
+    results = restore_paths(args.templates, args.latency, True, args.transport)
+    baseline = results[0][1]
+
+    print('%-18s %12s %14s %12s %12s %8s' % ('path', 'total [ms]', 'per template', 'round trips',
+                                            'wire bytes', 'speedup'))
+    for name, seconds, roundTrips, wireBytes in results:
+        print('%-18s %12.1f %11.2f ms %12d %12d %7.2fx' % (
+            name, seconds * 1000, seconds / args.templates * 1000, roundTrips, wireBytes,
+            baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
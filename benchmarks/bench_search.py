@@ -0,0 +1,80 @@
+"""On-device search time against the database fill level.
+
+Compares searchTemplate over the whole storage capacity with
+searchOccupied (used positions only, recently matched windows first).
+The simulator charges --per-template seconds for every position a
+search compares. Templates are spread randomly over the capacity and
+the matching queries follow a skewed distribution (a few users match
+most of the time).
+
+    Usage:
+        python -m benchmarks.bench_search [--queries 100] [--per-template 0.0002]
+"""
+import argparse
+import random
+import time
+from functions.config import Finger
+from functions.R305 import PyFingerprint
+from functions.simulator import R305Simulator, makeCharacteristics
+
+CAPACITY = 1000
+
+
+def measure(f, sim, search, queries, rng):
+    """
+    Returns:
+        (mean match time, mean no-match time) in milliseconds
+    """
+    matched = 0.0
+    for characteristics in queries:
+        f.uploadCharacteristics(Finger.CHARBUFFER1, characteristics, verify=False)
+        start = time.perf_counter()
+        search()
+        matched += time.perf_counter() - start
+
+    f.uploadCharacteristics(Finger.CHARBUFFER1, makeCharacteristics(CAPACITY * 1000), verify=False)
+    start = time.perf_counter()
+    search()
+    missed = time.perf_counter() - start
+
+    return matched / len(queries) * 1000, missed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--per-template', type=float, default=0.0002,
+                        help='simulated compare time per position in seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print('%-6s %14s %14s %14s %14s' % ('fill', 'full hit', 'occupied hit',
+                                        'full miss', 'occupied miss'))
+
+    for fill in (0.02, 0.1, 0.25, 0.5, 1.0):
+        rng = random.Random(args.seed)
+        sim = R305Simulator(storageCapacity=CAPACITY, searchLatency=args.per_template)
+        positions = rng.sample(range(CAPACITY), int(CAPACITY * fill))
+        for position in positions:
+            sim.enrollTemplate(position, makeCharacteristics(position))
+
+        ## Ten hot users make 80% of the matching queries
+        hot = positions[:10]
+        queries = [makeCharacteristics(rng.choice(hot) if rng.random() < 0.8
+                                       else rng.choice(positions))
+                   for _ in range(args.queries)]
+
+        f = PyFingerprint(sim.register('search-%s' % fill))
+        f.verifyPassword()
+
+        full = measure(f, sim, f.searchTemplate, queries, rng)
+        occupied = measure(f, sim, f.searchOccupied, queries, rng)
+
+        print('%-6s %11.1f ms %11.1f ms %11.1f ms %11.1f ms' % (
+            '%d%%' % (fill * 100), full[0], occupied[0], full[1], occupied[1]))
+        f.close()
+
+
+if __name__ == '__main__':
+    main()
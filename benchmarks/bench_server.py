@@ -0,0 +1,104 @@
+"""Local API server against opening the sensor in every client.
+
+Today a client process creates its own FingerPrint (port open,
+handshake, cache, identity database) for each job. The server keeps one
+warm session and many clients send JSON requests over a Unix socket.
+Prints the cost of a cold in-process template count, the client side
+latencies through the server, the number of coalesced requests and the
+per-endpoint latency the server reports.
+
+    Usage:
+        python -m benchmarks.bench_server [--clients 16] [--requests 20] [--latency 0.01]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from functions.server import FingerprintServer, ServiceClient
+from functions.services import FingerPrint
+from functions.simulator import R305Simulator, makeCharacteristics
+
+TEMPLATES = 50
+
+
+def open_service(port, directory):
+    with contextlib.redirect_stdout(io.StringIO()):
+        fp = FingerPrint(port, cache_path=os.path.join(directory, 'characteristics.cache'))
+    fp.db_path = os.path.join(directory, 'database.csv')
+    return fp
+
+
+def client(path, requests, index, latencies):
+    with ServiceClient(path) as service:
+        for i in range(requests):
+            start = time.perf_counter()
+            if (index + i) % 4 == 0:
+                service.recognize()
+            else:
+                service.template_count()
+            latencies.append(time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.01,
+                        help='simulated processing time per command in seconds')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    sim = R305Simulator(latency=args.latency)
+    for position in range(TEMPLATES):
+        sim.enrollTemplate(position, makeCharacteristics(position))
+    sim.placeFinger(makeCharacteristics(5))
+    port = sim.register('server')
+
+    directory = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        fp = open_service(port, directory)
+        fp.f.getTemplateCount()
+        fp.close()
+        print('cold in-process template count: %.1f ms' % ((time.perf_counter() - start) * 1000))
+
+        fp = open_service(port, directory)
+        path = os.path.join(directory, 'r305.sock')
+        with FingerprintServer(fp, unix_path=path).start() as server:
+            latencies = []
+            threads = [threading.Thread(target=client,
+                                        args=(path, args.requests, i, latencies))
+                       for i in range(args.clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            stats = server.stats()
+        fp.close()
+
+        latencies.sort()
+        count = len(latencies)
+        print('%d clients x %d requests in %.1f ms, client p50 %.1f ms, p99 %.1f ms' % (
+            args.clients, args.requests, elapsed * 1000, latencies[count // 2] * 1000,
+            latencies[min(count - 1, int(count * 0.99))] * 1000))
+        print('coalesced requests: %d, sensor requests: %d' % (
+            stats['coalesced'], stats['worker']['completed']))
+        print('%-18s %6s %12s %12s' % ('endpoint', 'count', 'p50', 'p99'))
+        for endpoint, latency in sorted(stats['endpoints'].items()):
+            print('%-18s %6d %9.1f ms %9.1f ms' % (
+                endpoint, latency['count'], latency['p50_ms'], latency['p99_ms']))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
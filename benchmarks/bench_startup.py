@@ -0,0 +1,88 @@
+"""Cold start breakdown: module imports and sensor handshakes.
+
+Imports functions.services in a fresh interpreter with -X importtime and
+lists the slowest modules, then handshakes with simulated sensors:
+FingerPrint step by step, and N sensors one after the other against
+SensorPool (all at once).
+
+    Usage:
+        python -m benchmarks.bench_startup [--sensors 4] [--latency 0.05]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from functions.R305 import PyFingerprint
+from functions.pool import SensorPool
+from functions.services import FingerPrint
+from functions.simulator import R305Simulator
+
+
+def import_times(module, top):
+    """
+    Returns:
+        (total microseconds, [(cumulative microseconds, module)] of the slowest
+        modules, names of all imported modules)
+    """
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                            stderr=subprocess.PIPE, universal_newlines=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stderr
+    times = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        fields = line[len('import time:'):].split('|')
+        times.append((int(fields[1]), fields[2].strip()))
+
+    total = [cumulative for cumulative, name in times if name == module][0]
+    return total, sorted(times, reverse=True)[1:top + 1], set(name for _, name in times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sensors', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='simulated processing time per command in seconds')
+    parser.add_argument('--top', type=int, default=8)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    total, slowest, imported = import_times('functions.services', args.top)
+    print('import functions.services: %.1f ms' % (total / 1000.0))
+    for cumulative, name in slowest:
+        print('    %-40s %8.1f ms' % (name, cumulative / 1000.0))
+    loaded = [name for name in ('numpy', 'PIL', 'pandas', 'aenum') if name in imported]
+    print('heavy modules loaded: ' + (', '.join(loaded) or 'none'))
+
+    sim = R305Simulator(latency=args.latency)
+    with contextlib.redirect_stdout(io.StringIO()):
+        fp = FingerPrint(sim.register('startup'),
+                         cache_path=os.path.join(tempfile.mkdtemp(), 'characteristics.cache'))
+    print(fp.startup_report())
+    fp.close()
+
+    sims = [R305Simulator(latency=args.latency) for _ in range(args.sensors)]
+    ports = [sim.register('startup-%d' % i) for i, sim in enumerate(sims)]
+
+    start = time.perf_counter()
+    for port in ports:
+        f = PyFingerprint(port)
+        f.verifyPassword()
+        f.close()
+    serial = time.perf_counter() - start
+
+    pool = SensorPool(ports)
+    print('handshake of %d sensors: serial %.1f ms, pool %.1f ms' % (
+        args.sensors, serial * 1000, pool.last_probe * 1000))
+    pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Turnstile loop: recognize() per call against recognize_stream().
+
+A driver thread puts --touches fingers on the simulated sensor, each
+held for --hold seconds. The former loop calls FingerPrint.recognize()
+again and again, the new one iterates FingerPrint.recognize_stream().
+Prints the results per touch (more than 1 means duplicates of a held
+finger), the sensor commands besides readImage polls per result and
+the detection-to-result time.
+
+    Usage:
+        python -m benchmarks.bench_stream [--touches 10] [--hold 0.5] [--latency 0.005]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from functions.config import Finger
+from functions.services import FingerPrint
+from functions.simulator import R305Simulator, makeCharacteristics
+
+TEMPLATES = 100
+
+
+def touches(sim, count, hold, done):
+    for touch in range(count):
+        time.sleep(0.2)
+        sim.placeFinger(makeCharacteristics(touch * 7 % TEMPLATES))
+        time.sleep(hold)
+        sim.liftFinger()
+    time.sleep(0.3)
+    done.set()
+
+
+def run(sim, port, directory, count, hold, stream):
+    """
+    Returns:
+        (results, commands besides readImage, mean detection-to-result seconds)
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        fp = FingerPrint(port, cache_path=None)
+    fp.db_path = os.path.join(directory, 'database.csv')
+    fp.poller.deadline = 0.5
+
+    done = threading.Event()
+    sim.resetStats()
+    results = []
+    driver = threading.Thread(target=touches, args=(sim, count, hold, done))
+    driver.start()
+
+    if stream:
+        threading.Thread(target=lambda: (done.wait(), fp.stop_stream())).start()
+        for touch in fp.recognize_stream():
+            results.append(touch.timings['total'])
+    else:
+        while not done.is_set():
+            try:
+                result = fp.recognize()
+            except SystemExit:
+                # No finger before the poller deadline
+                continue
+            if result['code'] == '200':
+                results.append(fp.events.last.timestamp - fp.poller._last_activity)
+
+    driver.join()
+    fp.close()
+
+    opcodes = sim.stats['opcodes']
+    commands = sim.stats['commands'] - opcodes.get(Finger.READIMAGE, 0)
+    return len(results), commands, sum(results) / max(1, len(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--touches', type=int, default=10)
+    parser.add_argument('--hold', type=float, default=0.5,
+                        help='seconds a finger stays on the sensor')
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='simulated processing time per command in seconds')
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)
+
+    sim = R305Simulator(latency=args.latency)
+    for position in range(TEMPLATES):
+        sim.enrollTemplate(position, makeCharacteristics(position))
+    port = sim.register('stream')
+
+    directory = tempfile.mkdtemp()
+    print('%-18s %14s %16s %18s' % ('loop', 'results/touch', 'commands/result',
+                                    'detect->result'))
+    try:
+        for label, stream in (('recognize()', False), ('recognize_stream', True)):
+            results, commands, seconds = run(sim, port, directory, args.touches,
+                                             args.hold, stream)
+            print('%-18s %14.1f %16.1f %15.1f ms' % (
+                label, results / args.touches, commands / max(1, results), seconds * 1000))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Many application threads sharing one sensor through SensorWorker.
+
+Every client thread mixes recognize() (finger on the simulated sensor)
+with template_number() and raw getTemplateCount commands. All requests
+go through the worker's queue, so the serial link never sees two
+commands at once. Prints the answers that were wrong (must be 0) and
+the worker's queue-depth and service/wait-time statistics.
+
+    Usage:
+        python -m benchmarks.bench_worker [--clients 8] [--requests 20] [--latency 0.01]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from functions.services import FingerPrint
+from functions.simulator import R305Simulator, makeCharacteristics
+from functions.worker import SensorWorker
+
+TEMPLATES = 20
+
+
+def client(worker, requests, index, errors):
+    for i in range(requests):
+        if (index + i) % 3 == 0:
+            result = worker.recognize().result()
+            if result['code'] != '200':
+                errors.append(result)
+        elif (index + i) % 3 == 1:
+            # Positions 0..TEMPLATES-1 are used, TEMPLATES is the first free one
+            if worker.template_number().result() != TEMPLATES:
+                errors.append('template_number')
+        else:
+            if worker.command('getTemplateCount').result() != TEMPLATES:
+                errors.append('getTemplateCount')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.01,
+                        help='simulated processing time per command in seconds')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    sim = R305Simulator(latency=args.latency)
+    for position in range(TEMPLATES):
+        sim.enrollTemplate(position, makeCharacteristics(position))
+    sim.placeFinger(makeCharacteristics(7))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        fp = FingerPrint(sim.register('worker'),
+                         cache_path=os.path.join(tempfile.mkdtemp(), 'characteristics.cache'))
+
+    errors = []
+    with SensorWorker(fp) as worker:
+        threads = [threading.Thread(target=client, args=(worker, args.requests, i, errors))
+                   for i in range(args.clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stats = worker.stats()
+
+    fp.close()
+
+    print('%d clients x %d requests in %.1f ms, wrong answers: %d' % (
+        args.clients, args.requests, elapsed * 1000, len(errors)))
+    print('completed %d, failed %d, max queue depth %d' % (
+        stats['completed'], stats['failed'], stats['max_queue_depth']))
+    print('%-18s %6s %12s %12s %12s %12s' % ('request', 'count', 'service p50', 'service p99',
+                                             'wait p50', 'wait p99'))
+    for name, service in sorted(stats['service_time'].items()):
+        wait = stats['wait_time'][name]
+        print('%-18s %6d %9.1f ms %9.1f ms %9.1f ms %9.1f ms' % (
+            name, service['count'], service['p50_ms'], service['p99_ms'],
+            wait['p50_ms'], wait['p99_ms']))
+
+
+if __name__ == '__main__':
+    main()
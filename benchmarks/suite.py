@@ -0,0 +1,304 @@
+"""Benchmark suite for the R305 driver and the FingerPrint service.
+
+Runs against the software sensor of functions.simulator and reports
+per-command latency distributions, packet encode/decode throughput,
+serial round trips, bytes on the wire and host CPU time per operation,
+and the restore paths of benchmarks.bench_restore.
+
+    Usage:
+        python -m benchmarks.suite --output results.json
+        python -m benchmarks.suite --output new.json --compare results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from benchmarks.bench_restore import restore_paths
+from functions.config import Finger
+from functions.R305 import PyFingerprint, encodePacket, packetHeader
+from functions.services import FingerPrint
+from functions.simulator import R305Simulator, makeCharacteristics
+
+
+class ReplaySerial(object):
+    """
+        Serial stand-in answering every write with a canned response.
+
+        Used to measure the host-side cost of encoding and decoding
+        packets without any transport in between.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.buffer = bytearray()
+        self.position = 0
+
+    def isOpen(self):
+        return True
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def write(self, data):
+        if self.position == len(self.buffer):
+            self.buffer = bytearray(self.response)
+            self.position = 0
+        else:
+            self.buffer += self.response
+        return len(data)
+
+    def read(self, size=1):
+        data = bytes(self.buffer[self.position:self.position + size])
+        self.position += len(data)
+        return data
+
+
+def distribution(samples):
+    """
+        Summarizes latency samples (seconds) in milliseconds.
+    """
+    ordered = sorted(samples)
+    count = len(ordered)
+
+    def percentile(p):
+        return ordered[min(count - 1, int(round(p / 100.0 * (count - 1))))] * 1000
+
+    return {
+        'count': count,
+        'mean': sum(ordered) / count * 1000,
+        'min': ordered[0] * 1000,
+        'p50': percentile(50),
+        'p90': percentile(90),
+        'p99': percentile(99),
+        'max': ordered[-1] * 1000,
+    }
+
+
+def rate(seconds, func):
+    """
+        Calls `func` for about `seconds` seconds.
+
+    Returns:
+        Calls per second (float)
+    """
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(50):
+            func()
+        calls += 50
+    return calls / (time.perf_counter() - start)
+
+
+def bench_codec(seconds, metrics):
+    header = packetHeader(0xFFFFFFFF)
+    ack = encodePacket(header, Finger.ACKPACKET, (Finger.OK,))
+    payload = (Finger.SEARCHTEMPLATE, Finger.CHARBUFFER1, 0, 0, 0x03, 0xE8)
+
+    encode = rate(seconds, lambda: encodePacket(header, Finger.COMMANDPACKET, payload))
+    metrics['codec.encode.frames_per_s'] = {'value': encode, 'better': 'higher'}
+
+    f = PyFingerprint(ReplaySerial(ack))
+    roundtrip = rate(seconds, f.readImage)
+    metrics['codec.ack_roundtrip.calls_per_s'] = {'value': roundtrip, 'better': 'higher'}
+
+    characteristics = makeCharacteristics(0)
+    download = ack + b''.join(
+        encodePacket(header, Finger.DATAPACKET if i < 3 else Finger.ENDDATAPACKET,
+                     characteristics[i * 128:(i + 1) * 128])
+        for i in range(4))
+    f = PyFingerprint(ReplaySerial(download))
+    calls = rate(seconds, f.downloadCharacteristics)
+    metrics['codec.download_characteristics.calls_per_s'] = {'value': calls, 'better': 'higher'}
+    metrics['codec.decode.bytes_per_s'] = {'value': calls * len(download), 'better': 'higher'}
+
+
+def bench_commands(sim, f, iterations, metrics):
+    sim.placeFinger(makeCharacteristics(0))
+    f.readImage()
+    f.convertImage(Finger.CHARBUFFER1)
+    characteristics = f.downloadCharacteristics(Finger.CHARBUFFER1)
+
+    commands = [
+        ('readImage', lambda: f.readImage()),
+        ('convertImage', lambda: f.convertImage(Finger.CHARBUFFER1)),
+        ('searchTemplate', lambda: f.searchTemplate()),
+        ('storeTemplate', lambda: f.storeTemplate(0)),
+        ('loadTemplate', lambda: f.loadTemplate(0)),
+        ('downloadCharacteristics', lambda: f.downloadCharacteristics(Finger.CHARBUFFER1)),
+        ('uploadCharacteristics', lambda: f.uploadCharacteristics(Finger.CHARBUFFER2, characteristics)),
+        ('getTemplateCount', lambda: f.getTemplateCount()),
+        ('getSystemParameters', lambda: f.getSystemParameters()),
+        ('getTemplateIndex', lambda: f.getTemplateIndex(0)),
+        ('deleteTemplate', lambda: f.deleteTemplate(0)),
+    ]
+
+    for name, command in commands:
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            command()
+            samples.append(time.perf_counter() - start)
+        for key, value in distribution(samples).items():
+            if key != 'count':
+                metrics['command.%s.%s_ms' % (name, key)] = {'value': value, 'better': 'lower'}
+
+
+def measure_operation(sim, name, operation, iterations, prepare, metrics):
+    """
+        Runs a FingerPrint operation and records latency, round trips,
+        bytes on the wire and CPU time of the calling thread per call.
+    """
+    samples = []
+    cpu = 0.0
+    sim.resetStats()
+    for i in range(iterations):
+        prepare(i)
+        cpuStart = time.thread_time()
+        start = time.perf_counter()
+        operation(i)
+        samples.append(time.perf_counter() - start)
+        cpu += time.thread_time() - cpuStart
+
+    stats = sim.stats
+    latency = distribution(samples)
+    metrics['operation.%s.p50_ms' % name] = {'value': latency['p50'], 'better': 'lower'}
+    metrics['operation.%s.p99_ms' % name] = {'value': latency['p99'], 'better': 'lower'}
+    metrics['operation.%s.round_trips' % name] = {
+        'value': stats['commands'] / float(iterations), 'better': 'lower'}
+    metrics['operation.%s.wire_bytes' % name] = {
+        'value': (stats['bytesReceived'] + stats['bytesSent']) / float(iterations), 'better': 'lower'}
+    metrics['operation.%s.cpu_ms' % name] = {'value': cpu / iterations * 1000, 'better': 'lower'}
+
+
+def bench_operations(sim, port, iterations, metrics):
+    directory = tempfile.mkdtemp()
+    db_path = os.path.join(directory, 'database.csv')
+    with open(db_path, 'w') as f:
+        f.write('Index,Name\n')
+
+    fp = FingerPrint(port, cache_path=os.path.join(directory, 'characteristics.cache'))
+    fp.db_path = db_path
+    fp.enroll_delay = 0
+
+    def place(i):
+        sim.placeFinger(makeCharacteristics(1000 + i))
+
+    measure_operation(sim, 'enroll', lambda i: fp.enroll('user%d' % i),
+                      iterations, place, metrics)
+    measure_operation(sim, 'recognize', lambda i: fp.recognize(),
+                      iterations, place, metrics)
+    measure_operation(sim, 'template_number', lambda i: fp.template_number(),
+                      iterations, lambda i: None, metrics)
+    measure_operation(sim, 'remove_template_byname',
+                      lambda i: fp.remove_template_byname('user%d' % i),
+                      iterations, lambda i: None, metrics)
+
+
+def bench_restore(templates, latency, wire, transport, metrics):
+    for name, seconds, roundTrips, wireBytes in restore_paths(templates, latency, wire, transport):
+        metrics['restore.%s.ms_per_template' % name] = {
+            'value': seconds / templates * 1000, 'better': 'lower'}
+        metrics['restore.%s.round_trips' % name] = {'value': roundTrips, 'better': 'lower'}
+        metrics['restore.%s.wire_bytes' % name] = {'value': wireBytes, 'better': 'lower'}
+
+
+def compare(results, baseline, threshold):
+    """
+    Returns:
+        A list of (metric, baseline value, new value, relative change) regressions
+    """
+    regressions = []
+    for name, metric in sorted(results['metrics'].items()):
+        old = baseline['metrics'].get(name)
+        if old is None or old['value'] == 0:
+            continue
+        change = (metric['value'] - old['value']) / float(old['value'])
+        worse = change > threshold if metric['better'] == 'lower' else change < -threshold
+        if worse:
+            regressions.append((name, old['value'], metric['value'], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='bench_results.json',
+                        help='file to write the results to')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='flag regressions against a saved result file')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='relative change counted as regression (default 0.10)')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=0.5,
+                        help='duration of each throughput measurement')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='simulated sensor processing time per command in seconds')
+    parser.add_argument('--wire', action='store_true',
+                        help='simulate the wire time at the sensor baud rate')
+    parser.add_argument('--transport', choices=('pty', 'url'), default='pty',
+                        help='pty keeps the simulator out of the measured thread')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    metrics = {}
+    bench_codec(args.seconds, metrics)
+
+    for scope in ('commands', 'operations'):
+        sim = R305Simulator(latency=args.latency, simulateBaudRate=args.wire)
+        port = sim.openPty() if args.transport == 'pty' else sim.register('bench-' + scope)
+        if scope == 'commands':
+            f = PyFingerprint(port)
+            f.verifyPassword()
+            bench_commands(sim, f, args.iterations, metrics)
+        else:
+            ## The service prints progress messages on stdout
+            with contextlib.redirect_stdout(io.StringIO()):
+                bench_operations(sim, port, args.iterations, metrics)
+        sim.close()
+
+    bench_restore(args.iterations, args.latency, args.wire, args.transport, metrics)
+
+    results = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'iterations': args.iterations,
+            'latency': args.latency,
+            'wire': args.wire,
+            'transport': args.transport,
+        },
+        'metrics': metrics,
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+    for name, metric in sorted(metrics.items()):
+        print('%-52s %14.3f' % (name, metric['value']))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new, change in regressions:
+            print('REGRESSION %-41s %12.3f -> %12.3f (%+.1f%%)' % (name, old, new, change * 100))
+        if regressions:
+            sys.exit(1)
+        print('No regressions against ' + args.compare)
+
+
+if __name__ == '__main__':
+    main()
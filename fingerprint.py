@@ -1,6 +1,7 @@
 import os
 import time
 from functions.services import FingerPrint
+from functions.worker import SensorWorker
 import threading
 """R305 fingerprint sensor for raspbbery pi 4"""
 __author__ = "Thanhlv"
@@ -23,34 +24,30 @@ __status__ = "Development"
 
 
 Finger = FingerPrint()
+# Owns the sensor, the threads below queue their requests to it
+worker = SensorWorker(Finger)
 
-def get(key, distionary):
-    for k, value in distionary.items():
-        if key == k:
-            return value
-
-def log():
+def log(events):
     codelist = ['100','101', '102', '200']
-    while True:
+    # Blocks until the service publishes the next status
+    for event in events:
+        print(event)
 
-        dis = Finger.message
-        print(dis)
-        code = 'code'
-        message = 'message'
-        code = get(code, dis)
-        message = get(message, dis)
-
-        if code in codelist:
-            print(message)
+        if event.code in codelist:
+            print(event.message)
             break
 
+    events.close()
+
 def test_update_log():
     while True:
-        Finger.enroll()
+        worker.enroll().result()
 
 if __name__ == "__main__":
 
-    t1 = threading.Thread(target=log)
+    # Subscribe before enrolling starts so no status is missed
+    events = Finger.events.subscribe()
+    t1 = threading.Thread(target=log, args=(events,))
     t2 = threading.Thread(target=test_update_log)
 
     t1.start()
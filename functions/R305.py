@@ -1,9 +1,70 @@
 
+import collections
 import os
 import serial
-from PIL import Image
 import struct
 from .config import Finger
+from .occupancy import TemplateOccupancy
+
+
+## Header prefixes (start code + address) by sensor address
+_headerPrefixes = {}
+
+def packetHeader(address):
+    """
+    Gets the constant frame prefix (start code and address) for an address.
+
+    Arguments:
+        address (int): The sensor address
+
+    Returns:
+        The prefix (bytes)
+    """
+
+    prefix = _headerPrefixes.get(address)
+
+    if ( prefix is None ):
+        prefix = struct.pack('>HI', Finger.STARTCODE, address)
+        _headerPrefixes[address] = prefix
+
+    return prefix
+
+def encodePacket(headerPrefix, packetType, packetPayload):
+    """
+    Builds a complete packet frame.
+
+    Arguments:
+        headerPrefix (bytes): The frame prefix returned by `packetHeader()`
+        packetType (int): The packet type
+        packetPayload (tuple): The payload (a sequence of byte values or a bytes-like object)
+
+    Returns:
+        The frame (bytes)
+    """
+
+    ## The packet length = package payload (n bytes) + checksum (2 bytes)
+    packetLength = len(packetPayload) + 2
+
+    body = bytearray(headerPrefix)
+    body.append(packetType)
+    body.append(packetLength >> 8 & 0xFF)
+    body.append(packetLength & 0xFF)
+    body.extend(packetPayload)
+
+    ## The packet checksum = packet type (1 byte) + packet length (2 bytes) + payload (n bytes)
+    packetChecksum = sum(memoryview(body)[6:])
+
+    body.append(packetChecksum >> 8 & 0xFF)
+    body.append(packetChecksum & 0xFF)
+
+    return bytes(body)
+
+class ResponseTimeout(Exception):
+    """
+    The sensor did not answer within the serial timeout.
+
+    A subclass of Exception, so callers that catch every sensor error still do.
+    """
 
 
 class PyFingerprint(object):
@@ -22,13 +83,22 @@ class PyFingerprint(object):
     __address = None
     __password = None
     __serial = None
+    __headerPrefix = None
+    __fixedFrames = None
+    __systemParameters = None
+    __occupancy = None
+    __characteristicsCache = None
+    __recentMatches = None
+    __matchCounts = None
+    __metrics = None
+    __metricsPatched = None
 
     def __init__(self, port = '/dev/ttyAMA0', baudRate = 57600, address = 0xFFFFFFFF, password = 0x00000000):
         """
         Constructor
 
         Arguments:
-            port (str): The port to use
+            port (str): The port (device path or pyserial URL) to use, or an already created serial object
             baudRate (int): The baud rate to use. Must be a multiple of 9600!
             address (int): The sensor address
             password (int): The sensor password
@@ -48,9 +118,17 @@ class PyFingerprint(object):
 
         self.__address = address
         self.__password = password
-
-        ## Initialize PySerial connection
-        self.__serial = serial.Serial(port = port, baudrate = baudRate, bytesize = serial.EIGHTBITS, timeout = 2)
+        self.__headerPrefix = packetHeader(address)
+        self.__fixedFrames = {}
+        self.__originalLink = None
+        self.__recentMatches = collections.deque(maxlen = 256)
+        self.__matchCounts = {}
+
+        ## Initialize PySerial connection (device paths or pyserial URLs like 'r305sim://name')
+        if ( isinstance(port, str) ):
+            self.__serial = serial.serial_for_url(port, baudrate = baudRate, bytesize = serial.EIGHTBITS, timeout = 2)
+        else:
+            self.__serial = port
 
         if ( self.__serial.isOpen() == True ):
             self.__serial.close()
@@ -113,140 +191,111 @@ class PyFingerprint(object):
         result = n & twoP
         return int(result > 0)
 
-    def __byteToString(self, byte):
+    def __writePacket(self, packetType, packetPayload):
         """
-        Converts a byte to string.
+        Sends a packet to the sensor.
 
-        Arguments:
-            byte (int): The byte
+        The whole frame is built in memory and written with a single call.
+        Frames of commands without arguments never change for a given
+        address, so they are cached after the first use.
 
-        Returns:
-            The string (str)
+        Arguments:
+            packetType (int): The packet type (either `Finger.COMMANDPACKET`, `Finger.DATAPACKET` or `Finger.ENDDATAPACKET`)
+            packetPayload (tuple): The payload
         """
 
-        return struct.pack('@B', byte)
-
-    def __stringToByte(self, string):
-        """
-        Convert one "string" byte (like '0xFF') to real integer byte (0xFF).
+        if ( packetType == Finger.COMMANDPACKET and len(packetPayload) == 1 ):
+            instruction = packetPayload[0]
+            packet = self.__fixedFrames.get(instruction)
 
-        Arguments:
-            string (str): The string
+            if ( packet is None ):
+                packet = encodePacket(self.__headerPrefix, packetType, packetPayload)
+                self.__fixedFrames[instruction] = packet
 
-        Returns:
-            The byte (int)
-        """
+        else:
+            packet = encodePacket(self.__headerPrefix, packetType, packetPayload)
 
-        return struct.unpack('@B', string)[0]
+        self.__serial.write(packet)
 
-    def __writePacket(self, packetType, packetPayload):
+    def __readExactly(self, length):
         """
-        Sends a packet to the sensor.
+        Reads exactly the given number of bytes from the sensor.
 
         Arguments:
-            packetType (int): The packet type (either `Finger.COMMANDPACKET`, `Finger.DATAPACKET` or `Finger.ENDDATAPACKET`)
-            packetPayload (tuple): The payload
-        """
+            length (int): The number of bytes
 
-        ## Write header (one byte at once)
-        self.__serial.write(self.__byteToString(self.__rightShift(Finger.STARTCODE, 8)))
-        self.__serial.write(self.__byteToString(self.__rightShift(Finger.STARTCODE, 0)))
+        Returns:
+            The received bytes (bytes)
 
-        self.__serial.write(self.__byteToString(self.__rightShift(self.__address, 24)))
-        self.__serial.write(self.__byteToString(self.__rightShift(self.__address, 16)))
-        self.__serial.write(self.__byteToString(self.__rightShift(self.__address, 8)))
-        self.__serial.write(self.__byteToString(self.__rightShift(self.__address, 0)))
+        Raises:
+            ResponseTimeout: if no data arrives within the serial timeout
+        """
 
-        self.__serial.write(self.__byteToString(packetType))
+        receivedData = self.__serial.read(length)
 
-        ## The packet length = package payload (n bytes) + checksum (2 bytes)
-        packetLength = len(packetPayload) + 2
+        if ( len(receivedData) == length ):
+            return receivedData
 
-        self.__serial.write(self.__byteToString(self.__rightShift(packetLength, 8)))
-        self.__serial.write(self.__byteToString(self.__rightShift(packetLength, 0)))
+        ## Partial read: keep reading until the rest arrived
+        receivedBuffer = bytearray(receivedData)
+        receivedFragment = receivedData
 
-        ## The packet checksum = packet type (1 byte) + packet length (2 bytes) + payload (n bytes)
-        packetChecksum = packetType + self.__rightShift(packetLength, 8) + self.__rightShift(packetLength, 0)
+        while ( len(receivedBuffer) < length ):
+            if ( len(receivedFragment) == 0 ):
+                raise ResponseTimeout('Timeout while waiting for the sensor response!')
 
-        ## Write payload
-        for i in range(0, len(packetPayload)):
-            self.__serial.write(self.__byteToString(packetPayload[i]))
-            packetChecksum += packetPayload[i]
+            receivedFragment = self.__serial.read(length - len(receivedBuffer))
+            receivedBuffer += receivedFragment
 
-        ## Write checksum (2 bytes)
-        self.__serial.write(self.__byteToString(self.__rightShift(packetChecksum, 8)))
-        self.__serial.write(self.__byteToString(self.__rightShift(packetChecksum, 0)))
+        return bytes(receivedBuffer)
 
     def __readPacket(self):
         """
         Receives a packet from the sensor.
 
+        The 9 byte header is read at once, then exactly the announced
+        number of payload and checksum bytes.
+
         Returns:
             A tuple that contain the following information:
             0: integer(1 byte) The packet type.
-            1: integer(n bytes) The packet payload.
+            1: bytes(n bytes) The packet payload.
 
         Raises:
-            Exception: if checksum is wrong
+            Exception: if checksum is wrong, an acknowledge is empty or the sensor does not respond
         """
 
-        receivedPacketData = []
-        i = 0
+        receivedHeader = self.__readExactly(9)
 
-        while ( True ):
+        ## Check the packet header
+        if ( receivedHeader[0] != Finger.STARTCODE >> 8 or receivedHeader[1] != Finger.STARTCODE & 0xFF ):
+            raise Exception('The received packet do not begin with a valid header!')
 
-            ## Read one byte
-            receivedFragment = self.__serial.read()
+        packetType = receivedHeader[6]
 
-            if ( len(receivedFragment) != 0 ):
-                receivedFragment = self.__stringToByte(receivedFragment)
+        ## Calculate packet payload length (combine the 2 length bytes)
+        packetPayloadLength = receivedHeader[7] << 8 | receivedHeader[8]
 
-            else:
-                continue
-
-            ## Insert byte if packet seems valid
-            receivedPacketData.insert(i, receivedFragment)
-            i += 1
-
-            ## Packet could be complete (the minimal packet size is 12 bytes)
-            if ( i >= 12 ):
-                ## Check the packet header
-                if ( receivedPacketData[0] != self.__rightShift
-                (Finger.STARTCODE, 8) or receivedPacketData[1] != self.__rightShift(Finger.STARTCODE, 0) ):
-                    raise Exception('The received packet do not begin with a valid header!')
-
-                ## Calculate packet payload length (combine the 2 length bytes)
-                packetPayloadLength = self.__leftShift(receivedPacketData[7], 8)
-                packetPayloadLength = packetPayloadLength | self.__leftShift(receivedPacketData[8], 0)
-                
-                ## Check if the packet is still fully received
-                ## Condition: index counter < packet payload length + packet frame
-                if ( i < packetPayloadLength + 9 ):
-                    continue
+        if ( packetPayloadLength < 2 ):
+            raise Exception('The received packet has an invalid length!')
 
-                ## At this point the packet should be fully received
+        receivedData = memoryview(self.__readExactly(packetPayloadLength))
 
-                packetType = receivedPacketData[6]
-        
-                ## Calculate checksum:
-                ## checksum = packet type (1 byte) + packet length (2 bytes) + packet payload (n bytes)
-                packetChecksum = packetType + receivedPacketData[7] + receivedPacketData[8]
+        ## Calculate checksum:
+        ## checksum = packet type (1 byte) + packet length (2 bytes) + packet payload (n bytes)
+        packetChecksum = packetType + receivedHeader[7] + receivedHeader[8] + sum(receivedData[:-2])
 
-                packetPayload = []
+        ## Calculate full checksum of the 2 separate checksum bytes
+        receivedChecksum = receivedData[-2] << 8 | receivedData[-1]
 
-                ## Collect package payload (ignore the last 2 checksum bytes)
-                for j in range(9, 9 + packetPayloadLength - 2):
-                    packetPayload.append(receivedPacketData[j])
-                    packetChecksum += receivedPacketData[j]
+        if ( receivedChecksum != packetChecksum & 0xFFFF ):
+            raise Exception('The received packet is corrupted (the checksum is wrong)!')
 
-                ## Calculate full checksum of the 2 separate checksum bytes
-                receivedChecksum = self.__leftShift(receivedPacketData[i - 2], 8)
-                receivedChecksum = receivedChecksum | self.__leftShift(receivedPacketData[i - 1], 0)
+        ## Every acknowledge starts with its confirmation code
+        if ( packetType == Finger.ACKPACKET and packetPayloadLength < 3 ):
+            raise Exception('The received acknowledge packet has no confirmation code!')
 
-                if ( receivedChecksum != packetChecksum ):
-                    raise Exception('The received packet is corrupted (the checksum is wrong)!')
-
-                return (packetType, packetPayload)
+        return (packetType, receivedData[:-2].tobytes())
 
     def verifyPassword(self):
         """
@@ -277,14 +326,16 @@ class PyFingerprint(object):
 
         ## DEBUG: Sensor password is correct
         if ( receivedPacketPayload[0] == Finger.OK ):
+            ## Take the system parameter snapshot once the sensor is connected
+            if ( self.__systemParameters is None ):
+                self.getSystemParameters()
+
             return True
 
         elif ( receivedPacketPayload[0] == Finger.ERROR_COMMUNICATION ):
             raise Exception('Communication error')
 
-        elif ( receivedPacketPayload[0] == Finger.ADDRCODE
-
- ):
+        elif ( receivedPacketPayload[0] == Finger.ERROR_ADDRCODE ):
             raise Exception('The address is wrong')
 
         ## DEBUG: Sensor password is wrong
@@ -378,6 +429,9 @@ class PyFingerprint(object):
         ## DEBUG: Address set was successful
         if ( receivedPacketPayload[0] == Finger.OK ):
             self.__address = newAddress
+            self.__headerPrefix = packetHeader(newAddress)
+            self.__fixedFrames = {}
+            self.__updateSystemParameter(4, newAddress)
             return True
 
         elif ( receivedPacketPayload[0] == Finger.ERROR_COMMUNICATION ):
@@ -441,6 +495,16 @@ class PyFingerprint(object):
 
         ## DEBUG: Parameter set was successful
         if ( receivedPacketPayload[0] == Finger.OK ):
+            ## Keep the cached snapshot in sync (see `getSystemParameters()` for the indices)
+            if ( parameterNumber == Finger.SETSYSTEMPARAMETER_BAUDRATE ):
+                self.__updateSystemParameter(6, parameterValue)
+
+            elif ( parameterNumber == Finger.SETSYSTEMPARAMETER_SECURITY_LEVEL ):
+                self.__updateSystemParameter(3, parameterValue)
+
+            else:
+                self.__updateSystemParameter(5, parameterValue)
+
             return True
 
         elif ( receivedPacketPayload[0] == Finger.ERROR_COMMUNICATION ):
@@ -503,10 +567,383 @@ class PyFingerprint(object):
 
         self.setSystemParameter(Finger.SETSYSTEMPARAMETER_PACKAGE_SIZE, packetMaxSizeType)
 
+    def __reopenSerial(self, baudRate):
+        """
+        Closes the serial port and opens it again at the given baud rate.
+
+        Arguments:
+            baudRate (int): The baud rate
+        """
+
+        self.__serial.close()
+        self.__serial.baudrate = baudRate
+        self.__serial.open()
+
+    def __probe(self, timeout = None):
+        """
+        Checks whether the sensor answers at the current port speed.
+
+        Arguments:
+            timeout (float): The read timeout of the probe, the port timeout by default
+
+        Returns:
+            True if the sensor answered or False otherwise.
+        """
+
+        portTimeout = self.__serial.timeout
+
+        if ( timeout is not None ):
+            self.__serial.timeout = timeout
+
+        try:
+            return self.verifyPassword()
+
+        except Exception:
+            return False
+
+        finally:
+            self.__serial.timeout = portTimeout
+            ## A late answer of a failed probe must not be read by the next command
+            self.__serial.reset_input_buffer()
+
+    def recoverBaudRate(self, candidates = None, probeTimeout = 0.5):
+        """
+        Finds a sensor that does not answer at the port speed and sets it to the port speed again.
+
+        After an unclean shutdown (see `enableFastLink()`) the sensor keeps
+        the fast baud rate while a new session opens the port at the
+        configured one. The port speed is probed once more first, so a
+        single lost answer does not change the sensor baud rate.
+
+        Arguments:
+            candidates (list): Baud rates to try, 115200 first and then all other multiples of 9600 by default
+            probeTimeout (float): Seconds to wait for an answer per baud rate
+
+        Returns:
+            The baud rate the sensor was found at (int).
+
+        Raises:
+            Exception: if the sensor does not answer at any baud rate
+        """
+
+        baudRate = self.__serial.baudrate
+
+        if ( self.__probe() == True ):
+            return baudRate
+
+        if ( candidates is None ):
+            candidates = [ 115200 ] + [ 9600 * n for n in range(11, 0, -1) ]
+
+        for candidate in candidates:
+            if ( candidate == baudRate ):
+                continue
+
+            self.__reopenSerial(candidate)
+
+            if ( self.__probe(probeTimeout) == False ):
+                continue
+
+            ## The acknowledge still arrives at the found baud rate
+            self.setBaudRate(baudRate)
+            self.__reopenSerial(baudRate)
+
+            if ( self.__probe() == False ):
+                raise Exception('The sensor does not answer after the baud rate change')
+
+            self.refresh()
+            return candidate
+
+        self.__reopenSerial(baudRate)
+        raise Exception('The sensor does not answer at any baud rate')
+
+    def enableFastLink(self, baudRate = 115200, packetSize = 256, restoreOnClose = True):
+        """
+        Raises the sensor baud rate and data packet size and reopens the port at the new speed.
+
+        If the sensor does not answer at the new speed, the port goes back to the previous one.
+
+        Arguments:
+            baudRate (int): The baud rate to use. Must be a multiple of 9600!
+            packetSize (int): The data packet size. 32, 64, 128 and 256 are supported.
+            restoreOnClose (bool): Set the previous values again in `close()`
+
+        Returns:
+            A tuple that contains the baud rate and the packet size in use afterwards.
+
+        Raises:
+            ValueError: if passed baud rate or packet size are invalid
+            Exception: if the sensor does not answer
+        """
+
+        if ( baudRate < 9600 or baudRate > 115200 or baudRate % 9600 != 0 ):
+            raise ValueError('The given baud rate is invalid!')
+
+        if ( packetSize not in (32, 64, 128, 256) ):
+            raise ValueError('Invalid packet size')
+
+        if ( self.__probe() == False ):
+            raise Exception('The sensor does not answer')
+
+        previousBaudRate = self.__serial.baudrate
+        previousPacketSize = self.getMaxPacketSize()
+
+        if ( restoreOnClose == True and self.__originalLink is None ):
+            self.__originalLink = (previousBaudRate, previousPacketSize)
+
+        if ( packetSize != previousPacketSize ):
+            self.setMaxPacketSize(packetSize)
+
+        if ( baudRate != previousBaudRate ):
+            ## The acknowledge still arrives at the previous baud rate
+            self.setBaudRate(baudRate)
+            self.__reopenSerial(baudRate)
+
+            if ( self.__probe() == False ):
+                ## DEBUG: The sensor kept its speed or the line does not carry the new one
+                self.__reopenSerial(previousBaudRate)
+
+                if ( self.__probe() == False ):
+                    ## The sensor switched, but the answer was lost: switch it back from the new speed
+                    self.__reopenSerial(baudRate)
+
+                    if ( self.__probe() == True ):
+                        self.setBaudRate(previousBaudRate)
+
+                    self.__reopenSerial(previousBaudRate)
+
+                    if ( self.__probe() == False ):
+                        raise Exception('The sensor does not answer after the baud rate change')
+
+                else:
+                    ## Keep the stored value in line with the speed in use
+                    self.setBaudRate(previousBaudRate)
+
+                self.refresh()
+
+        return (self.__serial.baudrate, self.getMaxPacketSize())
+
+    def restoreLink(self):
+        """
+        Sets the baud rate and packet size in use before `enableFastLink()` again.
+
+        Raises:
+            Exception: if any error occurs
+        """
+
+        if ( self.__originalLink is None ):
+            return
+
+        baudRate, packetSize = self.__originalLink
+        self.__originalLink = None
+
+        if ( self.getMaxPacketSize() != packetSize ):
+            self.setMaxPacketSize(packetSize)
+
+        if ( self.__serial.baudrate != baudRate ):
+            self.setBaudRate(baudRate)
+            self.__reopenSerial(baudRate)
+
+    def close(self):
+        """
+        Restores the link settings (see `enableFastLink()`) and closes the serial port.
+
+        Raises:
+            Exception: if any error occurs
+        """
+
+        if ( self.__serial is not None and self.__serial.isOpen() == True ):
+            try:
+                self.restoreLink()
+
+            finally:
+                self.__serial.close()
+
+    def enableMetrics(self, metrics = None):
+        """
+        Starts recording latencies and wire counters (see `functions.metrics`).
+
+        The recording wrappers are installed on this instance only. Without
+        them (the default, or after `disableMetrics()`) the driver runs its
+        plain methods, so disabled metrics cost nothing.
+
+        Arguments:
+            metrics (CommandMetrics): Collect into this object, a new one by default
+
+        Returns:
+            The metrics (CommandMetrics).
+        """
+
+        import inspect
+        import time
+        from .metrics import CommandMetrics
+
+        self.disableMetrics()
+
+        if ( metrics is None ):
+            metrics = CommandMetrics()
+
+        perfCounter = time.perf_counter
+        serialObject = self.__serial
+        serialWrite = serialObject.write
+        writePacket = self.__writePacket
+        readExactly = self.__readExactly
+        readPacket = self.__readPacket
+
+        ## The sensor answers commands in order: (instruction, send time) of the
+        ## unanswered ones, the instruction of the last command written and of
+        ## the last answer, bytes and read times of the current packet
+        pending = collections.deque()
+        state = { 'written': None, 'answered': None, 'writeTime': 0.0, 'readBytes': 0, 'reads': [] }
+
+        def recordedWrite(data):
+            started = perfCounter()
+            result = serialWrite(data)
+            state['writeTime'] = perfCounter() - started
+
+            ## Walk the frames by their length fields, data packets count
+            ## for the command written before them
+            offset = 0
+            while ( offset + 9 < len(data) ):
+                frameLength = 9 + (data[offset + 7] << 8 | data[offset + 8])
+                if ( data[offset + 6] == Finger.COMMANDPACKET ):
+                    state['written'] = data[offset + 9]
+                    pending.append((state['written'], started))
+
+                entry = metrics.opcode(state['written'])
+                entry.packetsSent += 1
+                entry.bytesSent += min(frameLength, len(data) - offset)
+                offset += frameLength
+
+            metrics.opcode(state['written']).write.observe(state['writeTime'])
+            return result
+
+        def recordedWritePacket(packetType, packetPayload):
+            started = perfCounter()
+            writePacket(packetType, packetPayload)
+
+            ## Without the serial write recorded by recordedWrite()
+            metrics.opcode(state['written']).encode.observe(max(0.0, perfCounter() - started - state['writeTime']))
+
+        def recordedReadExactly(length):
+            started = perfCounter()
+            data = readExactly(length)
+            state['reads'].append(perfCounter() - started)
+            state['readBytes'] += len(data)
+            return data
+
+        def recordedReadPacket():
+            state['reads'] = []
+            state['readBytes'] = 0
+            started = perfCounter()
+
+            try:
+                packet = readPacket()
+
+            except Exception as e:
+                entry = metrics.opcode(pending[0][0] if pending else state['answered'])
+                entry.bytesReceived += state['readBytes']
+                entry.errors += 1
+                if ( isinstance(e, ResponseTimeout) ):
+                    entry.timeouts += 1
+
+                ## The caller gives up on the commands waiting for an answer
+                pending.clear()
+                raise
+
+            finished = perfCounter()
+
+            ## An acknowledge answers the oldest pending command, data packets
+            ## belong to the last answered one
+            if ( packet[0] == Finger.ACKPACKET and pending ):
+                (state['answered'], sent) = pending.popleft()
+                entry = metrics.opcode(state['answered'])
+                entry.roundtrip.observe(finished - sent)
+            else:
+                entry = metrics.opcode(state['answered'])
+
+            reads = state['reads']
+            entry.packetsReceived += 1
+            entry.bytesReceived += state['readBytes']
+            entry.wait.observe(reads[0])
+            if ( len(reads) > 1 ):
+                entry.read.observe(sum(reads[1:]))
+            entry.parse.observe(max(0.0, finished - started - sum(reads)))
+
+            if ( packet[0] == Finger.ACKPACKET and len(packet[1]) > 0 ):
+                entry.statuses[packet[1][0]] = entry.statuses.get(packet[1][0], 0) + 1
+
+            return packet
+
+        def recordedCommand(name, method):
+            def command(*args, **kwargs):
+                started = perfCounter()
+                try:
+                    result = method(*args, **kwargs)
+                except BaseException:
+                    metrics.observeCommand(name, perfCounter() - started, True)
+                    raise
+                metrics.observeCommand(name, perfCounter() - started, False)
+                return result
+
+            command.__name__ = name
+            command.__doc__ = method.__doc__
+            return command
+
+        serialObject.write = recordedWrite
+        self.__writePacket = recordedWritePacket
+        self.__readExactly = recordedReadExactly
+        self.__readPacket = recordedReadPacket
+        patched = ['_PyFingerprint__writePacket', '_PyFingerprint__readExactly', '_PyFingerprint__readPacket']
+
+        ## Generators only return their iterator, their commands are recorded per instruction
+        for (name, function) in vars(PyFingerprint).items():
+            if ( name.startswith('_') or name.endswith('Metrics') or not inspect.isfunction(function) or inspect.isgeneratorfunction(function) ):
+                continue
+
+            setattr(self, name, recordedCommand(name, getattr(self, name)))
+            patched.append(name)
+
+        self.__metrics = metrics
+        self.__metricsPatched = (serialObject, patched)
+
+        return metrics
+
+    def disableMetrics(self):
+        """
+        Stops recording, the collected metrics stay readable.
+        """
+
+        if ( self.__metricsPatched is None ):
+            return
+
+        (serialObject, patched) = self.__metricsPatched
+
+        for name in patched:
+            delattr(self, name)
+
+        if ( 'write' in vars(serialObject) ):
+            del serialObject.write
+
+        self.__metrics = None
+        self.__metricsPatched = None
+
+    def getMetrics(self):
+        """
+        Gets the metrics being recorded.
+
+        Returns:
+            The metrics (CommandMetrics) or None if disabled.
+        """
+
+        return self.__metrics
+
     def getSystemParameters(self):
         """
         Gets all available system information of the sensor.
 
+        The result is kept as the snapshot used by `getStorageCapacity()`,
+        `getSecurityLevel()`, `getMaxPacketSize()` and `getBaudRate()`.
+
         Returns:
             A tuple that contains the following information:
             0: integer(2 bytes) The status register.
@@ -545,7 +982,8 @@ class PyFingerprint(object):
             packetLength       = self.__leftShift(receivedPacketPayload[13], 8) | self.__leftShift(receivedPacketPayload[14], 0)
             baudRate           = self.__leftShift(receivedPacketPayload[15], 8) | self.__leftShift(receivedPacketPayload[16], 0)
             
-            return (statusRegister, systemID, storageCapacity, securityLevel, deviceAddress, packetLength, baudRate)
+            self.__systemParameters = (statusRegister, systemID, storageCapacity, securityLevel, deviceAddress, packetLength, baudRate)
+            return self.__systemParameters
 
         elif ( receivedPacketPayload[0] == Finger.ERROR_COMMUNICATION ):
             raise Exception('Communication error')
@@ -553,6 +991,50 @@ class PyFingerprint(object):
         else:
             raise Exception('Unknown error '+ hex(receivedPacketPayload[0]))
 
+    def __cachedSystemParameters(self):
+        """
+        Gets the system parameter snapshot, reading it from the sensor if there is none yet.
+
+        Returns:
+            The tuple described in `getSystemParameters()`.
+
+        Raises:
+            Exception: if any error occurs
+        """
+
+        if ( self.__systemParameters is None ):
+            return self.getSystemParameters()
+
+        return self.__systemParameters
+
+    def __updateSystemParameter(self, index, value):
+        """
+        Replaces one value of the system parameter snapshot.
+
+        Arguments:
+            index (int): The index in the tuple described in `getSystemParameters()`
+            value (int): The new value
+        """
+
+        if ( self.__systemParameters is not None ):
+            systemParameters = list(self.__systemParameters)
+            systemParameters[index] = value
+            self.__systemParameters = tuple(systemParameters)
+
+    def refresh(self):
+        """
+        Drops the cached system parameters and reads them again from the sensor.
+
+        Returns:
+            The tuple described in `getSystemParameters()`.
+
+        Raises:
+            Exception: if any error occurs
+        """
+
+        self.__systemParameters = None
+        return self.getSystemParameters()
+
     def getStorageCapacity(self):
         """
         Gets the sensor storage capacity.
@@ -564,7 +1046,7 @@ class PyFingerprint(object):
             Exception: if any error occurs
         """
 
-        return self.getSystemParameters()[2]
+        return self.__cachedSystemParameters()[2]
 
     def getSecurityLevel(self):
         """
@@ -577,7 +1059,7 @@ class PyFingerprint(object):
             Exception: if any error occurs
         """
 
-        return self.getSystemParameters()[3]
+        return self.__cachedSystemParameters()[3]
 
     def getMaxPacketSize(self):
         """
@@ -591,13 +1073,13 @@ class PyFingerprint(object):
             Exception: if any error occurs
         """
 
-        packetMaxSizeType = self.getSystemParameters()[5]
+        packetMaxSizeType = self.__cachedSystemParameters()[5]
 
         try:
             packetSizes = [32, 64, 128, 256]
             packetSize = packetSizes[packetMaxSizeType]
 
-        except KeyError:
+        except IndexError:
             raise ValueError("Invalid packet size")
 
         return packetSize
@@ -613,17 +1095,17 @@ class PyFingerprint(object):
             Exception: if any error occurs
         """
 
-        return self.getSystemParameters()[6] * 9600
+        return self.__cachedSystemParameters()[6] * 9600
 
-    def getTemplateIndex(self, page):
+    def __readTemplateIndexPage(self, page):
         """
-        Gets a list of the template positions with usage indicator.
+        Reads one raw page of the template index table.
 
         Arguments:
             page (int): The page (value between 0 and 3).
 
         Returns:
-            The list.
+            The page bytes (bytes). Bit p of byte n is set if position 8 * n + p is used.
 
         Raises:
             ValueError: if passed page is invalid
@@ -649,19 +1131,8 @@ class PyFingerprint(object):
 
         ## DEBUG: Read index table successfully
         if ( receivedPacketPayload[0] == Finger.OK ):
-
-            templateIndex = []
-
             ## Contain the table page bytes (skip the first status byte)
-            pageElements = receivedPacketPayload[1:]
-
-            for pageElement in pageElements:
-                ## Test every bit (bit = template position is used indicator) of a table page element
-                for p in range(0, 7 + 1):
-                    positionIsUsed = (self.__bitAtPosition(pageElement, p) == 1)
-                    templateIndex.append(positionIsUsed)
-
-            return templateIndex
+            return receivedPacketPayload[1:]
 
         elif ( receivedPacketPayload[0] == Finger.ERROR_COMMUNICATION ):
             raise Exception('Communication error')
@@ -669,66 +1140,220 @@ class PyFingerprint(object):
         else:
             raise Exception('Unknown error '+ hex(receivedPacketPayload[0]))
 
-    def getTemplateCount(self):
+    def getTemplateIndex(self, page):
         """
-        Gets the number of stored templates.
+        Gets a list of the template positions with usage indicator.
+
+        Arguments:
+            page (int): The page (value between 0 and 3).
 
         Returns:
-            The template count (int).
+            The list.
 
         Raises:
+            ValueError: if passed page is invalid
             Exception: if any error occurs
         """
 
-        packetPayload = (
-            Finger.TEMPLATECOUNT,
-        )
-
-        self.__writePacket(Finger.COMMANDPACKET, packetPayload)
-        receivedPacket = self.__readPacket()
+        pageElements = self.__readTemplateIndexPage(page)
 
-        receivedPacketType = receivedPacket[0]
-        receivedPacketPayload = receivedPacket[1]
+        templateIndex = []
 
-        if ( receivedPacketType != Finger.ACKPACKET ):
-            raise Exception('The received packet is no ack packet!')
+        for pageElement in pageElements:
+            ## Test every bit (bit = template position is used indicator) of a table page element
+            for p in range(0, 7 + 1):
+                positionIsUsed = (self.__bitAtPosition(pageElement, p) == 1)
+                templateIndex.append(positionIsUsed)
 
-        ## DEBUG: Read successfully
-        if ( receivedPacketPayload[0] == Finger.OK ):
-            templateCount = self.__leftShift(receivedPacketPayload[1], 8)
-            templateCount = templateCount | self.__leftShift(receivedPacketPayload[2], 0)
-            return templateCount
+        return templateIndex
 
-        elif ( receivedPacketPayload[0] == Finger.ERROR_COMMUNICATION ):
-            raise Exception('Communication error')
+    def getTemplateOccupancy(self, refresh = False):
+        """
+        Gets the host-side bitmap of used template positions.
 
-        else:
-            raise Exception('Unknown error '+ hex(receivedPacketPayload[0]))
+        The bitmap is read from the template index pages on first use and
+        then kept up to date by `storeTemplate()`, `deleteTemplate()` and
+        `clearDatabase()`.
 
-    def readImage(self):
-        """
-        Reads the image of a finger and stores it in image Finger.
+        Arguments:
+            refresh (bool): Read the index pages again
 
         Returns:
-            True if image was read successfully or False otherwise.
+            The bitmap (TemplateOccupancy).
 
         Raises:
             Exception: if any error occurs
         """
 
-        packetPayload = (
-            Finger.READIMAGE,
-        )
+        if ( self.__occupancy is None or refresh == True ):
+            storageCapacity = self.getStorageCapacity()
 
+            ## One index page covers 256 positions
+            pageCount = min(4, (storageCapacity + 255) // 256)
+            pages = [ self.__readTemplateIndexPage(page) for page in range(0, pageCount) ]
 
-        self.__writePacket(Finger.COMMANDPACKET, packetPayload)
-        receivedPacket = self.__readPacket()
+            self.__occupancy = TemplateOccupancy.fromIndexPages(storageCapacity, pages)
 
-        receivedPacketType = receivedPacket[0]
-        receivedPacketPayload = receivedPacket[1]
+        return self.__occupancy
 
-        if ( receivedPacketType != Finger.ACKPACKET ):
-            raise Exception('The received packet is no ack packet!')
+    def setCharacteristicsCache(self, cache):
+        """
+        Attaches a host-side characteristics cache that is kept in sync with the sensor.
+
+        Cached positions that are not used on the sensor are dropped. The
+        other entries are trusted: a template replaced at the same position
+        by another host goes unnoticed, so clear the cache in that case.
+
+        Arguments:
+            cache (CharacteristicsCache): The cache or None to detach it
+
+        Raises:
+            ValueError: if the cache is smaller than the storage capacity
+            Exception: if any error occurs
+        """
+
+        if ( cache is not None ):
+            if ( cache.capacity < self.getStorageCapacity() ):
+                raise ValueError('The cache does not cover the storage capacity!')
+
+            occupancy = self.getTemplateOccupancy()
+
+            for positionNumber in list(cache.positions()):
+                if ( occupancy.isOccupied(positionNumber) == False ):
+                    cache.discard(positionNumber)
+
+        self.__characteristicsCache = cache
+
+    def getCharacteristicsCache(self):
+        """
+        Gets the attached characteristics cache.
+
+        Returns:
+            The cache (CharacteristicsCache) or None.
+        """
+
+        return self.__characteristicsCache
+
+    def lookupCharacteristics(self, positionNumber, charBufferNumber = Finger.CHARBUFFER1):
+        """
+        Gets the characteristics of a stored template, from the cache if possible.
+
+        On a cache miss the template is loaded into the given char buffer and
+        downloaded once.
+
+        Arguments:
+            positionNumber (int): The position
+            charBufferNumber (int): The char Finger used on a cache miss
+
+        Returns:
+            A tuple that contains the characteristics (bytes) and their SHA-256 digest (bytes).
+
+        Raises:
+            Exception: if no cache is attached or any error occurs
+        """
+
+        cache = self.__characteristicsCache
+
+        if ( cache is None ):
+            raise Exception('No characteristics cache attached')
+
+        cached = cache.get(positionNumber)
+
+        if ( cached is not None ):
+            return cached
+
+        self.loadTemplate(positionNumber, charBufferNumber)
+        characteristics = self.downloadCharacteristics(charBufferNumber)
+
+        return (characteristics, cache.put(positionNumber, characteristics))
+
+    def fillCharacteristicsCache(self, charBufferNumber = Finger.CHARBUFFER1):
+        """
+        Downloads all stored templates that are not cached yet.
+
+        Arguments:
+            charBufferNumber (int): The char Finger used for the transfer
+
+        Returns:
+            The number of downloaded templates (int).
+
+        Raises:
+            Exception: if no cache is attached or any error occurs
+        """
+
+        cache = self.__characteristicsCache
+
+        if ( cache is None ):
+            raise Exception('No characteristics cache attached')
+
+        missing = [ positionNumber for positionNumber in self.getTemplateOccupancy().positions()
+                    if positionNumber not in cache ]
+
+        for positionNumber in missing:
+            self.lookupCharacteristics(positionNumber, charBufferNumber)
+
+        return len(missing)
+
+    def getTemplateCount(self):
+        """
+        Gets the number of stored templates.
+
+        Returns:
+            The template count (int).
+
+        Raises:
+            Exception: if any error occurs
+        """
+
+        packetPayload = (
+            Finger.TEMPLATECOUNT,
+        )
+
+        self.__writePacket(Finger.COMMANDPACKET, packetPayload)
+        receivedPacket = self.__readPacket()
+
+        receivedPacketType = receivedPacket[0]
+        receivedPacketPayload = receivedPacket[1]
+
+        if ( receivedPacketType != Finger.ACKPACKET ):
+            raise Exception('The received packet is no ack packet!')
+
+        ## DEBUG: Read successfully
+        if ( receivedPacketPayload[0] == Finger.OK ):
+            templateCount = self.__leftShift(receivedPacketPayload[1], 8)
+            templateCount = templateCount | self.__leftShift(receivedPacketPayload[2], 0)
+            return templateCount
+
+        elif ( receivedPacketPayload[0] == Finger.ERROR_COMMUNICATION ):
+            raise Exception('Communication error')
+
+        else:
+            raise Exception('Unknown error '+ hex(receivedPacketPayload[0]))
+
+    def readImage(self):
+        """
+        Reads the image of a finger and stores it in image Finger.
+
+        Returns:
+            True if image was read successfully or False otherwise.
+
+        Raises:
+            Exception: if any error occurs
+        """
+
+        packetPayload = (
+            Finger.READIMAGE,
+        )
+
+
+        self.__writePacket(Finger.COMMANDPACKET, packetPayload)
+        receivedPacket = self.__readPacket()
+
+        receivedPacketType = receivedPacket[0]
+        receivedPacketPayload = receivedPacket[1]
+
+        if ( receivedPacketType != Finger.ACKPACKET ):
+            raise Exception('The received packet is no ack packet!')
 
         ## DEBUG: Image read successful
         if ( receivedPacketPayload[0] == Finger.OK ):
@@ -747,26 +1372,17 @@ class PyFingerprint(object):
         else:
             raise Exception('Unknown error '+ hex(receivedPacketPayload[0]))
 
-    ## TODO:
-    ## Implementation of uploadImage()
-
-    def downloadImage(self, imageDestination):
+    def downloadImageData(self):
         """
-        Downloads the image from image Finger.
+        Downloads the raw image from image Finger.
 
-        Arguments:
-            imageDestination (str): Path to image
+        Returns:
+            The image data (bytes), two 4 bit pixels per byte.
 
         Raises:
-            ValueError: if directory is not writable
             Exception: if any error occurs
         """
 
-        destinationDirectory = os.path.dirname(imageDestination)
-
-        if ( os.access(destinationDirectory, os.W_OK) == False ):
-            raise ValueError('The given destination directory "' + destinationDirectory + '" is not writable!')
-
         packetPayload = (
             Finger.DOWNLOADIMAGE,
         )
@@ -789,9 +1405,7 @@ class PyFingerprint(object):
         elif ( receivedPacketPayload[0] == Finger.ERROR_COMMUNICATION ):
             raise Exception('Communication error')
 
-        elif ( receivedPacketPayload[0] == Finger.ERROR_DOWNLOADIMAGE
-
- ):
+        elif ( receivedPacketPayload[0] == Finger.ERROR_DOWNLOADIMAGE ):
             raise Exception('Could not download image')
 
         else:
@@ -812,32 +1426,53 @@ class PyFingerprint(object):
 
             imageData.append(receivedPacketPayload)
 
-        ## Initialize image
-        resultImage = Finger.new('L', (256, 288), 'white')
-        pixels = resultFinger.load()
-        (resultImageWidth, resultImageHeight) = resultFinger.size
-        row = 0
-        column = 0
-
-        for y in range(resultImageHeight):
-            for x in range(resultImageWidth):
-
-                ## One byte contains two pixels
-                ## Thanks to Danylo Esterman <soundcracker@gmail.com> for the "multiple with 17" improvement:
-                if (x % 2 == 0):
-                    ## Draw left 4 Bits one byte of package
-                    pixels[x, y] = (imageData[row][column]  >> 4) * 17
-                else:
-                    ## Draw right 4 Bits one byte of package
-                    pixels[x, y] = (imageData[row][column] & 0x0F) * 17
-                    column += 1
+        return b''.join(imageData)
+
+    def downloadImageArray(self):
+        """
+        Downloads the image from image Finger as pixel array.
+
+        Returns:
+            A uint8 numpy array of shape (288, 256).
+
+        Raises:
+            Exception: if any error occurs
+        """
+
+        ## numpy is only loaded once an image is decoded
+        from .image import decodeImage
+
+        return decodeImage(self.downloadImageData())
+
+    def downloadImage(self, imageDestination = None):
+        """
+        Downloads the image from image Finger.
+
+        Arguments:
+            imageDestination (str): Optional path to save the image to
+
+        Returns:
+            The image (PIL.Image.Image).
+
+        Raises:
+            ValueError: if directory is not writable
+            Exception: if any error occurs
+        """
+
+        if ( imageDestination is not None ):
+            destinationDirectory = os.path.dirname(imageDestination) or '.'
+
+            if ( os.access(destinationDirectory, os.W_OK) == False ):
+                raise ValueError('The given destination directory "' + destinationDirectory + '" is not writable!')
 
-                    ## Reset
-                    if (column == len(imageData[row])):
-                        row += 1
-                        column = 0
+        from .image import toImage
 
-        resultFinger.save(imageDestination)
+        resultImage = toImage(self.downloadImageArray())
+
+        if ( imageDestination is not None ):
+            resultImage.save(imageDestination)
+
+        return resultImage
 
     def convertImage(self, charBufferNumber = Finger.CHARBUFFER1):
         """
@@ -945,19 +1580,11 @@ class PyFingerprint(object):
             Exception: if any error occurs
         """
 
-        if positionNumber == -1:
-            # Check in database
-            for page in range(0, 4):
-                if positionNumber >=0:
-                    break
-                templateIndex = self.getTemplateIndex(page)
-                for i in range(0, len(templateIndex)):
-                    if templateIndex[i] == False:
-                        print(templateIndex[i])
-                        # Calculate position number 
-                        positionNumber = (len(templateIndex) * page) + i
-                        break
-                    
+        if ( positionNumber == -1 ):
+            positionNumber = self.getTemplateOccupancy().firstFree()
+
+            if ( positionNumber == -1 ):
+                raise Exception('There is no free position left to store the template')
 
         if ( positionNumber < 0x0000 or positionNumber >= self.getStorageCapacity() ):
             raise ValueError('The given position number is invalid!')
@@ -983,6 +1610,13 @@ class PyFingerprint(object):
 
         ## DEBUG: Template stored successful
         if ( receivedPacketPayload[0] == Finger.OK ):
+            if ( self.__occupancy is not None ):
+                self.__occupancy.setOccupied(positionNumber)
+
+            ## The stored characteristics are not known on the host
+            if ( self.__characteristicsCache is not None ):
+                self.__characteristicsCache.discard(positionNumber)
+
             return positionNumber
 
         elif ( receivedPacketPayload[0] == Finger.ERROR_COMMUNICATION ):
@@ -1064,6 +1698,155 @@ class PyFingerprint(object):
             raise Exception('Unknown error '+ hex(receivedPacketPayload[0]))
 
 
+    def __recordMatch(self, positionNumber):
+        """
+        Remembers a matched position for the hot-first order of `searchOccupied()`.
+
+        Arguments:
+            positionNumber (int): The matched position
+        """
+
+        if ( len(self.__recentMatches) == self.__recentMatches.maxlen ):
+            oldestPosition = self.__recentMatches[0]
+            self.__matchCounts[oldestPosition] -= 1
+
+            if ( self.__matchCounts[oldestPosition] == 0 ):
+                del self.__matchCounts[oldestPosition]
+
+        self.__recentMatches.append(positionNumber)
+        self.__matchCounts[positionNumber] = self.__matchCounts.get(positionNumber, 0) + 1
+
+    def searchWindows(self, windowSize = 128, maxGap = 8, hotCount = 16):
+        """
+        Builds the search windows of the used positions, hottest first.
+
+        The `hotCount` most often matched positions of the recent searches
+        come first in small windows of their own, ordered by their matches.
+        The other used positions follow in position order. Positions that
+        are at most `maxGap` free positions apart share a window and no
+        window spans more than `windowSize` positions.
+
+        Arguments:
+            windowSize (int): The largest number of positions of a window
+            maxGap (int): The largest number of free positions inside a window
+            hotCount (int): The number of recently matched positions searched first
+
+        Returns:
+            A list of tuples (position start, count).
+
+        Raises:
+            ValueError: if passed window parameters are invalid
+            Exception: if any error occurs
+        """
+
+        if ( windowSize < 1 or maxGap < 0 or hotCount < 0 ):
+            raise ValueError('The given window parameters are invalid!')
+
+        occupancy = self.getTemplateOccupancy()
+
+        hotPositions = sorted(self.__matchCounts, key = self.__matchCounts.get, reverse = True)[:hotCount]
+        hotWindows = []
+
+        for positionNumber in sorted(hotPositions):
+            if ( occupancy.isOccupied(positionNumber) == False ):
+                continue
+
+            if ( hotWindows and positionNumber - (hotWindows[-1][0] + hotWindows[-1][1]) <= maxGap ):
+                hotWindows[-1][1] = positionNumber + 1 - hotWindows[-1][0]
+                hotWindows[-1][2] += self.__matchCounts[positionNumber]
+            else:
+                hotWindows.append([positionNumber, 1, self.__matchCounts[positionNumber]])
+
+        hotWindows.sort(key = lambda window: window[2], reverse = True)
+
+        windows = [ (positionStart, count) for (positionStart, count, matches) in hotWindows ]
+        searched = set()
+
+        for (positionStart, count) in windows:
+            searched.update(range(positionStart, positionStart + count))
+
+        ## Windows of the remaining used positions
+        windowStart = None
+        windowEnd = None
+
+        for (positionStart, count) in occupancy.ranges():
+            for positionNumber in range(positionStart, positionStart + count):
+                if ( positionNumber in searched ):
+                    continue
+
+                if ( windowStart is not None and positionNumber - windowEnd <= maxGap and positionNumber - windowStart < windowSize ):
+                    windowEnd = positionNumber + 1
+                    continue
+
+                if ( windowStart is not None ):
+                    windows.append((windowStart, windowEnd - windowStart))
+
+                windowStart = positionNumber
+                windowEnd = positionNumber + 1
+
+        if ( windowStart is not None ):
+            windows.append((windowStart, windowEnd - windowStart))
+
+        return windows
+
+    def searchOccupied(self, charBufferNumber = Finger.CHARBUFFER1, minScore = 0, windowSize = 128, maxGap = 8, hotCount = 16, maxWindows = 2):
+        """
+        Searches only the used positions, starting with the windows of recent matches.
+
+        The search stops at the first match with an accuracy score of at least
+        `minScore`. A weaker match is remembered and the search goes on after it.
+
+        Every window costs a round trip while the sensor itself searches fast,
+        so more than `maxWindows` windows or windows spanning more than half
+        of the capacity are replaced by one search over all positions.
+
+        Arguments:
+            charBufferNumber (int): The char Finger. Use `Finger.CHARBUFFER1` or `Finger.CHARBUFFER2`.
+            minScore (int): The lowest acceptable accuracy score
+            windowSize (int): See `searchWindows()`
+            maxGap (int): See `searchWindows()`
+            hotCount (int): See `searchWindows()`
+            maxWindows (int): The largest number of windows searched one by one
+
+        Returns:
+            A tuple that contains the position number and the accuracy score of
+            the found template or (-1, -1), like `searchTemplate()`.
+
+        Raises:
+            Exception: if any error occurs
+        """
+
+        bestMatch = (-1, -1)
+
+        windows = self.searchWindows(windowSize, maxGap, hotCount)
+        capacity = self.getStorageCapacity()
+
+        if ( len(windows) > maxWindows or sum(count for (positionStart, count) in windows) * 2 > capacity ):
+            windows = [ (0, capacity) ]
+
+        for (positionStart, count) in windows:
+            windowEnd = positionStart + count
+
+            while ( positionStart < windowEnd ):
+                positionNumber, accuracyScore = self.searchTemplate(charBufferNumber, positionStart, windowEnd - positionStart)
+
+                if ( positionNumber == -1 ):
+                    break
+
+                if ( accuracyScore >= minScore ):
+                    self.__recordMatch(positionNumber)
+                    return (positionNumber, accuracyScore)
+
+                if ( accuracyScore > bestMatch[1] ):
+                    bestMatch = (positionNumber, accuracyScore)
+
+                positionStart = positionNumber + 1
+
+        if ( bestMatch[0] != -1 ):
+            self.__recordMatch(bestMatch[0])
+
+        return bestMatch
+
     def loadTemplate(self, positionNumber, charBufferNumber = Finger.CHARBUFFER1):
         """
         Loads an existing template specified by position number to specified char Finger.
@@ -1162,6 +1945,12 @@ class PyFingerprint(object):
 
         ## DEBUG: Template deleted successful
         if ( receivedPacketPayload[0] == Finger.OK ):
+            if ( self.__occupancy is not None ):
+                self.__occupancy.setFree(positionNumber, count)
+
+            if ( self.__characteristicsCache is not None ):
+                self.__characteristicsCache.discard(positionNumber, count)
+
             return True
 
         elif ( receivedPacketPayload[0] == Finger.ERROR_COMMUNICATION ):
@@ -1204,6 +1993,12 @@ class PyFingerprint(object):
 
         ## DEBUG: Database cleared successful
         if ( receivedPacketPayload[0] == Finger.OK ):
+            if ( self.__occupancy is not None ):
+                self.__occupancy.clear()
+
+            if ( self.__characteristicsCache is not None ):
+                self.__characteristicsCache.clear()
+
             return True
 
         elif ( receivedPacketPayload[0] == Finger.ERROR_COMMUNICATION ):
@@ -1262,34 +2057,37 @@ class PyFingerprint(object):
             raise Exception('Unknown error '+ hex(receivedPacketPayload[0]))
 
 
-    def uploadCharacteristics(self, charBufferNumber = Finger.CHARBUFFER1, characteristicsData = [0]):
+    def __encodeDataPackets(self, characteristicsData):
         """
-        Uploads finger characteristics to specified char Finger.
-
-        Author:
-            David Gilson <davgilson@live.fr>
+        Builds the data packet frames to upload characteristics.
 
         Arguments:
-            charBufferNumber (int): The char Finger. Use `Finger.CHARBUFFER1` or `Finger.CHARBUFFER2`.
-            characteristicsData (list): The characteristics
+            characteristicsData (memoryview): The characteristics
 
         Returns:
-            True if everything is right.
-
-        Raises:
-            ValueError: if passed char buffer or characteristics are invalid
-            Exception: if any error occurs
+            The frames (bytes)
         """
 
-        if ( charBufferNumber != Finger.CHARBUFFER1 and charBufferNumber != Finger.CHARBUFFER2 ):
-            raise ValueError('The given char buffer number is invalid!')
+        maxPacketSize = self.getMaxPacketSize()
+        lastPacketStart = ((len(characteristicsData) - 1) // maxPacketSize) * maxPacketSize
 
-        if ( characteristicsData == [0] ):
-            raise ValueError('The characteristics data is required!')
+        ## Slices of the memoryview do not copy the data
+        packets = [ encodePacket(self.__headerPrefix, Finger.DATAPACKET, characteristicsData[lfrom:lfrom + maxPacketSize])
+                    for lfrom in range(0, lastPacketStart, maxPacketSize) ]
+        packets.append(encodePacket(self.__headerPrefix, Finger.ENDDATAPACKET, characteristicsData[lastPacketStart:]))
 
-        maxPacketSize = self.getMaxPacketSize()
+        return b''.join(packets)
 
-        ## Upload command
+    def __startUpload(self, charBufferNumber):
+        """
+        Sends the upload command and waits until the sensor accepts data packets.
+
+        Arguments:
+            charBufferNumber (int): The char Finger.
+
+        Raises:
+            Exception: if any error occurs
+        """
 
         packetPayload = (
             Finger.UPLOADCHARACTERISTICS,
@@ -1307,42 +2105,210 @@ class PyFingerprint(object):
         if ( receivedPacketType != Finger.ACKPACKET ):
             raise Exception('The received packet is no ack packet!')
 
-        ## DEBUG: The sensor will sent follow-up packets
+        ## DEBUG: The sensor will accept follow-up packets
         if ( receivedPacketPayload[0] == Finger.OK ):
             pass
 
         elif ( receivedPacketPayload[0] == Finger.ERROR_COMMUNICATION ):
             raise Exception('Communication error')
 
-        elif ( receivedPacketPayload[0] == Finger.PACKETRESPONSEFAIL
-
- ):
+        elif ( receivedPacketPayload[0] == Finger.ERROR_PACKETRESPONSEFAIL ):
             raise Exception('Could not upload characteristics')
 
         else:
             raise Exception('Unknown error '+ hex(receivedPacketPayload[0]))
 
-        ## Upload data packets
-        packetNumber = int(len(characteristicsData) / maxPacketSize)
+    def __characteristicsView(self, characteristicsData):
+        """
+        Validates characteristics and returns them as memoryview.
 
-        if ( packetNumber <= 1 ):
-            self.__writePacket(Finger.ENDDATAPACKET, characteristicsData)
-        else:
-            i = 1
-            while ( i < packetNumber ):
-                lfrom = (i-1) * maxPacketSize
-                lto = lfrom + maxPacketSize
-                self.__writePacket(Finger.DATAPACKET, characteristicsData[lfrom:lto])
-                i += 1
+        Raises:
+            ValueError: if the characteristics are empty
+        """
+
+        if ( isinstance(characteristicsData, list) ):
+            characteristicsData = bytes(characteristicsData)
+
+        if ( characteristicsData is None or len(characteristicsData) == 0 ):
+            raise ValueError('The characteristics data is required!')
+
+        return memoryview(characteristicsData)
+
+    def uploadCharacteristics(self, charBufferNumber = Finger.CHARBUFFER1, characteristicsData = None, verify = True):
+        """
+        Uploads finger characteristics to specified char Finger.
+
+        Author:
+            David Gilson <davgilson@live.fr>
+
+        Arguments:
+            charBufferNumber (int): The char Finger. Use `Finger.CHARBUFFER1` or `Finger.CHARBUFFER2`.
+            characteristicsData (bytes): The characteristics. Lists of byte values are accepted as well.
+            verify (bool): Download the char buffer again and compare it (doubles the traffic)
+
+        Returns:
+            True if everything is right.
 
-            lfrom = (i-1) * maxPacketSize
-            lto = len(characteristicsData)
-            self.__writePacket(Finger.ENDDATAPACKET, characteristicsData[lfrom:lto])
+        Raises:
+            ValueError: if passed char buffer or characteristics are invalid
+            Exception: if any error occurs
+        """
+
+        if ( charBufferNumber != Finger.CHARBUFFER1 and charBufferNumber != Finger.CHARBUFFER2 ):
+            raise ValueError('The given char buffer number is invalid!')
+
+        characteristicsData = self.__characteristicsView(characteristicsData)
+
+        self.__startUpload(charBufferNumber)
+
+        ## Upload all data packets at once
+        self.__serial.write(self.__encodeDataPackets(characteristicsData))
+
+        if ( verify == False ):
+            return True
 
         ## Verify uploaded characteristics
         characterics = self.downloadCharacteristics(charBufferNumber)
         return (characterics == characteristicsData)
 
+    def restoreTemplates(self, records, verify = 'full', sampleEvery = 10, clear = False, charBufferNumber = Finger.CHARBUFFER1):
+        """
+        Uploads and stores many templates.
+
+        The data packets of a template and its store command are sent in one
+        write after the sensor accepted the upload.
+
+        Arguments:
+            records (iterable): Tuples (position number, characteristics)
+            verify (str): 'full' reads every template back from the char buffer,
+                'sampled' every `sampleEvery`-th one and 'checksum' relies on the
+                packet checksums and a final template count check.
+            sampleEvery (int): The sampling distance of 'sampled'
+            clear (bool): Clear the database first (re-imaging a replacement sensor)
+            charBufferNumber (int): The char Finger used for the transfer.
+
+        Returns:
+            The number of restored templates (int).
+
+        Raises:
+            ValueError: if passed arguments or positions are invalid
+            Exception: if any error occurs or a verification fails
+        """
+
+        restored = 0
+
+        for positionNumber in self.iterRestoreTemplates(records, verify, sampleEvery, clear, charBufferNumber):
+            restored += 1
+
+        return restored
+
+    def iterRestoreTemplates(self, records, verify = 'full', sampleEvery = 10, clear = False, charBufferNumber = Finger.CHARBUFFER1):
+        """
+        Uploads and stores many templates one by one (see `restoreTemplates()`).
+
+        Between two templates the char buffer is not in use, so other
+        commands may be sent while the generator is suspended. Templates
+        stored or deleted meanwhile fail the final check of 'checksum'.
+
+        Arguments:
+            records (iterable): Tuples (position number, characteristics)
+            verify (str): 'full' reads every template back from the char buffer,
+                'sampled' every `sampleEvery`-th one and 'checksum' relies on the
+                packet checksums and a final template count check.
+            sampleEvery (int): The sampling distance of 'sampled'
+            clear (bool): Clear the database first (re-imaging a replacement sensor)
+            charBufferNumber (int): The char Finger used for the transfer.
+
+        Returns:
+            A generator of the restored position numbers (int).
+
+        Raises:
+            ValueError: if passed arguments (on the call, before anything is
+                written) or positions are invalid
+            Exception: if any error occurs or a verification fails
+        """
+
+        if ( verify not in ('full', 'sampled', 'checksum') ):
+            raise ValueError('The given verification mode is invalid!')
+
+        if ( verify == 'sampled' and ( isinstance(sampleEvery, int) == False or sampleEvery < 1 ) ):
+            raise ValueError('The given sampling distance is invalid!')
+
+        if ( charBufferNumber != Finger.CHARBUFFER1 and charBufferNumber != Finger.CHARBUFFER2 ):
+            raise ValueError('The given char buffer number is invalid!')
+
+        ## Generator bodies only run on the first next(), so the checks above are separate
+        return self.__iterRestoreTemplates(records, verify, sampleEvery, clear, charBufferNumber)
+
+    def __iterRestoreTemplates(self, records, verify, sampleEvery, clear, charBufferNumber):
+        """
+        The generator of `iterRestoreTemplates()` with validated arguments.
+        """
+
+        if ( clear == True ):
+            if ( self.clearDatabase() == False ):
+                raise Exception('Could not clear the database')
+
+            expectedCount = 0
+        else:
+            expectedCount = self.getTemplateCount()
+
+        storageCapacity = self.getStorageCapacity()
+        occupancy = self.getTemplateOccupancy()
+        restored = 0
+
+        for (positionNumber, characteristicsData) in records:
+
+            if ( positionNumber < 0x0000 or positionNumber >= storageCapacity ):
+                raise ValueError('The given position number is invalid!')
+
+            characteristicsData = self.__characteristicsView(characteristicsData)
+
+            if ( occupancy.isOccupied(positionNumber) == False ):
+                expectedCount += 1
+
+            self.__startUpload(charBufferNumber)
+
+            storePacket = encodePacket(self.__headerPrefix, Finger.COMMANDPACKET, (
+                Finger.STORETEMPLATE,
+                charBufferNumber,
+                self.__rightShift(positionNumber, 8),
+                self.__rightShift(positionNumber, 0),
+            ))
+
+            self.__serial.write(self.__encodeDataPackets(characteristicsData) + storePacket)
+
+            receivedPacketType, receivedPacketPayload = self.__readPacket()
+
+            if ( receivedPacketType != Finger.ACKPACKET ):
+                raise Exception('The received packet is no ack packet!')
+
+            if ( receivedPacketPayload[0] == Finger.ERROR_INVALIDPOSITION ):
+                raise Exception('Could not store template in position ' + str(positionNumber))
+
+            elif ( receivedPacketPayload[0] == Finger.ERROR_FLASH ):
+                raise Exception('Error writing to flash')
+
+            elif ( receivedPacketPayload[0] != Finger.OK ):
+                raise Exception('Could not store template in position ' + str(positionNumber) + ' (error ' + hex(receivedPacketPayload[0]) + ')')
+
+            occupancy.setOccupied(positionNumber)
+
+            if ( self.__characteristicsCache is not None ):
+                self.__characteristicsCache.put(positionNumber, characteristicsData)
+
+            if ( verify == 'full' or ( verify == 'sampled' and restored % sampleEvery == 0 ) ):
+                ## The char buffer still holds the uploaded characteristics
+                if ( self.downloadCharacteristics(charBufferNumber) != characteristicsData ):
+                    raise Exception('The template for position ' + str(positionNumber) + ' was not uploaded correctly')
+
+            restored += 1
+
+            yield positionNumber
+
+        if ( verify == 'checksum' and self.getTemplateCount() != expectedCount ):
+            raise Exception('The sensor does not hold the expected number of templates')
+
 
     def generateRandomNumber(self):
         """
@@ -1393,10 +2359,9 @@ class PyFingerprint(object):
 
         Arguments:
             charBufferNumber (int): The char Finger. Use `Finger.CHARBUFFER1` or `Finger.CHARBUFFER2`.
-            characteristicsData (list): The characteristics
 
         Returns:
-            The characteristics (list).
+            The characteristics (bytes).
 
         Raises:
             ValueError: if passed char buffer is invalid
@@ -1429,9 +2394,7 @@ class PyFingerprint(object):
         elif ( receivedPacketPayload[0] == Finger.ERROR_COMMUNICATION ):
             raise Exception('Communication error')
 
-        elif ( receivedPacketPayload[0] == Finger.ERROR_DOWNLOADCHARACTERISTICS
-
- ):
+        elif ( receivedPacketPayload[0] == Finger.ERROR_DOWNLOADCHARACTERISTICS ):
             raise Exception('Could not download characteristics')
 
         else:
@@ -1450,7 +2413,102 @@ class PyFingerprint(object):
             if ( receivedPacketType != Finger.DATAPACKET and receivedPacketType != Finger.ENDDATAPACKET ):
                 raise Exception('The received packet is no data packet!')
 
-            for i in range(0, len(receivedPacketPayload)):
-                completePayload.append(receivedPacketPayload[i])
+            completePayload.append(receivedPacketPayload)
+
+        return b''.join(completePayload)
+
+    def downloadCharacteristicsList(self, charBufferNumber = Finger.CHARBUFFER1):
+        """
+        Downloads the finger characteristics as a list of byte values.
+
+        Compatibility shim for callers of the former list based API,
+        prefer `downloadCharacteristics()`.
+
+        Arguments:
+            charBufferNumber (int): The char Finger. Use `Finger.CHARBUFFER1` or `Finger.CHARBUFFER2`.
+
+        Returns:
+            The characteristics (list).
+
+        Raises:
+            ValueError: if passed char buffer is invalid
+            Exception: if any error occurs
+        """
+
+        return list(self.downloadCharacteristics(charBufferNumber))
+
+    def exportTemplates(self, startPosition = 0, charBufferNumber = Finger.CHARBUFFER1):
+        """
+        Downloads the characteristics of all used template positions.
+
+        Only positions marked in the template index are visited. The load and
+        download commands of a position are sent in one write, so the sensor
+        answers both without waiting for the host in between.
+
+        Arguments:
+            startPosition (int): The first position to export
+            charBufferNumber (int): The char Finger used for the transfer.
+
+        Returns:
+            A generator of tuples (position number, characteristics bytes).
+
+        Raises:
+            ValueError: if passed char buffer is invalid
+            Exception: if any error occurs
+        """
+
+        if ( charBufferNumber != Finger.CHARBUFFER1 and charBufferNumber != Finger.CHARBUFFER2 ):
+            raise ValueError('The given char buffer number is invalid!')
+
+        downloadPacket = encodePacket(self.__headerPrefix, Finger.COMMANDPACKET, (
+            Finger.DOWNLOADCHARACTERISTICS,
+            charBufferNumber,
+        ))
+
+        for positionNumber in self.getTemplateOccupancy().positions():
+            if ( positionNumber < startPosition ):
+                continue
+
+            loadPacket = encodePacket(self.__headerPrefix, Finger.COMMANDPACKET, (
+                Finger.LOADTEMPLATE,
+                charBufferNumber,
+                self.__rightShift(positionNumber, 8),
+                self.__rightShift(positionNumber, 0),
+            ))
+
+            self.__serial.write(loadPacket + downloadPacket)
+
+            ## Acknowledge of the load command
+            loadPacketType, loadPacketPayload = self.__readPacket()
+
+            ## Acknowledge of the download command
+            receivedPacketType, receivedPacketPayload = self.__readPacket()
+
+            if ( loadPacketType != Finger.ACKPACKET or receivedPacketType != Finger.ACKPACKET ):
+                raise Exception('The received packet is no ack packet!')
+
+            completePayload = []
+
+            ## The sensor sends the char buffer even if the load failed
+            if ( receivedPacketPayload[0] == Finger.OK ):
+                while ( receivedPacketType != Finger.ENDDATAPACKET ):
+                    receivedPacketType, receivedPacketPayload = self.__readPacket()
+
+                    if ( receivedPacketType != Finger.DATAPACKET and receivedPacketType != Finger.ENDDATAPACKET ):
+                        raise Exception('The received packet is no data packet!')
+
+                    completePayload.append(receivedPacketPayload)
+
+            elif ( receivedPacketPayload[0] == Finger.ERROR_DOWNLOADCHARACTERISTICS ):
+                raise Exception('Could not download characteristics')
+
+            else:
+                raise Exception('Unknown error '+ hex(receivedPacketPayload[0]))
+
+            if ( loadPacketPayload[0] == Finger.ERROR_LOADTEMPLATE ):
+                raise Exception('The template at position ' + str(positionNumber) + ' could not be read')
+
+            elif ( loadPacketPayload[0] != Finger.OK ):
+                raise Exception('Could not load template from position ' + str(positionNumber) + ' (error ' + hex(loadPacketPayload[0]) + ')')
 
-        return completePayload
\ No newline at end of file
+            yield (positionNumber, b''.join(completePayload))
@@ -0,0 +1,966 @@
+import asyncio
+import functools
+import os
+import serial
+from .config import Finger
+from .occupancy import TemplateOccupancy
+from .R305 import encodePacket, packetHeader
+
+"""asyncio driver for the R305 fingerprint sensor"""
+
+
+## Minimum payload length of a successful acknowledge (status byte included)
+ACKLENGTHS = {
+    Finger.GETSYSTEMPARAMETERS: 17,
+    Finger.TEMPLATEINDEX: 33,
+    Finger.TEMPLATECOUNT: 3,
+    Finger.SEARCHTEMPLATE: 5,
+    Finger.COMPARECHARACTERISTICS: 3,
+    Finger.GENERATERANDOMNUMBER: 5,
+}
+
+## Seconds without received bytes after which an interrupted answer is complete
+QUIETTIME = 0.05
+
+
+def _command(method):
+    """
+        Runs a sensor command exclusively on its sensor with a timeout.
+
+        Every decorated method takes an additional keyword argument
+        `timeout` (seconds, defaults to the timeout of the sensor).
+        Commands called from inside another command run directly.
+    """
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, timeout = None, **kwargs):
+        return await self._run(method(self, *args, **kwargs), timeout)
+
+    return wrapper
+
+
+class AsyncPyFingerprint(object):
+    """
+        Manages a R305 fingerprint sensor from an asyncio event loop.
+
+        The serial port is used as non-blocking file descriptor watched by
+        the event loop, so one loop can drive many sensors at once:
+
+            async with AsyncPyFingerprint('/dev/ttyS0') as f:
+                if ( await f.verifyPassword() ):
+                    while ( await f.readImage(timeout = 1.0) is False ):
+                        await asyncio.sleep(0.1)
+
+        Commands on the same sensor are serialized. After a command was
+        cancelled or timed out, the next one first waits (at most the
+        sensor timeout) for the late answer of the sensor and discards it.
+
+        Only POSIX serial ports are supported.
+    """
+
+    __address = None
+    __password = None
+    __serial = None
+    __fd = None
+    __loop = None
+    __timeout = None
+    __headerPrefix = None
+    __fixedFrames = None
+    __systemParameters = None
+    __occupancy = None
+
+    def __init__(self, port = '/dev/ttyAMA0', baudRate = 57600, address = 0xFFFFFFFF, password = 0x00000000, timeout = 2.0):
+        """
+        Constructor
+
+        Arguments:
+            port (str): The port to use
+            baudRate (int): The baud rate to use. Must be a multiple of 9600!
+            address (int): The sensor address
+            password (int): The sensor password
+            timeout (float): The default timeout of a command in seconds
+
+        Raises:
+            ValueError: if baud rate, address or password are invalid
+        """
+
+        if ( baudRate < 9600 or baudRate > 115200 or baudRate % 9600 != 0 ):
+            raise ValueError('The given baud rate is invalid!')
+
+        if ( address < 0x00000000 or address > 0xFFFFFFFF ):
+            raise ValueError('The given address is invalid!')
+
+        if ( password < 0x00000000 or password > 0xFFFFFFFF ):
+            raise ValueError('The given password is invalid!')
+
+        self.port = port
+        self.baudRate = baudRate
+        self.__address = address
+        self.__password = password
+        self.__timeout = timeout
+        self.__headerPrefix = packetHeader(address)
+        self.__fixedFrames = {}
+
+        self.__buffer = bytearray()
+        self.__dataArrived = None
+        self.__lock = None
+        self.__owner = None
+        self.__resync = False
+        self.__pendingAcks = 0
+        self.__closedError = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self):
+        """
+        Opens the serial port and registers it with the running event loop.
+        """
+
+        self.__loop = asyncio.get_running_loop()
+        self.__dataArrived = asyncio.Event()
+        self.__lock = asyncio.Lock()
+
+        self.__serial = serial.Serial(port = self.port, baudrate = self.baudRate, bytesize = serial.EIGHTBITS, timeout = 0)
+        self.__fd = self.__serial.fileno()
+        os.set_blocking(self.__fd, False)
+
+        self.__buffer.clear()
+        self.__closedError = None
+        self.__resync = False
+        self.__pendingAcks = 0
+        self.__loop.add_reader(self.__fd, self.__onReadable)
+
+    async def close(self):
+        """
+        Unregisters and closes the serial port.
+        """
+
+        if ( self.__fd is not None ):
+            self.__loop.remove_reader(self.__fd)
+            self.__fd = None
+
+        if ( self.__serial is not None and self.__serial.isOpen() == True ):
+            self.__serial.close()
+
+    def __onReadable(self):
+        """
+        Event loop callback: moves available bytes into the receive buffer.
+        """
+
+        try:
+            receivedData = os.read(self.__fd, 4096)
+
+        except (BlockingIOError, InterruptedError):
+            return
+
+        except OSError as e:
+            receivedData = b''
+            self.__closedError = e
+
+        if ( len(receivedData) == 0 ):
+            ## End of file: the port is gone, stop watching it
+            self.__loop.remove_reader(self.__fd)
+
+            if ( self.__closedError is None ):
+                self.__closedError = Exception('The serial port was closed')
+
+        self.__buffer += receivedData
+        self.__dataArrived.set()
+
+    async def _run(self, coroutine, timeout):
+        """
+        Runs a command coroutine while holding the sensor.
+
+        Arguments:
+            coroutine: The command coroutine
+            timeout (float): The timeout in seconds, None for the sensor default
+
+        Raises:
+            asyncio.TimeoutError: if the command did not finish in time
+        """
+
+        task = asyncio.current_task()
+
+        ## Nested command of the command currently holding the sensor
+        if ( self.__owner is not None and self.__owner is task ):
+            return await coroutine
+
+        if ( timeout is None ):
+            timeout = self.__timeout
+
+        try:
+            await self.__lock.acquire()
+
+        except BaseException:
+            ## Cancelled while waiting for the sensor, the command never ran
+            coroutine.close()
+            raise
+
+        try:
+            if ( self.__resync == True ):
+                ## Drop the response of an interrupted command
+                try:
+                    await self.__drain()
+
+                except BaseException:
+                    coroutine.close()
+                    raise
+
+                self.__resync = False
+            else:
+                ## A failed read left no answer worth waiting for
+                self.__pendingAcks = 0
+
+            try:
+                return await asyncio.wait_for(self.__owned(coroutine), timeout)
+
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                self.__resync = True
+                raise
+
+            finally:
+                self.__owner = None
+
+        finally:
+            self.__lock.release()
+
+    async def __drain(self):
+        """
+        Discards the late answers of interrupted commands.
+
+        Waits until every acknowledge the sensor still owes has arrived and
+        the port stayed quiet for `QUIETTIME`, at most the sensor timeout.
+        """
+
+        if ( self.__closedError is not None ):
+            self.__buffer.clear()
+            return
+
+        deadline = self.__loop.time() + self.__timeout
+        startCode = Finger.STARTCODE.to_bytes(2, 'big')
+
+        while ( True ):
+            ## Count and drop the complete packets received so far
+            start = self.__buffer.find(startCode)
+
+            if ( start == -1 ):
+                del self.__buffer[:-1]
+            else:
+                del self.__buffer[:start]
+
+            if ( len(self.__buffer) >= 9 ):
+                packetLength = 9 + (self.__buffer[7] << 8 | self.__buffer[8])
+
+                if ( len(self.__buffer) >= packetLength ):
+                    if ( self.__buffer[6] == Finger.ACKPACKET and self.__pendingAcks > 0 ):
+                        self.__pendingAcks -= 1
+
+                    del self.__buffer[:packetLength]
+                    continue
+
+            remaining = deadline - self.__loop.time()
+
+            if ( remaining <= 0 ):
+                break
+
+            self.__dataArrived.clear()
+
+            try:
+                if ( self.__pendingAcks > 0 ):
+                    await asyncio.wait_for(self.__dataArrived.wait(), remaining)
+                else:
+                    await asyncio.wait_for(self.__dataArrived.wait(), min(QUIETTIME, remaining))
+
+            except asyncio.TimeoutError:
+                if ( self.__pendingAcks == 0 ):
+                    break
+
+        ## The sensor lost the command or the rest of the answer is garbage
+        self.__buffer.clear()
+        self.__pendingAcks = 0
+
+    async def __owned(self, coroutine):
+        self.__owner = asyncio.current_task()
+        return await coroutine
+
+    async def __write(self, data):
+        """
+        Writes all data to the non-blocking port.
+        """
+
+        data = memoryview(data)
+
+        while ( len(data) > 0 ):
+            try:
+                written = os.write(self.__fd, data)
+                data = data[written:]
+
+            except (BlockingIOError, InterruptedError):
+                writable = self.__loop.create_future()
+                self.__loop.add_writer(self.__fd, writable.set_result, None)
+
+                try:
+                    await writable
+
+                finally:
+                    self.__loop.remove_writer(self.__fd)
+
+    async def __writePacket(self, packetType, packetPayload):
+        """
+        Sends a packet to the sensor.
+
+        Arguments:
+            packetType (int): The packet type (either `Finger.COMMANDPACKET`, `Finger.DATAPACKET` or `Finger.ENDDATAPACKET`)
+            packetPayload (tuple): The payload
+        """
+
+        if ( packetType == Finger.COMMANDPACKET and len(packetPayload) == 1 ):
+            instruction = packetPayload[0]
+            packet = self.__fixedFrames.get(instruction)
+
+            if ( packet is None ):
+                packet = encodePacket(self.__headerPrefix, packetType, packetPayload)
+                self.__fixedFrames[instruction] = packet
+
+        else:
+            packet = encodePacket(self.__headerPrefix, packetType, packetPayload)
+
+        await self.__write(packet)
+
+    async def __readExactly(self, length):
+        """
+        Waits until the given number of bytes arrived.
+
+        Returns:
+            The received bytes (bytes)
+        """
+
+        while ( len(self.__buffer) < length ):
+            if ( self.__closedError is not None ):
+                raise self.__closedError
+
+            self.__dataArrived.clear()
+            await self.__dataArrived.wait()
+
+        receivedData = bytes(self.__buffer[:length])
+        del self.__buffer[:length]
+        return receivedData
+
+    async def __readPacket(self):
+        """
+        Receives a packet from the sensor.
+
+        Returns:
+            A tuple that contain the following information:
+            0: integer(1 byte) The packet type.
+            1: bytes(n bytes) The packet payload.
+
+        Raises:
+            Exception: if checksum is wrong or an acknowledge is empty
+        """
+
+        receivedHeader = await self.__readExactly(9)
+
+        if ( receivedHeader[0] != Finger.STARTCODE >> 8 or receivedHeader[1] != Finger.STARTCODE & 0xFF ):
+            raise Exception('The received packet do not begin with a valid header!')
+
+        packetType = receivedHeader[6]
+        packetPayloadLength = receivedHeader[7] << 8 | receivedHeader[8]
+
+        if ( packetPayloadLength < 2 ):
+            raise Exception('The received packet has an invalid length!')
+
+        receivedData = memoryview(await self.__readExactly(packetPayloadLength))
+
+        packetChecksum = packetType + receivedHeader[7] + receivedHeader[8] + sum(receivedData[:-2])
+        receivedChecksum = receivedData[-2] << 8 | receivedData[-1]
+
+        if ( receivedChecksum != packetChecksum & 0xFFFF ):
+            raise Exception('The received packet is corrupted (the checksum is wrong)!')
+
+        if ( packetType == Finger.ACKPACKET and packetPayloadLength < 3 ):
+            raise Exception('The received acknowledge packet has no confirmation code!')
+
+        return (packetType, receivedData[:-2].tobytes())
+
+    async def __command(self, packetPayload, errors = None, accepted = ()):
+        """
+        Sends a command packet and waits for its acknowledge.
+
+        Arguments:
+            packetPayload (tuple): The command payload
+            errors (dict): Error messages by status code
+            accepted (tuple): Status codes besides `Finger.OK` that are no error
+
+        Returns:
+            The acknowledge payload (bytes), starting with the status code.
+
+        Raises:
+            Exception: if the sensor reports an error
+        """
+
+        self.__pendingAcks += 1
+        await self.__writePacket(Finger.COMMANDPACKET, packetPayload)
+        receivedPacketType, receivedPacketPayload = await self.__readPacket()
+        self.__pendingAcks -= 1
+
+        if ( receivedPacketType != Finger.ACKPACKET ):
+            raise Exception('The received packet is no ack packet!')
+
+        if ( len(receivedPacketPayload) == 0 ):
+            raise Exception('The received acknowledge is empty!')
+
+        status = receivedPacketPayload[0]
+
+        if ( status == Finger.OK and len(receivedPacketPayload) < ACKLENGTHS.get(packetPayload[0], 1) ):
+            raise Exception('The received acknowledge is too short!')
+
+        if ( status == Finger.OK or status in accepted ):
+            return receivedPacketPayload
+
+        elif ( status == Finger.ERROR_COMMUNICATION ):
+            raise Exception('Communication error')
+
+        elif ( errors is not None and status in errors ):
+            raise Exception(errors[status])
+
+        else:
+            raise Exception('Unknown error '+ hex(status))
+
+    async def __readDataPackets(self):
+        """
+        Receives follow-up data packets until the end data packet.
+
+        Returns:
+            The joined payload (bytes).
+        """
+
+        completePayload = []
+        receivedPacketType = None
+
+        while ( receivedPacketType != Finger.ENDDATAPACKET ):
+            receivedPacketType, receivedPacketPayload = await self.__readPacket()
+
+            if ( receivedPacketType != Finger.DATAPACKET and receivedPacketType != Finger.ENDDATAPACKET ):
+                raise Exception('The received packet is no data packet!')
+
+            completePayload.append(receivedPacketPayload)
+
+        return b''.join(completePayload)
+
+    def __checkCharBuffer(self, charBufferNumber):
+        if ( charBufferNumber != Finger.CHARBUFFER1 and charBufferNumber != Finger.CHARBUFFER2 ):
+            raise ValueError('The given char buffer number is invalid!')
+
+    @_command
+    async def verifyPassword(self):
+        """
+        Verifies password of the sensor.
+
+        Returns:
+            True if password is correct or False otherwise.
+        """
+
+        receivedPacketPayload = await self.__command(
+            (Finger.VERIFYPASSWORD,) + tuple(self.__password.to_bytes(4, 'big')),
+            {Finger.ERROR_ADDRCODE: 'The address is wrong'},
+            (Finger.ERROR_WRONGPASSWORD,))
+
+        if ( receivedPacketPayload[0] != Finger.OK ):
+            return False
+
+        if ( self.__systemParameters is None ):
+            await self.getSystemParameters()
+
+        return True
+
+    @_command
+    async def setPassword(self, newPassword):
+        """
+        Sets the password of the sensor.
+
+        Arguments:
+            newPassword (int): The new password to use.
+        """
+
+        if ( newPassword < 0x00000000 or newPassword > 0xFFFFFFFF ):
+            raise ValueError('The given password is invalid!')
+
+        await self.__command((Finger.SETPASSWORD,) + tuple(newPassword.to_bytes(4, 'big')))
+        self.__password = newPassword
+        return True
+
+    @_command
+    async def setAddress(self, newAddress):
+        """
+        Sets the sensor address.
+
+        Arguments:
+            newAddress (int): The new address to use.
+        """
+
+        if ( newAddress < 0x00000000 or newAddress > 0xFFFFFFFF ):
+            raise ValueError('The given address is invalid!')
+
+        await self.__command((Finger.SETADDRESS,) + tuple(newAddress.to_bytes(4, 'big')))
+        self.__address = newAddress
+        self.__headerPrefix = packetHeader(newAddress)
+        self.__fixedFrames = {}
+        self.__updateSystemParameter(4, newAddress)
+        return True
+
+    @_command
+    async def setSystemParameter(self, parameterNumber, parameterValue):
+        """
+        Set a system parameter of the sensor.
+
+        Arguments:
+            parameterNumber (int): The parameter number. Use one of `Finger.SETSYSTEMPARAMETER_*` constants.
+            parameterValue (int): The value
+        """
+
+        if ( parameterNumber == Finger.SETSYSTEMPARAMETER_BAUDRATE ):
+            if ( parameterValue < 1 or parameterValue > 12 ):
+                raise ValueError('The given baud rate parameter is invalid!')
+            index = 6
+
+        elif ( parameterNumber == Finger.SETSYSTEMPARAMETER_SECURITY_LEVEL ):
+            if ( parameterValue < 1 or parameterValue > 5 ):
+                raise ValueError('The given security level parameter is invalid!')
+            index = 3
+
+        elif ( parameterNumber == Finger.SETSYSTEMPARAMETER_PACKAGE_SIZE ):
+            if ( parameterValue < 0 or parameterValue > 3 ):
+                raise ValueError('The given package length parameter is invalid!')
+            index = 5
+
+        else:
+            raise ValueError('The given parameter number is invalid!')
+
+        await self.__command((Finger.SETSYSTEMPARAMETER, parameterNumber, parameterValue),
+                             {Finger.ERROR_INVALIDREGISTER: 'Invalid register number'})
+        self.__updateSystemParameter(index, parameterValue)
+        return True
+
+    async def setBaudRate(self, baudRate, timeout = None):
+        """
+        Sets the baud rate.
+
+        Arguments:
+            baudRate (int): The baud rate
+        """
+
+        if ( baudRate % 9600 != 0 ):
+            raise ValueError("Invalid baud rate")
+
+        return await self.setSystemParameter(Finger.SETSYSTEMPARAMETER_BAUDRATE, baudRate // 9600, timeout = timeout)
+
+    async def setSecurityLevel(self, securityLevel, timeout = None):
+        """
+        Sets the security level of the sensor.
+
+        Arguments:
+            securityLevel (int): Value between 1 and 5 where 1 is lowest and 5 highest.
+        """
+
+        return await self.setSystemParameter(Finger.SETSYSTEMPARAMETER_SECURITY_LEVEL, securityLevel, timeout = timeout)
+
+    async def setMaxPacketSize(self, packetSize, timeout = None):
+        """
+        Sets the maximum packet size of sensor.
+
+        Arguments:
+            packetSize (int): 32, 64, 128 and 256 are supported.
+        """
+
+        try:
+            packetSizes = {32: 0, 64: 1, 128: 2, 256: 3}
+            packetMaxSizeType = packetSizes[packetSize]
+
+        except KeyError:
+            raise ValueError("Invalid packet size")
+
+        return await self.setSystemParameter(Finger.SETSYSTEMPARAMETER_PACKAGE_SIZE, packetMaxSizeType, timeout = timeout)
+
+    @_command
+    async def getSystemParameters(self):
+        """
+        Gets all available system information of the sensor.
+
+        Returns:
+            The tuple described in `PyFingerprint.getSystemParameters()`.
+        """
+
+        p = await self.__command((Finger.GETSYSTEMPARAMETERS,))
+
+        self.__systemParameters = (
+            p[1] << 8 | p[2],
+            p[3] << 8 | p[4],
+            p[5] << 8 | p[6],
+            p[7] << 8 | p[8],
+            int.from_bytes(p[9:13], 'big'),
+            p[13] << 8 | p[14],
+            p[15] << 8 | p[16],
+        )
+        return self.__systemParameters
+
+    async def __cachedSystemParameters(self):
+        if ( self.__systemParameters is None ):
+            return await self.getSystemParameters()
+
+        return self.__systemParameters
+
+    def __updateSystemParameter(self, index, value):
+        if ( self.__systemParameters is not None ):
+            systemParameters = list(self.__systemParameters)
+            systemParameters[index] = value
+            self.__systemParameters = tuple(systemParameters)
+
+    async def refresh(self, timeout = None):
+        """
+        Drops the cached system parameters and reads them again from the sensor.
+        """
+
+        self.__systemParameters = None
+        return await self.getSystemParameters(timeout = timeout)
+
+    async def getStorageCapacity(self):
+        return (await self.__cachedSystemParameters())[2]
+
+    async def getSecurityLevel(self):
+        return (await self.__cachedSystemParameters())[3]
+
+    async def getMaxPacketSize(self):
+        packetMaxSizeType = (await self.__cachedSystemParameters())[5]
+
+        try:
+            return [32, 64, 128, 256][packetMaxSizeType]
+
+        except IndexError:
+            raise ValueError("Invalid packet size")
+
+    async def getBaudRate(self):
+        return (await self.__cachedSystemParameters())[6] * 9600
+
+    @_command
+    async def __readTemplateIndexPage(self, page):
+        if ( page < 0 or page > 3 ):
+            raise ValueError('The given index page is invalid!')
+
+        return (await self.__command((Finger.TEMPLATEINDEX, page)))[1:]
+
+    async def getTemplateIndex(self, page, timeout = None):
+        """
+        Gets a list of the template positions with usage indicator.
+
+        Arguments:
+            page (int): The page (value between 0 and 3).
+
+        Returns:
+            The list.
+        """
+
+        pageElements = await self.__readTemplateIndexPage(page, timeout = timeout)
+        occupancy = TemplateOccupancy.fromIndexPages(len(pageElements) * 8, [pageElements])
+        return [ occupancy.isOccupied(p) for p in range(0, occupancy.capacity) ]
+
+    @_command
+    async def getTemplateOccupancy(self, refresh = False):
+        """
+        Gets the host-side bitmap of used template positions.
+
+        See `PyFingerprint.getTemplateOccupancy()`.
+        """
+
+        if ( self.__occupancy is None or refresh == True ):
+            storageCapacity = await self.getStorageCapacity()
+            pageCount = min(4, (storageCapacity + 255) // 256)
+            pages = [ await self.__readTemplateIndexPage(page) for page in range(0, pageCount) ]
+            self.__occupancy = TemplateOccupancy.fromIndexPages(storageCapacity, pages)
+
+        return self.__occupancy
+
+    @_command
+    async def getTemplateCount(self):
+        """
+        Gets the number of stored templates.
+        """
+
+        receivedPacketPayload = await self.__command((Finger.TEMPLATECOUNT,))
+        return receivedPacketPayload[1] << 8 | receivedPacketPayload[2]
+
+    @_command
+    async def readImage(self):
+        """
+        Reads the image of a finger and stores it in image buffer.
+
+        Returns:
+            True if image was read successfully or False otherwise.
+        """
+
+        receivedPacketPayload = await self.__command((Finger.READIMAGE,),
+                                                     {Finger.ERROR_READIMAGE: 'Could not read image'},
+                                                     (Finger.ERROR_NOFINGER,))
+        return receivedPacketPayload[0] == Finger.OK
+
+    @_command
+    async def downloadImageData(self):
+        """
+        Downloads the raw image from image buffer.
+
+        Returns:
+            The image data (bytes), two 4 bit pixels per byte.
+        """
+
+        await self.__command((Finger.DOWNLOADIMAGE,),
+                             {Finger.ERROR_DOWNLOADIMAGE: 'Could not download image'})
+        return await self.__readDataPackets()
+
+    async def downloadImageArray(self, timeout = None):
+        """
+        Downloads the image from image buffer as uint8 array of shape (288, 256).
+        """
+
+        from .image import decodeImage
+
+        return decodeImage(await self.downloadImageData(timeout = timeout))
+
+    @_command
+    async def convertImage(self, charBufferNumber = Finger.CHARBUFFER1):
+        """
+        Converts the image in image buffer to characteristics and stores it in specified char buffer.
+        """
+
+        self.__checkCharBuffer(charBufferNumber)
+
+        await self.__command((Finger.CONVERTIMAGE, charBufferNumber), {
+            Finger.ERROR_MESSYIMAGE: 'The image is too messy',
+            Finger.ERROR_FEWFEATUREPOINTS: 'The image contains too few feature points',
+            Finger.ERROR_INVALIDIMAGE: 'The image is invalid',
+        })
+        return True
+
+    @_command
+    async def createTemplate(self):
+        """
+        Combines the characteristics of both char buffers into one template.
+
+        Returns:
+            True if successful or False if the characteristics do not match.
+        """
+
+        receivedPacketPayload = await self.__command((Finger.CREATETEMPLATE,), None,
+                                                     (Finger.ERROR_CHARACTERISTICSMISMATCH,))
+        return receivedPacketPayload[0] == Finger.OK
+
+    @_command
+    async def storeTemplate(self, positionNumber = -1, charBufferNumber = Finger.CHARBUFFER1):
+        """
+        Stores a template from the specified char buffer at the given position.
+
+        Returns:
+            The position number (int) of the stored template.
+        """
+
+        if ( positionNumber == -1 ):
+            positionNumber = (await self.getTemplateOccupancy()).firstFree()
+
+            if ( positionNumber == -1 ):
+                raise Exception('There is no free position left to store the template')
+
+        if ( positionNumber < 0x0000 or positionNumber >= await self.getStorageCapacity() ):
+            raise ValueError('The given position number is invalid!')
+
+        self.__checkCharBuffer(charBufferNumber)
+
+        await self.__command((Finger.STORETEMPLATE, charBufferNumber, positionNumber >> 8 & 0xFF, positionNumber & 0xFF), {
+            Finger.ERROR_INVALIDPOSITION: 'Could not store template in that position',
+            Finger.ERROR_FLASH: 'Error writing to flash',
+        })
+
+        if ( self.__occupancy is not None ):
+            self.__occupancy.setOccupied(positionNumber)
+
+        return positionNumber
+
+    @_command
+    async def searchTemplate(self, charBufferNumber = Finger.CHARBUFFER1, positionStart = 0, count = -1):
+        """
+        Searches inside the database for the characteristics in char buffer.
+
+        Returns:
+            A tuple (position number, accuracy score), (-1, -1) if nothing was found.
+        """
+
+        self.__checkCharBuffer(charBufferNumber)
+
+        if ( count > 0 ):
+            templatesCount = count
+        else:
+            templatesCount = await self.getStorageCapacity()
+
+        p = await self.__command((
+            Finger.SEARCHTEMPLATE,
+            charBufferNumber,
+            positionStart >> 8 & 0xFF,
+            positionStart & 0xFF,
+            templatesCount >> 8 & 0xFF,
+            templatesCount & 0xFF,
+        ), None, (Finger.ERROR_NOTEMPLATEFOUND,))
+
+        if ( p[0] != Finger.OK ):
+            return (-1, -1)
+
+        return (p[1] << 8 | p[2], p[3] << 8 | p[4])
+
+    @_command
+    async def loadTemplate(self, positionNumber, charBufferNumber = Finger.CHARBUFFER1):
+        """
+        Loads an existing template specified by position number to specified char buffer.
+        """
+
+        if ( positionNumber < 0x0000 or positionNumber >= await self.getStorageCapacity() ):
+            raise ValueError('The given position number is invalid!')
+
+        self.__checkCharBuffer(charBufferNumber)
+
+        await self.__command((Finger.LOADTEMPLATE, charBufferNumber, positionNumber >> 8 & 0xFF, positionNumber & 0xFF), {
+            Finger.ERROR_LOADTEMPLATE: 'The template could not be read',
+            Finger.ERROR_INVALIDPOSITION: 'Could not load template from that position',
+        })
+        return True
+
+    @_command
+    async def deleteTemplate(self, positionNumber, count = 1):
+        """
+        Deletes templates from fingerprint database. Per default one.
+
+        Returns:
+            True if successful or False otherwise.
+        """
+
+        capacity = await self.getStorageCapacity()
+
+        if ( positionNumber < 0x0000 or positionNumber >= capacity ):
+            raise ValueError('The given position number is invalid!')
+
+        if ( count < 0x0000 or count > capacity - positionNumber ):
+            raise ValueError('The given count is invalid!')
+
+        p = await self.__command((
+            Finger.DELETETEMPLATE,
+            positionNumber >> 8 & 0xFF,
+            positionNumber & 0xFF,
+            count >> 8 & 0xFF,
+            count & 0xFF,
+        ), {Finger.ERROR_INVALIDPOSITION: 'Invalid position'}, (Finger.ERROR_DELETETEMPLATE,))
+
+        if ( p[0] != Finger.OK ):
+            return False
+
+        if ( self.__occupancy is not None ):
+            self.__occupancy.setFree(positionNumber, count)
+
+        return True
+
+    @_command
+    async def clearDatabase(self):
+        """
+        Deletes all templates from the fingeprint database.
+
+        Returns:
+            True if successful or False otherwise.
+        """
+
+        p = await self.__command((Finger.CLEARDATABASE,), None, (Finger.ERROR_CLEARDATABASE,))
+
+        if ( p[0] != Finger.OK ):
+            return False
+
+        if ( self.__occupancy is not None ):
+            self.__occupancy.clear()
+
+        return True
+
+    @_command
+    async def compareCharacteristics(self):
+        """
+        Compare the characteristics of char buffer 1 with char buffer 2.
+
+        Returns:
+            The accuracy score (int). 0 means fingers are not the same.
+        """
+
+        p = await self.__command((Finger.COMPARECHARACTERISTICS,), None, (Finger.ERROR_NOTMATCHING,))
+
+        if ( p[0] != Finger.OK ):
+            return 0
+
+        return p[1] << 8 | p[2]
+
+    @_command
+    async def uploadCharacteristics(self, charBufferNumber = Finger.CHARBUFFER1, characteristicsData = None, verify = True):
+        """
+        Uploads finger characteristics to specified char buffer.
+
+        Arguments:
+            verify (bool): Download the char buffer again and compare it (doubles the traffic)
+
+        Returns:
+            True if the read back characteristics are equal (or not verified).
+        """
+
+        self.__checkCharBuffer(charBufferNumber)
+
+        if ( isinstance(characteristicsData, list) ):
+            characteristicsData = bytes(characteristicsData)
+
+        if ( characteristicsData is None or len(characteristicsData) == 0 ):
+            raise ValueError('The characteristics data is required!')
+
+        characteristicsData = memoryview(characteristicsData)
+        maxPacketSize = await self.getMaxPacketSize()
+
+        await self.__command((Finger.UPLOADCHARACTERISTICS, charBufferNumber),
+                             {Finger.ERROR_PACKETRESPONSEFAIL: 'Could not upload characteristics'})
+
+        lastPacketStart = ((len(characteristicsData) - 1) // maxPacketSize) * maxPacketSize
+
+        for lfrom in range(0, lastPacketStart, maxPacketSize):
+            await self.__writePacket(Finger.DATAPACKET, characteristicsData[lfrom:lfrom + maxPacketSize])
+
+        await self.__writePacket(Finger.ENDDATAPACKET, characteristicsData[lastPacketStart:])
+
+        if ( verify == False ):
+            return True
+
+        return (await self.downloadCharacteristics(charBufferNumber)) == characteristicsData
+
+    @_command
+    async def generateRandomNumber(self):
+        """
+        Generates a random 32-bit decimal number.
+        """
+
+        p = await self.__command((Finger.GENERATERANDOMNUMBER,))
+        return int.from_bytes(p[1:5], 'big')
+
+    @_command
+    async def downloadCharacteristics(self, charBufferNumber = Finger.CHARBUFFER1):
+        """
+        Downloads the finger characteristics from the specified char buffer.
+
+        Returns:
+            The characteristics (bytes).
+        """
+
+        self.__checkCharBuffer(charBufferNumber)
+
+        await self.__command((Finger.DOWNLOADCHARACTERISTICS, charBufferNumber),
+                             {Finger.ERROR_DOWNLOADCHARACTERISTICS: 'Could not download characteristics'})
+        return await self.__readDataPackets()
@@ -0,0 +1,104 @@
+import os
+import struct
+
+"""Template backup files: a stream of (position, characteristics) records
+
+    File layout:
+        MAGIC (8 bytes)
+        record: position (2 bytes, big endian) | length (2 bytes) | characteristics
+"""
+
+MAGIC = b'R305TPL1'
+
+RECORD_HEADER = struct.Struct('>HH')
+
+
+class TemplateWriter():
+    """Appends template records to a backup file.
+
+    Args:
+        path (str): The backup file
+        resume (bool): Keep the complete records of an existing file
+            and continue after them
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.last_position = None
+
+        if resume and os.path.exists(path):
+            self.last_position, size = scan(path)
+            self.file = open(path, 'r+b')
+            # Drop a record cut off by an interruption
+            self.file.truncate(size)
+            self.file.seek(size)
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(MAGIC)
+
+    def write(self, position, characteristics):
+        self.file.write(RECORD_HEADER.pack(position, len(characteristics)))
+        self.file.write(characteristics)
+        self.last_position = position
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def scan(path):
+    """Finds the end of the complete records of a backup file.
+
+    Returns:
+        (last complete position or None, size of the complete part in bytes)
+    """
+    last_position = None
+    size = len(MAGIC)
+
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('The file is no template backup: ' + path)
+
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+            position, length = RECORD_HEADER.unpack(header)
+            if len(f.read(length)) < length:
+                break
+            last_position = position
+            size += RECORD_HEADER.size + length
+
+    return last_position, size
+
+
+def read_templates(path):
+    """Iterates over the complete records of a backup file.
+
+    Returns:
+        A generator of (position, characteristics bytes)
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('The file is no template backup: ' + path)
+
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            position, length = RECORD_HEADER.unpack(header)
+            characteristics = f.read(length)
+            if len(characteristics) < length:
+                return
+            yield position, characteristics
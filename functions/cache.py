@@ -0,0 +1,207 @@
+import hashlib
+import mmap
+import os
+import struct
+
+"""Host-side cache of template characteristics in a memory-mapped file
+
+    File layout:
+        header: MAGIC (8 bytes) | address (4 bytes) | capacity (2 bytes) | slot size (2 bytes)
+        slot per position: used (1 byte) | length (2 bytes) | SHA-256 digest (32 bytes) | characteristics
+"""
+
+MAGIC = b'R305CHR1'
+
+HEADER = struct.Struct('>8sIHH')
+SLOT_HEADER = struct.Struct('>BH32s')
+
+## Characteristics of a R305 template are 512 bytes
+SLOT_SIZE = 512
+
+
+class CharacteristicsCache(object):
+    """
+        Characteristics and digest of every template position of one sensor.
+
+        The file is created (or reset when it belongs to another sensor) on
+        opening. Slots are written in place, so an update touches a single page.
+    """
+
+    __path = None
+    __address = None
+    __capacity = None
+    __slotSize = None
+    __file = None
+    __map = None
+
+    def __init__(self, path, capacity, address = 0xFFFFFFFF, slotSize = SLOT_SIZE):
+        """
+        Constructor
+
+        Arguments:
+            path (str): The cache file
+            capacity (int): The storage capacity of the sensor
+            address (int): The sensor address
+            slotSize (int): The largest characteristics size in bytes
+        """
+
+        if ( capacity <= 0 or capacity > 0xFFFF ):
+            raise ValueError('The given capacity is invalid!')
+
+        self.__path = path
+        self.__address = address
+        self.__capacity = capacity
+        self.__slotSize = slotSize
+
+        header = HEADER.pack(MAGIC, address, capacity, slotSize)
+        size = HEADER.size + capacity * (SLOT_HEADER.size + slotSize)
+
+        if ( os.path.exists(path) ):
+            self.__file = open(path, 'r+b')
+
+            ## DEBUG: The file belongs to another sensor or layout
+            if ( self.__file.read(HEADER.size) != header or os.path.getsize(path) != size ):
+                self.__file.seek(0)
+                self.__file.truncate()
+        else:
+            self.__file = open(path, 'w+b')
+
+        if ( os.path.getsize(path) != size ):
+            self.__file.truncate(size)
+            self.__file.seek(0)
+            self.__file.write(header)
+            self.__file.flush()
+
+        self.__map = mmap.mmap(self.__file.fileno(), size)
+
+    @property
+    def capacity(self):
+        return self.__capacity
+
+    def __offset(self, positionNumber):
+        """
+        Returns the file offset of a position slot.
+
+        Raises:
+            ValueError: if passed position is invalid
+        """
+
+        if ( positionNumber < 0 or positionNumber >= self.__capacity ):
+            raise ValueError('The given position number is invalid!')
+
+        return HEADER.size + positionNumber * (SLOT_HEADER.size + self.__slotSize)
+
+    def get(self, positionNumber):
+        """
+        Gets the cached characteristics of a position.
+
+        Arguments:
+            positionNumber (int): The position
+
+        Returns:
+            A tuple (characteristics bytes, digest bytes) or None if the position is not cached.
+        """
+
+        offset = self.__offset(positionNumber)
+        used, length, digest = SLOT_HEADER.unpack_from(self.__map, offset)
+
+        if ( used == 0 ):
+            return None
+
+        start = offset + SLOT_HEADER.size
+        return (self.__map[start:start + length], digest)
+
+    def digest(self, positionNumber):
+        """
+        Gets the SHA-256 digest of a cached position.
+
+        Returns:
+            The digest (bytes) or None if the position is not cached.
+        """
+
+        offset = self.__offset(positionNumber)
+        used, length, digest = SLOT_HEADER.unpack_from(self.__map, offset)
+
+        if ( used == 0 ):
+            return None
+
+        return digest
+
+    def put(self, positionNumber, characteristics):
+        """
+        Caches the characteristics of a position.
+
+        Arguments:
+            positionNumber (int): The position
+            characteristics (bytes): The characteristics
+
+        Returns:
+            The SHA-256 digest (bytes).
+        """
+
+        if ( len(characteristics) > self.__slotSize ):
+            raise ValueError('The characteristics do not fit into a cache slot!')
+
+        offset = self.__offset(positionNumber)
+        digest = hashlib.sha256(characteristics).digest()
+        start = offset + SLOT_HEADER.size
+
+        ## Mark the slot as used only after the data was written
+        self.__map[offset] = 0
+        self.__map[start:start + len(characteristics)] = bytes(characteristics)
+        SLOT_HEADER.pack_into(self.__map, offset, 1, len(characteristics), digest)
+
+        return digest
+
+    def discard(self, positionNumber, count = 1):
+        """
+        Drops the cached characteristics of one or more positions.
+
+        Arguments:
+            positionNumber (int): The first position
+            count (int): The number of positions
+        """
+
+        for position in range(positionNumber, min(positionNumber + count, self.__capacity)):
+            self.__map[self.__offset(position)] = 0
+
+    def clear(self):
+        """
+        Drops all cached characteristics.
+        """
+
+        for position in range(0, self.__capacity):
+            self.__map[self.__offset(position)] = 0
+
+    def positions(self):
+        """
+        Returns:
+            A generator of the cached positions.
+        """
+
+        for position in range(0, self.__capacity):
+            if ( self.__map[self.__offset(position)] != 0 ):
+                yield position
+
+    def __contains__(self, positionNumber):
+        return ( 0 <= positionNumber < self.__capacity and self.__map[self.__offset(positionNumber)] != 0 )
+
+    def flush(self):
+        """
+        Writes the changed pages back to the file.
+        """
+
+        self.__map.flush()
+
+    def close(self):
+        if ( self.__map is not None ):
+            self.__map.flush()
+            self.__map.close()
+            self.__file.close()
+            self.__map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excInfo):
+        self.close()
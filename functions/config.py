@@ -1,8 +1,8 @@
-import os
-from aenum import NamedConstant
-class Finger(NamedConstant):
+class Finger():
     """
         Define all env variable
+
+        Plain int class attributes: cheap to import and to compare
     """
     # Define all port register and variable neccessary
     STARTCODE = 0xEF01
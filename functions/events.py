@@ -0,0 +1,216 @@
+import collections
+import threading
+import time
+
+"""Status events of the FingerPrint service"""
+
+
+StatusEvent = collections.namedtuple(
+    'StatusEvent', ['kind', 'code', 'message', 'timestamp', 'data'])
+StatusEvent.__doc__ = """A status change.
+
+    kind (str): The operation, one of the EVENT_* constants
+    code (str): The status code ('100' ask for finger, '101' waiting or
+        processing, '102' ask for the finger again, '200' done, '204'
+        failed or not found, '401' fingers do not match)
+    message (str): Text for the user
+    timestamp (float): time.monotonic() of the publication
+    data (dict): Additional values, e.g. the position
+"""
+
+Recognition = collections.namedtuple(
+    'Recognition', ['matched', 'position', 'score', 'name', 'timings', 'timestamp', 'error'])
+Recognition.__doc__ = """One touch seen by FingerPrint.recognize_stream().
+
+    matched (bool): A stored template matched
+    position (int): The matched position or -1
+    score (int): The accuracy score or -1
+    name (str): The identity of the position or None
+    timings (dict): Seconds per stage: wait (touch detected after),
+        detect (bound of the detection latency), convert, search,
+        identity and total (detection to result)
+    timestamp (float): time.monotonic() of the result
+    error (str): Why the image could not be converted, None otherwise
+"""
+
+EVENT_ENROLL = 'enroll'
+EVENT_RECOGNIZE = 'recognize'
+EVENT_REMOVE = 'remove'
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class Subscription():
+    """Bounded queue of the events published after subscribing.
+
+    When the queue is full a publisher either drops the oldest event
+    (counted in `dropped`) or, with block=True, waits until the
+    consumer caught up.
+
+    Example:
+        with service.events.subscribe() as events:
+            for event in events:
+                print(event.code, event.message)
+    """
+
+    def __init__(self, bus, maxsize=100, block=False):
+        if maxsize < 1:
+            raise ValueError('The given queue size is invalid!')
+
+        self._bus = bus
+        self.maxsize = maxsize
+        self.block = block
+        self.dropped = 0
+        self.closed = False
+        self._events = collections.deque()
+        self._condition = threading.Condition()
+        # (loop, future) of the waiting `async for` consumers
+        self._waiters = []
+
+    def _put(self, event, timeout):
+        with self._condition:
+            if self.block:
+                self._condition.wait_for(
+                    lambda: len(self._events) < self.maxsize or self.closed, timeout)
+            if self.closed:
+                return
+            if len(self._events) >= self.maxsize:
+                self._events.popleft()
+                self.dropped += 1
+            self._events.append(event)
+            self._condition.notify_all()
+            self._wake_waiters()
+
+    def _wake_waiters(self):
+        # Called with the condition held, from any thread
+        for loop, waiter in self._waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # The loop is closed
+                pass
+        self._waiters = []
+
+    def get(self, timeout=None):
+        """Waits for the next event.
+
+        Returns:
+            The event (StatusEvent) or None on timeout or when closed
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._events or self.closed, timeout)
+            if not self._events:
+                return None
+            event = self._events.popleft()
+            # Room for a blocked publisher
+            self._condition.notify_all()
+            return event
+
+    def close(self):
+        """
+            Unsubscribes, waiting consumers get None
+        """
+        self._bus._unsubscribe(self)
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+            self._wake_waiters()
+
+    def __iter__(self):
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # Imported here, asyncio alone would double the import time of the service
+        import asyncio
+
+        # Publishers wake the loop, no thread waits for a cancelled consumer
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                waiter = None
+                if not self._events and not self.closed:
+                    waiter = loop.create_future()
+                    self._waiters.append((loop, waiter))
+
+            if waiter is not None:
+                try:
+                    await waiter
+                finally:
+                    with self._condition:
+                        if (loop, waiter) in self._waiters:
+                            self._waiters.remove((loop, waiter))
+
+            event = self.get(0)
+            if event is not None:
+                return event
+            if self.closed:
+                raise StopAsyncIteration
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class EventBus():
+    """Thread-safe publish/subscribe channel for StatusEvents.
+
+    Publishing never waits for subscribers that drop events, so the
+    sensor thread keeps its pace however slow a consumer is.
+    """
+
+    def __init__(self, publish_timeout=1.0):
+        """
+        Args:
+            publish_timeout (float): Longest wait of a publisher on a
+                blocking subscription in seconds
+        """
+        self.publish_timeout = publish_timeout
+        self.last = None
+        self._subscriptions = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, maxsize=100, block=False):
+        """
+        Args:
+            maxsize (int): The number of buffered events
+            block (bool): Make publishers wait instead of dropping events
+
+        Returns:
+            A Subscription
+        """
+        subscription = Subscription(self, maxsize, block)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(self, kind, code, message, **data):
+        """
+        Returns:
+            The published event (StatusEvent)
+        """
+        event = StatusEvent(kind, code, message, time.monotonic(), data)
+        with self._lock:
+            self.last = event
+            subscriptions = list(self._subscriptions)
+
+        for subscription in subscriptions:
+            subscription._put(event, self.publish_timeout)
+
+        return event
@@ -0,0 +1,406 @@
+import contextlib
+import csv
+import os
+import threading
+
+"""Names of the enrolled users by template position
+
+    The database is a CSV log of `Index,Name` rows. A later row for a
+    position replaces the earlier ones and a row with an empty name
+    removes the position. Header rows are skipped wherever they appear.
+"""
+
+HEADER = ['Index', 'Name']
+
+
+def read_rows(path):
+    """Iterates over the rows of a CSV identity log.
+
+    Returns:
+        A generator of (position, name), name is empty for removals
+    """
+    with open(path, 'r', newline='') as f:
+        for row in csv.reader(f):
+            if len(row) < 2:
+                continue
+            try:
+                position = int(row[0])
+            except ValueError:
+                # Header row
+                continue
+            yield position, row[1]
+
+
+class IdentityStore():
+    """Name <-> position mapping loaded once into two dicts.
+
+    Changes are appended to the log, so inserts and deletes cost one
+    short write. When the log holds more than `compact_garbage` stale
+    rows and more stale rows than live ones, it is rewritten with the
+    live rows only and swapped in with an atomic rename.
+
+    Example:
+        store = IdentityStore('./data/database.csv')
+        store.add(3, 'thanh')
+        store.position('thanh')    # 3
+        store.remove('thanh')      # 3
+    """
+
+    def __init__(self, path, compact_garbage=1000):
+        """
+        Args:
+            path (str): The CSV log, created if missing
+            compact_garbage (int): Stale rows tolerated before compaction
+        """
+        self.path = path
+        self.compact_garbage = compact_garbage
+        self.by_name = {}
+        self.by_position = {}
+        self.rows = 0
+        self.compactions = 0
+        self._batch_depth = 0
+
+        if os.path.exists(path):
+            self._load()
+        else:
+            self._rewrite()
+
+        self._file = open(path, 'a', newline='')
+        self._writer = csv.writer(self._file, lineterminator='\n')
+
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                # Appended rows must not continue an unterminated last line
+                if f.read(1) != b'\n':
+                    with open(self.path, 'a', newline='') as terminated:
+                        terminated.write('\n')
+
+        for position, name in read_rows(self.path):
+            self.rows += 1
+            self._set(position, name)
+
+    def _set(self, position, name):
+        old_name = self.by_position.pop(position, None)
+        if old_name is not None:
+            del self.by_name[old_name]
+
+        if name:
+            old_position = self.by_name.get(name)
+            if old_position is not None:
+                del self.by_position[old_position]
+            self.by_name[name] = position
+            self.by_position[position] = name
+
+    def _append(self, position, name):
+        self._writer.writerow([position, name])
+        if self._batch_depth == 0:
+            self._file.flush()
+        self.rows += 1
+
+        garbage = self.rows - len(self.by_position)
+        if garbage > self.compact_garbage and garbage > len(self.by_position):
+            self.compact()
+
+    def _rewrite(self):
+        """
+            Writes the live rows to a temporary file and renames it over the log
+        """
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(HEADER)
+            for position in sorted(self.by_position):
+                writer.writerow([position, self.by_position[position]])
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temporary, self.path)
+        self.rows = len(self.by_position)
+
+    def compact(self):
+        """
+            Drops stale rows from the log
+        """
+        self._file.close()
+        self._rewrite()
+        self.compactions += 1
+        self._file = open(self.path, 'a', newline='')
+        self._writer = csv.writer(self._file, lineterminator='\n')
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+            Writes the changes of the block to the log with one flush
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._file.flush()
+
+    def import_csv(self, path):
+        """Imports a CSV identity log (duplicate headers and removals included).
+
+        Returns:
+            The number of names afterwards
+        """
+        with self.batch():
+            for position, name in read_rows(path):
+                if name in self.by_name and self.by_name[name] == position:
+                    continue
+                self._set(position, name)
+                self._append(position, name)
+        return len(self)
+
+    def add(self, position, name):
+        """Registers a name for a template position.
+
+        Raises:
+            ValueError: if the name is empty or registered already
+        """
+        if not name:
+            raise ValueError('The name is empty!')
+        if name in self.by_name:
+            raise ValueError('Name is registered: ' + name)
+
+        self._set(position, name)
+        self._append(position, name)
+
+    def remove(self, name):
+        """
+        Returns:
+            The position of the removed name or None if it is unknown
+        """
+        position = self.by_name.get(name)
+        if position is not None:
+            self.remove_position(position)
+        return position
+
+    def remove_position(self, position):
+        """
+        Returns:
+            The name registered for the position or None
+        """
+        name = self.by_position.get(position)
+        if name is not None:
+            self._set(position, '')
+            self._append(position, '')
+        return name
+
+    def clear(self):
+        self.by_name.clear()
+        self.by_position.clear()
+        self.compact()
+
+    def position(self, name):
+        return self.by_name.get(name)
+
+    def name(self, position):
+        return self.by_position.get(position)
+
+    def __contains__(self, name):
+        return name in self.by_name
+
+    def __len__(self):
+        return len(self.by_name)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SQLiteIdentityStore():
+    """IdentityStore with the same interface kept in a SQLite database.
+
+    The database runs in WAL mode, so readers (e.g. a recognition thread
+    resolving names) never wait for a writer. Every thread uses its own
+    connection. A change outside of batch() is one transaction; inside
+    batch() all changes share one transaction and one sync.
+
+    Example:
+        store = SQLiteIdentityStore('./data/identities.db')
+        store.import_csv('./data/database.csv')
+        with store.batch():
+            for position, name in enrolled:
+                store.add(position, name)
+    """
+
+    def __init__(self, path, device=0, timeout=5.0):
+        """
+        Args:
+            path (str): The database file, created if missing
+            device (int): Default sensor of positions (see SensorPool)
+            timeout (float): Seconds a writer waits for another writer
+        """
+        self.path = path
+        self.device = device
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+        db = self._db()
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('CREATE TABLE IF NOT EXISTS identities ('
+                   'device INTEGER NOT NULL, '
+                   'position INTEGER NOT NULL, '
+                   'name TEXT NOT NULL, '
+                   'PRIMARY KEY (device, position))')
+        db.execute('CREATE UNIQUE INDEX IF NOT EXISTS identities_name '
+                   'ON identities (name)')
+
+    def _db(self):
+        """
+            Returns the connection of the calling thread
+        """
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            # Only this store needs sqlite3, some Python builds lack it
+            import sqlite3
+
+            # Autocommit, transactions are opened explicitly by batch()
+            db = sqlite3.connect(self.path, timeout=self.timeout,
+                                 isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+            self._local.depth = 0
+            with self._lock:
+                self._connections.append(db)
+        return db
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+            Runs the changes of the block in one transaction
+        """
+        db = self._db()
+        if self._local.depth == 0:
+            db.execute('BEGIN IMMEDIATE')
+        self._local.depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                db.execute('ROLLBACK')
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            db.execute('COMMIT')
+
+    def import_csv(self, path, device=None):
+        """Imports a CSV identity log (duplicate headers and removals included).
+
+        Returns:
+            The number of names afterwards
+        """
+        device = self.device if device is None else device
+        with self.batch():
+            db = self._db()
+            for position, name in read_rows(path):
+                if name:
+                    # REPLACE drops the rows with the same position or name
+                    db.execute('INSERT OR REPLACE INTO identities VALUES (?, ?, ?)',
+                               (device, position, name))
+                else:
+                    db.execute('DELETE FROM identities WHERE device = ? AND position = ?',
+                               (device, position))
+        return len(self)
+
+    def add(self, position, name, device=None):
+        """Registers a name for a template position.
+
+        Raises:
+            ValueError: if the name is empty or registered already
+        """
+        if not name:
+            raise ValueError('The name is empty!')
+
+        import sqlite3
+
+        device = self.device if device is None else device
+        try:
+            with self.batch():
+                db = self._db()
+                db.execute('DELETE FROM identities WHERE device = ? AND position = ?',
+                           (device, position))
+                db.execute('INSERT INTO identities VALUES (?, ?, ?)',
+                           (device, position, name))
+        except sqlite3.IntegrityError:
+            raise ValueError('Name is registered: ' + name)
+
+    def remove(self, name):
+        """
+        Returns:
+            The position of the removed name or None if it is unknown
+        """
+        with self.batch():
+            located = self.locate(name)
+            if located is not None:
+                self._db().execute('DELETE FROM identities WHERE name = ?', (name,))
+        return None if located is None else located[1]
+
+    def remove_position(self, position, device=None):
+        """
+        Returns:
+            The name registered for the position or None
+        """
+        with self.batch():
+            name = self.name(position, device)
+            if name is not None:
+                self._db().execute(
+                    'DELETE FROM identities WHERE device = ? AND position = ?',
+                    (self.device if device is None else device, position))
+        return name
+
+    def clear(self, device=None):
+        self._db().execute('DELETE FROM identities WHERE device = ?',
+                           (self.device if device is None else device,))
+
+    def locate(self, name):
+        """
+        Returns:
+            (device, position) of the name or None
+        """
+        return self._db().execute(
+            'SELECT device, position FROM identities WHERE name = ?', (name,)).fetchone()
+
+    def position(self, name):
+        located = self.locate(name)
+        return None if located is None else located[1]
+
+    def name(self, position, device=None):
+        row = self._db().execute(
+            'SELECT name FROM identities WHERE device = ? AND position = ?',
+            (self.device if device is None else device, position)).fetchone()
+        return None if row is None else row[0]
+
+    def __contains__(self, name):
+        return self.locate(name) is not None
+
+    def __len__(self):
+        return self._db().execute('SELECT COUNT(*) FROM identities').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            for db in self._connections:
+                db.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
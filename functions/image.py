@@ -0,0 +1,74 @@
+import numpy as np
+
+"""Decoding of the raw images sent by the R305 sensor"""
+
+IMAGE_WIDTH = 256
+IMAGE_HEIGHT = 288
+
+## One byte contains two 4 bit pixels
+IMAGE_DATA_SIZE = IMAGE_WIDTH * IMAGE_HEIGHT // 2
+
+
+def decodeImages(captures):
+    """
+    Decodes several raw sensor images at once.
+
+    Thanks to Danylo Esterman <soundcracker@gmail.com> for the "multiple with 17" improvement:
+    a 4 bit value times 17 spreads it over the full 0..255 range.
+
+    Arguments:
+        captures (list): The raw image data of each capture (bytes-like, 36864 bytes each)
+
+    Returns:
+        A uint8 array of shape (len(captures), 288, 256).
+
+    Raises:
+        ValueError: if a capture has not the expected size
+    """
+
+    for capture in captures:
+        if ( len(capture) != IMAGE_DATA_SIZE ):
+            raise ValueError('The given image data has an invalid size ' + str(len(capture)) + '!')
+
+    raw = np.frombuffer(b''.join(captures), dtype=np.uint8).reshape(len(captures), IMAGE_DATA_SIZE)
+
+    pixels = np.empty((len(captures), IMAGE_DATA_SIZE, 2), dtype=np.uint8)
+    ## Left 4 bits are the first pixel, right 4 bits the second one
+    np.right_shift(raw, 4, out=pixels[:, :, 0])
+    np.bitwise_and(raw, 0x0F, out=pixels[:, :, 1])
+    pixels *= 17
+
+    return pixels.reshape(len(captures), IMAGE_HEIGHT, IMAGE_WIDTH)
+
+
+def decodeImage(imageData):
+    """
+    Decodes one raw sensor image.
+
+    Arguments:
+        imageData (bytes): The raw image data (36864 bytes)
+
+    Returns:
+        A uint8 array of shape (288, 256).
+
+    Raises:
+        ValueError: if the data has not the expected size
+    """
+
+    return decodeImages([imageData])[0]
+
+
+def toImage(pixels):
+    """
+    Wraps decoded pixels into a grayscale PIL image.
+
+    Arguments:
+        pixels (numpy.ndarray): A uint8 array of shape (288, 256)
+
+    Returns:
+        The image (PIL.Image.Image).
+    """
+
+    from PIL import Image
+
+    return Image.fromarray(pixels, 'L')
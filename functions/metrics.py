@@ -0,0 +1,272 @@
+import bisect
+from .config import Finger
+
+"""Latency histograms and wire counters of the R305 driver"""
+
+
+## Upper bounds in seconds, from one wire byte at 115200 baud to a slow search
+LATENCYBUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+INSTRUCTIONNAMES = {
+    Finger.VERIFYPASSWORD: 'verifyPassword',
+    Finger.SETPASSWORD: 'setPassword',
+    Finger.SETADDRESS: 'setAddress',
+    Finger.SETSYSTEMPARAMETER: 'setSystemParameter',
+    Finger.GETSYSTEMPARAMETERS: 'getSystemParameters',
+    Finger.TEMPLATEINDEX: 'templateIndex',
+    Finger.TEMPLATECOUNT: 'templateCount',
+    Finger.READIMAGE: 'readImage',
+    Finger.DOWNLOADIMAGE: 'downloadImage',
+    Finger.CONVERTIMAGE: 'convertImage',
+    Finger.CREATETEMPLATE: 'createTemplate',
+    Finger.STORETEMPLATE: 'storeTemplate',
+    Finger.SEARCHTEMPLATE: 'searchTemplate',
+    Finger.LOADTEMPLATE: 'loadTemplate',
+    Finger.DELETETEMPLATE: 'deleteTemplate',
+    Finger.CLEARDATABASE: 'clearDatabase',
+    Finger.GENERATERANDOMNUMBER: 'generateRandomNumber',
+    Finger.COMPARECHARACTERISTICS: 'compareCharacteristics',
+    Finger.UPLOADCHARACTERISTICS: 'uploadCharacteristics',
+    Finger.DOWNLOADCHARACTERISTICS: 'downloadCharacteristics',
+}
+
+
+def instructionName(instruction):
+    """
+    Returns the name of an instruction code for reports.
+
+    Arguments:
+        instruction (int): The instruction code or None (nothing sent yet)
+
+    Returns:
+        The name (str).
+    """
+
+    if ( instruction is None ):
+        return 'none'
+
+    return INSTRUCTIONNAMES.get(instruction, hex(instruction))
+
+
+class LatencyHistogram(object):
+    """
+        Cumulative-bucket latency histogram in the Prometheus layout.
+    """
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+
+    def __init__(self, bounds = LATENCYBUCKETS):
+        self.bounds = bounds
+        ## One more bucket for everything above the last bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        """
+        Estimates a quantile as the upper bound of its bucket.
+
+        Arguments:
+            q (float): The quantile, e.g. 0.99
+
+        Returns:
+            Seconds (float), infinity above the last bound or None without samples.
+        """
+
+        if ( self.count == 0 ):
+            return None
+
+        rank = q * self.count
+        seen = 0
+
+        for (index, count) in enumerate(self.counts):
+            seen += count
+            if ( seen >= rank ):
+                return self.bounds[index] if index < len(self.bounds) else float('inf')
+
+        return float('inf')
+
+    def toDict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip(self.bounds + (float('inf'),), self.counts)),
+        }
+
+
+class OpcodeMetrics(object):
+    """
+        Wire counters and phase latencies of one instruction code.
+
+        write: serial write calls, encode: packet building in Python,
+        wait: until a received header was complete (sensor processing
+        and wire time), read: the rest of a packet, parse: checksum and
+        decoding in Python, roundtrip: command sent to first answer.
+    """
+
+    PHASES = ('roundtrip', 'encode', 'write', 'wait', 'read', 'parse')
+
+    def __init__(self, bounds = LATENCYBUCKETS):
+        for phase in self.PHASES:
+            setattr(self, phase, LatencyHistogram(bounds))
+
+        self.packetsSent = 0
+        self.packetsReceived = 0
+        self.bytesSent = 0
+        self.bytesReceived = 0
+        self.errors = 0
+        self.timeouts = 0
+        ## Acknowledge status code -> count
+        self.statuses = {}
+
+    def toDict(self):
+        result = dict((phase, getattr(self, phase).toDict()) for phase in self.PHASES)
+        result.update({
+            'packetsSent': self.packetsSent,
+            'packetsReceived': self.packetsReceived,
+            'bytesSent': self.bytesSent,
+            'bytesReceived': self.bytesReceived,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'statuses': dict(self.statuses),
+        })
+        return result
+
+
+class CommandMetrics(object):
+    """
+        Collected by `PyFingerprint.enableMetrics()`.
+
+        Per public driver method: latency histogram and failures.
+        Per instruction code: see OpcodeMetrics. Bytes and packets of
+        bulk writes (data packets) count for the preceding command.
+
+            metrics = f.enableMetrics()
+            f.searchOccupied()
+            print(metrics.stats()['opcodes']['searchTemplate']['wait'])
+            open('r305.prom', 'w').write(metrics.prometheus())
+    """
+
+    def __init__(self, bounds = LATENCYBUCKETS):
+        self.bounds = tuple(bounds)
+        self.reset()
+
+    def reset(self):
+        self.commands = {}
+        self.commandErrors = {}
+        self.opcodes = {}
+
+    def opcode(self, instruction):
+        """
+        Returns the OpcodeMetrics of an instruction code, created on first use.
+        """
+
+        entry = self.opcodes.get(instruction)
+
+        if ( entry is None ):
+            entry = self.opcodes[instruction] = OpcodeMetrics(self.bounds)
+
+        return entry
+
+    def observeCommand(self, name, seconds, failed):
+        histogram = self.commands.get(name)
+
+        if ( histogram is None ):
+            histogram = self.commands[name] = LatencyHistogram(self.bounds)
+            self.commandErrors[name] = 0
+
+        histogram.observe(seconds)
+
+        if ( failed == True ):
+            self.commandErrors[name] += 1
+
+    def stats(self):
+        """
+        Returns all values as plain dicts (seconds), instructions by name.
+        """
+
+        commands = {}
+
+        for (name, histogram) in list(self.commands.items()):
+            commands[name] = histogram.toDict()
+            commands[name]['errors'] = self.commandErrors.get(name, 0)
+
+        return {
+            'commands': commands,
+            'opcodes': dict((instructionName(instruction), entry.toDict())
+                            for (instruction, entry) in list(self.opcodes.items())),
+        }
+
+    def prometheus(self, prefix = 'r305', labels = None):
+        """
+        Renders the metrics in the Prometheus text exposition format.
+
+        Arguments:
+            prefix (str): The metric name prefix
+            labels (dict): Labels added to every sample, e.g. {'sensor': 'door'}
+
+        Returns:
+            The text (str).
+        """
+
+        extra = ''.join(',%s="%s"' % (key, value) for (key, value) in sorted((labels or {}).items()))
+        lines = []
+
+        def histogram(name, help, samples):
+            lines.append('# HELP %s_%s %s' % (prefix, name, help))
+            lines.append('# TYPE %s_%s histogram' % (prefix, name))
+
+            for (label, value) in samples:
+                cumulative = 0
+
+                for (bound, count) in zip(value.bounds + (float('inf'),), value.counts):
+                    cumulative += count
+                    lines.append('%s_%s_bucket{%s%s,le="%s"} %d' % (
+                        prefix, name, label, extra, '+Inf' if bound == float('inf') else repr(bound), cumulative))
+
+                lines.append('%s_%s_sum{%s%s} %r' % (prefix, name, label, extra, value.sum))
+                lines.append('%s_%s_count{%s%s} %d' % (prefix, name, label, extra, value.count))
+
+        def counter(name, help, samples):
+            lines.append('# HELP %s_%s %s' % (prefix, name, help))
+            lines.append('# TYPE %s_%s counter' % (prefix, name))
+
+            for (label, value) in samples:
+                lines.append('%s_%s{%s%s} %d' % (prefix, name, label, extra, value))
+
+        commands = sorted(self.commands.items())
+        opcodes = sorted((instructionName(instruction), entry) for (instruction, entry) in list(self.opcodes.items()))
+
+        histogram('command_seconds', 'Latency of the public driver methods.',
+                  [('command="%s"' % name, value) for (name, value) in commands])
+        counter('command_errors_total', 'Driver methods that raised.',
+                [('command="%s"' % name, self.commandErrors.get(name, 0)) for (name, value) in commands])
+
+        for phase in OpcodeMetrics.PHASES:
+            histogram('opcode_%s_seconds' % phase, 'Time per instruction in the %s phase.' % phase,
+                      [('opcode="%s"' % name, getattr(entry, phase)) for (name, entry) in opcodes])
+
+        for (field, name, help) in (
+            ('packetsSent', 'packets_sent_total', 'Packets written to the sensor.'),
+            ('packetsReceived', 'packets_received_total', 'Packets read from the sensor.'),
+            ('bytesSent', 'bytes_sent_total', 'Bytes written to the sensor.'),
+            ('bytesReceived', 'bytes_received_total', 'Bytes read from the sensor.'),
+            ('errors', 'packet_errors_total', 'Failed packet reads (timeouts, bad headers and checksums).'),
+            ('timeouts', 'packet_timeouts_total', 'Packet reads without an answer in time.'),
+        ):
+            counter(name, help, [('opcode="%s"' % opcodeName, getattr(entry, field))
+                                 for (opcodeName, entry) in opcodes])
+
+        counter('ack_status_total', 'Acknowledge status codes per instruction.',
+                [('opcode="%s",status="0x%02x"' % (name, status), count)
+                 for (name, entry) in opcodes for (status, count) in sorted(entry.statuses.items())])
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,178 @@
+class TemplateOccupancy(object):
+    """
+        Host-side bitmap of the used template positions of a sensor.
+
+        Bit `n` of an integer is set when position `n` holds a template,
+        which is the same bit order the sensor uses for its index pages.
+    """
+
+    __capacity = None
+    __bits = None
+    __firstFree = None
+
+    def __init__(self, capacity, bits = 0):
+        """
+        Constructor
+
+        Arguments:
+            capacity (int): The storage capacity of the sensor
+            bits (int): The initial bitmap
+        """
+
+        if ( capacity < 0 ):
+            raise ValueError('The given capacity is invalid!')
+
+        self.__capacity = capacity
+        self.__bits = bits & ((1 << capacity) - 1)
+        self.__firstFree = None
+
+    @classmethod
+    def fromIndexPages(cls, capacity, pages):
+        """
+        Builds the bitmap from raw template index pages.
+
+        Arguments:
+            capacity (int): The storage capacity of the sensor
+            pages (list): The raw bytes of the index pages, starting with page 0
+
+        Returns:
+            The bitmap (TemplateOccupancy).
+        """
+
+        bits = 0
+        shift = 0
+
+        for page in pages:
+            bits |= int.from_bytes(bytes(page), 'little') << shift
+            shift += len(page) * 8
+
+        return cls(capacity, bits)
+
+    def __mask(self, positionNumber, count):
+        if ( positionNumber < 0 or count < 0 or positionNumber + count > self.__capacity ):
+            raise ValueError('The given position number is invalid!')
+
+        return ((1 << count) - 1) << positionNumber
+
+    @property
+    def capacity(self):
+        return self.__capacity
+
+    def isOccupied(self, positionNumber):
+        """
+        Checks if a position holds a template.
+
+        Arguments:
+            positionNumber (int): The position
+
+        Returns:
+            True if the position is used or False otherwise.
+
+        Raises:
+            ValueError: if the position is outside of the capacity
+        """
+
+        if ( positionNumber < 0 or positionNumber >= self.__capacity ):
+            raise ValueError('The given position number is invalid!')
+
+        return (self.__bits >> positionNumber) & 1 == 1
+
+    def setOccupied(self, positionNumber, count = 1):
+        """
+        Marks positions as used.
+
+        Arguments:
+            positionNumber (int): The first position
+            count (int): The number of positions
+        """
+
+        self.__bits |= self.__mask(positionNumber, count)
+
+        if ( self.__firstFree is not None and positionNumber <= self.__firstFree < positionNumber + count ):
+            self.__firstFree = None
+
+    def setFree(self, positionNumber, count = 1):
+        """
+        Marks positions as free.
+
+        Arguments:
+            positionNumber (int): The first position
+            count (int): The number of positions
+        """
+
+        self.__bits &= ~self.__mask(positionNumber, count)
+
+        if ( count > 0 and self.__firstFree is not None and ( self.__firstFree == -1 or positionNumber < self.__firstFree ) ):
+            self.__firstFree = positionNumber
+
+    def clear(self):
+        """
+        Marks all positions as free.
+        """
+
+        self.__bits = 0
+        self.__firstFree = 0 if self.__capacity > 0 else -1
+
+    def firstFree(self):
+        """
+        Gets the lowest free position.
+
+        The result is cached until a change may move it.
+
+        Returns:
+            The position (int) or -1 if all positions are used.
+        """
+
+        if ( self.__firstFree is None ):
+            ## Adding one flips the trailing used bits to zero and sets the first free bit
+            position = ((self.__bits + 1) & ~self.__bits).bit_length() - 1
+            self.__firstFree = position if position < self.__capacity else -1
+
+        return self.__firstFree
+
+    def count(self):
+        """
+        Gets the number of used positions.
+
+        Returns:
+            The count (int).
+        """
+
+        return bin(self.__bits).count('1')
+
+    def ranges(self):
+        """
+        Iterates over the runs of used positions.
+
+        Returns:
+            A generator of tuples (first position, count).
+        """
+
+        bits = self.__bits
+
+        while ( bits ):
+            start = (bits & -bits).bit_length() - 1
+            run = bits >> start
+            length = ((run + 1) & ~run).bit_length() - 1
+
+            yield (start, length)
+
+            bits &= ~(((1 << length) - 1) << start)
+
+    def positions(self):
+        """
+        Iterates over the used positions.
+
+        Returns:
+            A generator of positions (int).
+        """
+
+        for (start, length) in self.ranges():
+            for positionNumber in range(start, start + length):
+                yield positionNumber
+
+    def __len__(self):
+        return self.count()
+
+    def __contains__(self, positionNumber):
+        return 0 <= positionNumber < self.__capacity and self.isOccupied(positionNumber)
@@ -0,0 +1,179 @@
+import threading
+import time
+
+"""Adaptive finger detection for the R305 sensor"""
+
+
+class FingerPoller():
+    """Waits for a finger by polling readImage() with an adaptive interval.
+
+    Right after activity (a detected finger or a call to wake()) the sensor
+    is polled every `fast_interval` seconds. Every empty poll multiplies the
+    interval by `backoff` up to `idle_interval`, so an untouched sensor costs
+    a few commands per second instead of a busy loop.
+
+    Example:
+        poller = FingerPoller(f, fast_interval=0.02, idle_interval=0.3)
+        if poller.wait(deadline=10):
+            f.convertImage(Finger.CHARBUFFER1)
+        print(poller.stats())
+    """
+
+    def __init__(self, sensor, fast_interval=0.02, idle_interval=0.3,
+                 backoff=1.5, active_window=5.0, deadline=None):
+        """
+        Args:
+            sensor (PyFingerprint): The sensor to poll
+            fast_interval (float): Poll interval right after activity in seconds
+            idle_interval (float): Longest poll interval in seconds
+            backoff (float): Factor applied to the interval after each empty poll
+            active_window (float): Seconds after activity during which waits start fast
+            deadline (float): Default overall wait limit in seconds, None waits forever
+        """
+        if fast_interval < 0 or idle_interval < fast_interval or backoff < 1:
+            raise ValueError('The given poll intervals are invalid!')
+
+        self.sensor = sensor
+        self.fast_interval = fast_interval
+        self.idle_interval = idle_interval
+        self.backoff = backoff
+        self.active_window = active_window
+        self.deadline = deadline
+
+        self._last_activity = None
+        self._wakeup = threading.Event()
+        self._cancelled = False
+
+        self.detections = 0
+        self.polls = 0
+        self.last_latency = None
+        self.last_wait = None
+        self._latencies = []
+
+    def wake(self):
+        """
+            Signals activity: the current wait polls fast again.
+        """
+        self._last_activity = time.monotonic()
+        self._wakeup.set()
+
+    def cancel(self):
+        """
+            Makes the current wait return False as soon as possible.
+        """
+        self._cancelled = True
+        self._wakeup.set()
+
+    def _start_interval(self, now):
+        if (self._last_activity is not None and
+                now - self._last_activity < self.active_window):
+            return self.fast_interval
+        return self.idle_interval
+
+    def wait(self, deadline=None):
+        """Polls the sensor until a finger image was read.
+
+        Args:
+            deadline (float): Wait limit in seconds, defaults to self.deadline
+
+        Returns:
+            True if a finger was detected (the image is in the image buffer),
+            False if the deadline passed or the wait was cancelled.
+        """
+        if deadline is None:
+            deadline = self.deadline
+
+        started = time.monotonic()
+        end = None if deadline is None else started + deadline
+        interval = self._start_interval(started)
+        self._cancelled = False
+        previous_poll = None
+
+        while True:
+            poll_started = time.monotonic()
+            self.polls += 1
+
+            if self.sensor.readImage() is True:
+                now = time.monotonic()
+                self.detections += 1
+                self.last_wait = now - started
+                # The finger was not there at the previous poll, so the time
+                # since that poll bounds the detection latency
+                self.last_latency = now - (previous_poll or poll_started)
+                self._latencies.append(self.last_latency)
+                del self._latencies[:-1000]
+                self._last_activity = now
+                return True
+
+            previous_poll = poll_started
+
+            if self._cancelled:
+                return False
+
+            now = time.monotonic()
+            if end is not None and now >= end:
+                return False
+
+            pause = interval if end is None else min(interval, end - now)
+            self._wakeup.clear()
+            if self._wakeup.wait(pause):
+                if self._cancelled:
+                    return False
+                interval = self.fast_interval
+            else:
+                interval = min(interval * self.backoff, self.idle_interval)
+
+    def wait_lift(self, settle=0.1, deadline=None):
+        """Polls the sensor until the finger is gone.
+
+        Bounces (a finger briefly lost and pressed again) do not count as
+        a lift, the sensor has to stay empty for `settle` seconds.
+
+        Args:
+            settle (float): Seconds without a finger that make a lift
+            deadline (float): Wait limit in seconds, None waits forever
+
+        Returns:
+            True if the finger was lifted, False if the deadline passed or
+            the wait was cancelled.
+        """
+        started = time.monotonic()
+        end = None if deadline is None else started + deadline
+        self._cancelled = False
+        empty_since = None
+
+        while True:
+            self.polls += 1
+            now = time.monotonic()
+
+            if self.sensor.readImage() is True:
+                empty_since = None
+            elif empty_since is None:
+                empty_since = now
+            if empty_since is not None and now - empty_since >= settle:
+                self._last_activity = now
+                return True
+
+            if self._cancelled:
+                return False
+            if end is not None and now >= end:
+                return False
+
+            self._wakeup.clear()
+            if self._wakeup.wait(self.fast_interval) and self._cancelled:
+                return False
+
+    def stats(self):
+        """
+            Returns detection statistics (latencies in seconds)
+        """
+        latencies = sorted(self._latencies)
+        return {
+            'detections': self.detections,
+            'polls': self.polls,
+            'last_wait': self.last_wait,
+            'last_latency': self.last_latency,
+            'mean_latency': (sum(latencies) / len(latencies)
+                             if latencies else None),
+            'max_latency': latencies[-1] if latencies else None,
+        }
@@ -0,0 +1,313 @@
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from .config import Finger
+from .R305 import PyFingerprint
+from .poller import FingerPoller
+
+"""Several R305 sensors used as one template database"""
+
+
+class PooledSensor():
+    """One sensor of a SensorPool with its own I/O worker thread.
+
+    Only the worker thread talks to the sensor, so commands for one
+    device are serialized while different devices run in parallel.
+
+    The device becomes unhealthy after `max_failures` failed commands
+    among the last `window` ones (so a device failing every other
+    command is caught too). Only a successful open makes it healthy
+    again.
+    """
+
+    def __init__(self, index, port, max_failures=3, window=10):
+        self.index = index
+        self.port = port
+        self.max_failures = max_failures
+        self.sensor = None
+        self.poller = None
+
+        self.healthy = False
+        self.failures = 0
+        self.errors = 0
+        self.commands = 0
+        self.last_error = None
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='r305-%d' % index)
+        self._lock = threading.Lock()
+        self._latencies = {}
+        # True per failed command, the last `window` ones
+        self._outcomes = collections.deque(maxlen=max(window, max_failures))
+
+    def submit(self, name, func, *args):
+        """Runs func(sensor, *args) on the worker of this device.
+
+        Args:
+            name (str): Operation name for the latency statistics
+
+        Returns:
+            A concurrent.futures.Future
+        """
+        return self._executor.submit(self._call, name, func, *args)
+
+    def _call(self, name, func, *args):
+        if self.sensor is None and func != self._open:
+            raise RuntimeError('The device is not open: %s' % self.port)
+
+        started = time.perf_counter()
+        try:
+            result = func(self.sensor, *args)
+        except ValueError:
+            raise
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                # Failed commands in a row
+                self.failures += 1
+                self.last_error = str(e)
+                self._outcomes.append(True)
+                if sum(self._outcomes) >= self.max_failures:
+                    self.healthy = False
+            raise
+
+        latency = time.perf_counter() - started
+        with self._lock:
+            self.commands += 1
+            self.failures = 0
+            self._outcomes.append(False)
+            samples = self._latencies.setdefault(name, [])
+            samples.append(latency)
+            del samples[:-1000]
+
+        return result
+
+    def _open(self, sensor, baudRate, address, password):
+        if self.sensor is None:
+            self.sensor = PyFingerprint(self.port, baudRate, address, password)
+            self.poller = FingerPoller(self.sensor)
+
+        if self.sensor.verifyPassword() is False:
+            raise ValueError('The given fingerprint sensor password is wrong!')
+
+        with self._lock:
+            self._outcomes.clear()
+            self.healthy = True
+
+        return True
+
+    def stats(self):
+        """
+            Returns health and per operation latencies (milliseconds)
+        """
+        with self._lock:
+            operations = {}
+            for name, samples in self._latencies.items():
+                ordered = sorted(samples)
+                operations[name] = {
+                    'count': len(ordered),
+                    'mean_ms': sum(ordered) / len(ordered) * 1000,
+                    'p50_ms': ordered[len(ordered) // 2] * 1000,
+                    'p99_ms': ordered[min(len(ordered) - 1,
+                                          int(len(ordered) * 0.99))] * 1000,
+                    'max_ms': ordered[-1] * 1000,
+                }
+
+            return {
+                'device': self.index,
+                'port': self.port,
+                'healthy': self.healthy,
+                'commands': self.commands,
+                'errors': self.errors,
+                'failures': self.failures,
+                'recent_failures': sum(self._outcomes),
+                'last_error': self.last_error,
+                'operations': operations,
+            }
+
+    def close(self):
+        def close(sensor):
+            if sensor is not None:
+                sensor.close()
+
+        try:
+            self._executor.submit(close, self.sensor).result()
+        finally:
+            self._executor.shutdown()
+            self.healthy = False
+
+
+class SensorPool():
+    """Manages sensors on several ports as one template database.
+
+    Templates are spread over the devices (a new one goes to the device
+    with the most free positions) and a search runs on all healthy
+    devices in parallel. A device is marked unhealthy after
+    `max_failures` failed commands among its last `window` ones and
+    skipped until probe() reaches it again.
+
+    Example:
+        pool = SensorPool(['/dev/ttyUSB0', '/dev/ttyUSB1'])
+        characteristics = pool.capture(0, deadline=10)
+        device, position, score = pool.search(characteristics)
+        print(pool.stats())
+    """
+
+    def __init__(self, ports, baudRate=57600, address=0xFFFFFFFF,
+                 password=0x00000000, max_failures=3, window=10):
+        """
+        Args:
+            ports (list): The ports (device paths or pyserial URLs)
+            baudRate (int): The baud rate of all sensors
+            address (int): The sensor address
+            password (int): The sensor password
+            max_failures (int): Failed commands before a device is unhealthy
+            window (int): The number of recent commands max_failures counts in
+        """
+        if not ports:
+            raise ValueError('At least one port is required!')
+
+        self.baudRate = baudRate
+        self.address = address
+        self.password = password
+        self.last_probe = None
+        self.devices = [PooledSensor(index, port, max_failures, window)
+                        for index, port in enumerate(ports)]
+        self.probe()
+
+    def healthy_devices(self):
+        return [device for device in self.devices if device.healthy]
+
+    def _fan_out(self, devices, name, func, *args):
+        """Runs func on every given device and waits for all of them.
+
+        Returns:
+            A list of (device, result), devices that failed are left out
+        """
+        futures = [(device, device.submit(name, func, *args))
+                   for device in devices]
+        wait([future for device, future in futures])
+
+        return [(device, future.result()) for device, future in futures
+                if future.exception() is None]
+
+    def probe(self):
+        """
+            Opens and verifies every unhealthy device again
+
+        Returns:
+            The number of healthy devices
+        """
+        started = time.perf_counter()
+        # All devices handshake at the same time, each on its own worker
+        futures = [device.submit('open', device._open, self.baudRate,
+                                 self.address, self.password)
+                   for device in self.devices if not device.healthy]
+        # Errors only leave the device unhealthy
+        wait(futures)
+        self.last_probe = time.perf_counter() - started
+
+        return len(self.healthy_devices())
+
+    def device(self, index):
+        return self.devices[index]
+
+    def capture(self, index=0, deadline=None, charBufferNumber=Finger.CHARBUFFER1):
+        """Waits for a finger on one device and downloads its characteristics.
+
+        Args:
+            index (int): The device that captures the finger
+            deadline (float): Wait limit in seconds, None waits forever
+
+        Returns:
+            The characteristics (bytes) or None if no finger was detected
+        """
+        device = self.devices[index]
+
+        def capture(sensor):
+            if device.poller.wait(deadline) is False:
+                return None
+            sensor.convertImage(charBufferNumber)
+            return sensor.downloadCharacteristics(charBufferNumber)
+
+        return device.submit('capture', capture).result()
+
+    def search(self, characteristics, charBufferNumber=Finger.CHARBUFFER1):
+        """Searches the characteristics on all healthy devices in parallel.
+
+        Returns:
+            The best match as (device index, position, accuracy score),
+            (None, -1, -1) if no device found the finger
+        """
+        def search(sensor):
+            sensor.uploadCharacteristics(charBufferNumber, characteristics,
+                                         verify=False)
+            return sensor.searchOccupied(charBufferNumber)
+
+        best = (None, -1, -1)
+        for device, (position, score) in self._fan_out(
+                self.healthy_devices(), 'search', search):
+            if position >= 0 and score > best[2]:
+                best = (device.index, position, score)
+
+        return best
+
+    def free_positions(self):
+        """
+        Returns:
+            A dict of device index to number of free positions (healthy devices)
+        """
+        def free(sensor):
+            occupancy = sensor.getTemplateOccupancy()
+            return occupancy.capacity - occupancy.count()
+
+        return {device.index: count for device, count in
+                self._fan_out(self.healthy_devices(), 'free', free)}
+
+    def enroll(self, characteristics, charBufferNumber=Finger.CHARBUFFER1):
+        """Stores characteristics on the device with the most free positions.
+
+        Returns:
+            (device index, position)
+        """
+        free = self.free_positions()
+        if not free or max(free.values()) == 0:
+            raise Exception('There is no free position left to store the template')
+
+        index = max(free, key=free.get)
+
+        def store(sensor):
+            sensor.uploadCharacteristics(charBufferNumber, characteristics,
+                                         verify=False)
+            return sensor.storeTemplate(-1, charBufferNumber)
+
+        return index, self.devices[index].submit('store', store).result()
+
+    def delete(self, index, position):
+        return self.devices[index].submit(
+            'delete', lambda sensor: sensor.deleteTemplate(position)).result()
+
+    def template_count(self):
+        """
+            Returns the number of templates on all healthy devices
+        """
+        return sum(count for device, count in self._fan_out(
+            self.healthy_devices(), 'count',
+            lambda sensor: sensor.getTemplateOccupancy().count()))
+
+    def stats(self):
+        """
+            Returns the statistics of every device (see PooledSensor.stats)
+        """
+        return [device.stats() for device in self.devices]
+
+    def close(self):
+        for device in self.devices:
+            device.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,423 @@
+import argparse
+import http.client
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .worker import SensorWorker, summarize, record_sample
+
+"""Local JSON API of one warm sensor session
+
+    Endpoints:
+        POST /recognize                     FingerPrint.recognize() result
+        POST /enroll    {"name": "thanh"}   FingerPrint.enroll() result
+        POST /remove    {"name": "thanh"}   The status after the removal
+        GET  /template_count                {"count": 12}
+        GET  /events                        Status events, one JSON line each,
+                                            empty lines keep an idle stream alive
+        GET  /stats                         Latency per endpoint and worker stats
+        GET  /metrics                       Driver metrics, Prometheus text format
+
+    Usage:
+        python -m functions.server --device /dev/ttyS0 --unix /tmp/r305.sock
+        python -m functions.server --device /dev/ttyS0 --port 8305
+"""
+
+
+# Seconds between keepalive lines of an idle /events stream
+KEEPALIVE = 15.0
+
+
+def _remove_stale_socket(path):
+    """
+        Removes the socket file of a previous run, not a live server or another file
+    """
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise OSError('Not a socket, will not replace it: ' + path)
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        # Nobody listens any more
+        os.remove(path)
+        return
+    finally:
+        probe.close()
+    raise OSError('A server is already listening on ' + path)
+
+
+class _UnixHTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        _remove_stale_socket(self.server_address)
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.api._dispatch(self, 'GET')
+
+    def do_POST(self):
+        self.server.api._dispatch(self, 'POST')
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length == 0:
+            return {}
+        return json.loads(self.rfile.read(length).decode())
+
+    def log_message(self, format, *args):
+        # client_address is empty on Unix sockets
+        logging.debug('%s - ' + format, self.command, *args)
+
+
+class FingerprintServer():
+    """Serves one FingerPrint session to local clients over HTTP.
+
+    All sensor requests go through a SensorWorker, so any number of
+    clients can be connected at once while only this process holds the
+    port. Identical read-only requests that arrive while one is in
+    flight (template counts, recognitions of the finger on the sensor)
+    share its answer instead of queueing again.
+
+    Example:
+        server = FingerprintServer(FingerPrint('/dev/ttyS0'), unix_path='/tmp/r305.sock')
+        server.serve_forever()
+    """
+
+    ENDPOINTS = {
+        ('POST', '/recognize'): '_recognize',
+        ('POST', '/enroll'): '_enroll',
+        ('POST', '/remove'): '_remove',
+        ('GET', '/template_count'): '_template_count',
+        ('GET', '/events'): '_events',
+        ('GET', '/stats'): '_stats',
+        ('GET', '/metrics'): '_metrics',
+    }
+
+    def __init__(self, service, address=('127.0.0.1', 8305), unix_path=None):
+        """
+        Args:
+            service (FingerPrint): The sensor session to serve
+            address (tuple): Host and port of the HTTP server
+            unix_path (str): Serve on this Unix socket instead
+        """
+        self.service = service
+        self.worker = SensorWorker(service)
+        self.coalesced = 0
+        self.keepalive = KEEPALIVE
+        self._inflight = {}
+        self._latencies = {}
+        self._streams = set()
+        self._lock = threading.RLock()
+
+        if unix_path is not None:
+            self.httpd = _UnixHTTPServer(unix_path, _Handler)
+        else:
+            self.httpd = ThreadingHTTPServer(address, _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.api = self
+        self.address = self.httpd.server_address
+        self._thread = None
+
+    def _dispatch(self, handler, method):
+        path = handler.path.split('?', 1)[0]
+        endpoint = self.ENDPOINTS.get((method, path))
+        if endpoint is None:
+            handler.send_json(404, {'error': 'Unknown endpoint: ' + method + ' ' + path})
+            return
+
+        started = time.perf_counter()
+        try:
+            status, payload = getattr(self, endpoint)(handler)
+        except ValueError as e:
+            status, payload = 400, {'error': str(e)}
+        except BaseException as e:
+            # The service ends failed operations with exit(1)
+            logging.error('%s %s failed: %r' % (method, path, e))
+            status, payload = 500, {'error': repr(e)}
+
+        if payload is not None:
+            handler.send_json(status, payload)
+
+        with self._lock:
+            record_sample(self._latencies, path, time.perf_counter() - started)
+
+    def _coalesce(self, key, submit):
+        """
+            Returns the result of the request in flight for key or of a new one
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = submit()
+                self._inflight[key] = future
+                future.add_done_callback(lambda done: self._forget(key, done))
+            else:
+                self.coalesced += 1
+        return future.result()
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _recognize(self, handler):
+        return 200, self._coalesce('recognize', self.worker.recognize)
+
+    def _name(self, handler):
+        name = handler.read_json().get('name')
+        if not name:
+            raise ValueError('The name is empty!')
+        return name
+
+    def _enroll(self, handler):
+        return 200, self.worker.enroll(self._name(handler)).result()
+
+    def _remove(self, handler):
+        name = self._name(handler)
+
+        def remove(service):
+            service.remove_template_byname(name)
+            return dict(service.message)
+
+        return 200, self.worker.submit('remove_template_byname', remove).result()
+
+    def _template_count(self, handler):
+        return 200, {'count': self._coalesce(
+            'template_count', lambda: self.worker.command('getTemplateCount'))}
+
+    def _events(self, handler):
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/x-ndjson')
+        handler.send_header('Connection', 'close')
+        handler.end_headers()
+        handler.close_connection = True
+
+        with self.service.events.subscribe() as events:
+            with self._lock:
+                self._streams.add(events)
+            while not events.closed:
+                event = events.get(self.keepalive)
+                if event is not None:
+                    line = json.dumps(event._asdict(), default=str).encode() + b'\n'
+                elif events.closed:
+                    break
+                else:
+                    # An empty line: a client that went away is seen on an idle stream too
+                    line = b'\n'
+                try:
+                    handler.wfile.write(line)
+                    handler.wfile.flush()
+                except OSError:
+                    # The client went away
+                    break
+        with self._lock:
+            self._streams.discard(events)
+        return 200, None
+
+    def _stats(self, handler):
+        return 200, self.stats()
+
+    def _metrics(self, handler):
+        metrics = self.service.f.getMetrics()
+        if metrics is None:
+            return 404, {'error': 'The driver metrics are disabled (--metrics)'}
+
+        body = metrics.prometheus().encode()
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/plain; version=0.0.4')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+        return 200, None
+
+    def stats(self):
+        """
+            Returns the latency per endpoint, coalesced requests and worker stats
+        """
+        with self._lock:
+            endpoints = {path: summarize(samples)
+                         for path, samples in self._latencies.items()}
+        return {'endpoints': endpoints, 'coalesced': self.coalesced,
+                'worker': self.worker.stats()}
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def start(self):
+        """
+            Serves on a background thread
+        """
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        name='fingerprint-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """
+            Stops serving, finishes the queued sensor requests, keeps the service open
+        """
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread.join()
+        with self._lock:
+            streams = list(self._streams)
+        for events in streams:
+            events.close()
+        self.httpd.server_close()
+        self.worker.shutdown()
+        if self.httpd.address_family == socket.AF_UNIX and os.path.exists(self.address):
+            os.remove(self.address)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path, timeout):
+        http.client.HTTPConnection.__init__(self, 'localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class ServiceClient():
+    """Client of a FingerprintServer, keeps its connection open.
+
+    Use one client per thread.
+
+    Example:
+        client = ServiceClient('/tmp/r305.sock')    # or ('127.0.0.1', 8305)
+        print(client.template_count())
+        for event in client.events():
+            print(event['code'], event['message'])
+    """
+
+    def __init__(self, address, timeout=60):
+        self.address = address
+        self.timeout = timeout
+        self._connection = self._connect()
+
+    def _connect(self):
+        if isinstance(self.address, str):
+            return _UnixHTTPConnection(self.address, self.timeout)
+        return http.client.HTTPConnection(*self.address, timeout=self.timeout)
+
+    def request(self, method, path, payload=None):
+        """
+        Returns:
+            The decoded JSON answer
+
+        Raises:
+            Exception: if the server answers with an error
+        """
+        body = None if payload is None else json.dumps(payload)
+        headers = {} if body is None else {'Content-Type': 'application/json'}
+        self._connection.request(method, path, body, headers)
+        response = self._connection.getresponse()
+        result = json.loads(response.read().decode())
+        if response.status != 200:
+            raise Exception('%s %s: %d %s' % (method, path, response.status,
+                                               result.get('error')))
+        return result
+
+    def recognize(self):
+        return self.request('POST', '/recognize')
+
+    def enroll(self, name):
+        return self.request('POST', '/enroll', {'name': name})
+
+    def remove(self, name):
+        return self.request('POST', '/remove', {'name': name})
+
+    def template_count(self):
+        return self.request('GET', '/template_count')['count']
+
+    def stats(self):
+        return self.request('GET', '/stats')
+
+    def events(self):
+        """
+            Returns a generator of status events (dict), on its own connection
+        """
+        connection = self._connect()
+        connection.request('GET', '/events')
+        response = connection.getresponse()
+        try:
+            for line in response:
+                # Keepalive lines are empty
+                if line.strip():
+                    yield json.loads(line.decode())
+        finally:
+            connection.close()
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local JSON API of one warm sensor session')
+    parser.add_argument('--device', default='/dev/ttyS0')
+    parser.add_argument('--baud-rate', type=int, default=57600)
+    parser.add_argument('--fast-link', action='store_true')
+    parser.add_argument('--metrics', action='store_true',
+                        help='record driver metrics, served on /metrics')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8305)
+    parser.add_argument('--unix', help='serve on this Unix socket instead of HTTP')
+    args = parser.parse_args()
+
+    from .services import FingerPrint
+
+    service = FingerPrint(args.device, args.baud_rate, fast_link=args.fast_link,
+                          metrics=args.metrics)
+    server = FingerprintServer(service, (args.host, args.port), args.unix)
+    logging.info('Serving %s on %s' % (args.device, server.address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
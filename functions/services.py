@@ -2,10 +2,13 @@ import logging
 import os
 import time
 import hashlib
-import csv
-import pandas as pd
 from .config import Finger
-from .R305 import PyFingerprint
+from .R305 import PyFingerprint, ResponseTimeout
+from .backup import TemplateWriter, read_templates
+from .cache import CharacteristicsCache
+from .identity import IdentityStore, SQLiteIdentityStore
+from .events import EventBus, Recognition, EVENT_ENROLL, EVENT_RECOGNIZE, EVENT_REMOVE
+from .poller import FingerPoller
 
 """R305 fingerprint sensor for raspbbery pi 4"""
 __author__ = "Thanhlv"
@@ -21,72 +24,202 @@ logging.basicConfig(format='[%(levelname)s] - %(message)s', level=logging.INFO)
 class FingerPrint():
 
     def __init__(self, port='/dev/ttyS0', baudRate=57600,
-                 address=0xFFFFFFFF, password=0x00000000):
+                 address=0xFFFFFFFF, password=0x00000000,
+                 fast_link=False, restore_link=True,
+                 cache_path=None, metrics=False):
 
         self.port = port
         self.baudRate = baudRate
         self.address = address
         self.password = password
         self.message = {'code':'None', 'message':''}
+        # Status events of enroll/recognize/remove, see _status()
+        self.events = EventBus()
         self.db_path = './data/database.csv'
+        self._identities = None
+        # Seconds to wait between the two captures of enroll()
+        self.enroll_delay = 2
+        self._streaming = False
 
 
 
         """Manager R305 services
         """
 
+        # Seconds spent per startup step, see startup_report()
+        self.startup_timings = {}
+        started = time.perf_counter()
+
         try:
             self.f = PyFingerprint(self.port, self.baudRate,
                                    self.address, self.password)
-
-            if (self.f.verifyPassword() is False):
+            # Latency histograms and wire counters, see f.getMetrics()
+            if metrics:
+                self.f.enableMetrics()
+            started = self._startup_step('open', started)
+
+            try:
+                verified = self.f.verifyPassword()
+            except ResponseTimeout:
+                # An unclean shutdown may have left the sensor at the fast link
+                # speed, only this service changes it and only with fast_link
+                if not fast_link:
+                    raise
+                found = self.f.recoverBaudRate()
+                if found != self.baudRate:
+                    logging.warning('Sensor found at %d baud, set back to %d' % (found, self.baudRate))
+                verified = self.f.verifyPassword()
+
+            if (verified is False):
                 raise ValueError('The given fingerprint sensor password is wrong!')
+            started = self._startup_step('handshake', started)
+
+            # Opt-in: 115200 baud and 256 byte packets, falls back on failure
+            if fast_link:
+                link = self.f.enableFastLink(restoreOnClose=restore_link)
+                logging.info('Link: %d baud, %d byte packets' % link)
+                started = self._startup_step('fast_link', started)
+
+            # Opt-in host copy of the stored characteristics. Its entries are
+            # trusted across restarts, so only use it if nothing else enrolls
+            # on this sensor (see PyFingerprint.setCharacteristicsCache)
+            if cache_path is not None:
+                self.f.setCharacteristicsCache(CharacteristicsCache(
+                    cache_path, self.f.getStorageCapacity(), self.address))
+                started = self._startup_step('cache', started)
 
         except Exception as e:
             logging.error('The fingerprint sensor could not be initialized!')
             logging.error('Exception message: ' + str(e))
             exit(1)
 
+        # Finger detection, tune intervals/deadline here
+        self.poller = FingerPoller(self.f)
+
         self.status = False
 
+        logging.debug(self.startup_report())
+
+
+    def _status(self, kind, code, message, **data):
+        """Publish a status event, self.message keeps the latest one
 
-    def enroll(self):
+        Args:
+            kind (String): EVENT_ENROLL, EVENT_RECOGNIZE or EVENT_REMOVE
+            code (String): Status code, see functions.events.StatusEvent
+            message (String): Text for the user
+        """
+        self.message = {'code': code, 'message': message}
+        self.events.publish(kind, code, message, **data)
+
+
+    def _startup_step(self, name, started):
+        now = time.perf_counter()
+        self.startup_timings[name] = now - started
+        return now
+
+
+    def startup_report(self):
+        """
+            Startup time per step (open, handshake, fast_link, cache)
+        """
+        return 'Startup: ' + ', '.join(
+            '%s %.1f ms' % (name, seconds * 1000)
+            for name, seconds in self.startup_timings.items())
+
+
+    @property
+    def identities(self):
+        """
+            Names by template position, loaded from db_path on first use.
+            A db_path ending in .db, .sqlite or .sqlite3 uses SQLite.
+        """
+        if self._identities is None or self._identities.path != self.db_path:
+            if self._identities is not None:
+                self._identities.close()
+            if self.db_path.endswith(('.db', '.sqlite', '.sqlite3')):
+                self._identities = SQLiteIdentityStore(self.db_path)
+            else:
+                self._identities = IdentityStore(self.db_path)
+
+        return self._identities
+
+
+    def import_identities(self, csv_path='./data/database.csv'):
+        """
+            Import the names of a CSV database into the current database
+        """
+        count = self.identities.import_csv(csv_path)
+        logging.info('Imported identities, %d names registered' % count)
+
+        return count
+
+
+    def close(self):
+        """
+            Restore the link settings if requested and close the sensor port.
+        """
+        self.f.close()
+
+        if self._identities is not None:
+            self._identities.close()
+
+        cache = self.f.getCharacteristicsCache()
+        if cache is not None:
+            cache.close()
+
+
+    def enroll(self, name=None, detected=False, deadline=None):
         """
             Enrolling template for new staff.
+
+        Args:
+            name (String): Username, asked on stdin if not given
+            detected (bool): The first finger image is already in the image buffer
+            deadline (float): Wait limit per touch in seconds, defaults to poller.deadline
         """
+        # Checked before the captures, the template would have no identity
+        if name is not None and name in self.identities:
+            logging.info('Name is registed!!!')
+            self._status(EVENT_ENROLL, '204', 'Name is already registered',
+                         name=name)
+            res = {'code': '204', 'status': 'NOT',
+                   'message': 'Name is already registered'}
+            return res
+
         # Tries to enroll new finger
         try:
-            self.message = {'code':'100', 'message':'Please give template simple'}
-            
+            self._status(EVENT_ENROLL, '100', 'Please give template simple')
+
             # Wait that finger is read
-            while (self.f.readImage() is False):
-                self.message = {'code':'101', 'massage':'Waiting for template simple'}
-                pass
-            
+            self._status(EVENT_ENROLL, '101', 'Waiting for template simple')
+            if not detected:
+                self._wait_finger(deadline)
+
             # Converts read image to characteristics
             # and stores it in charbuffer 1
             self.f.convertImage(Finger.CHARBUFFER1)
             # Checks if finger is already enrolled
-            result = self.f.searchTemplate()
+            result = self.f.searchOccupied()
             positionNumber = result[0]
 
             if (positionNumber >= 0):
-                self.message = {'code':'200', 'message':'You has been registered'}
+                self._status(EVENT_ENROLL, '200', 'You has been registered',
+                             position=positionNumber)
                 logging.info('Template already exists at position #' +
                              str(positionNumber))
                 res = {'code': '200', 'status': '',
                        'message': 'Registered'}
                 return res
                 exit(0)
-            self.message = {'code':'101', 'message':'Processing .....'}
+            self._status(EVENT_ENROLL, '101', 'Processing .....')
             logging.info('Proccessing...')
-            time.sleep(2)
+            time.sleep(self.enroll_delay)
 
             logging.info('Waiting for same finger again...')
-            self.message = {'code':'102', 'message':'Please try again ......'}
+            self._status(EVENT_ENROLL, '102', 'Please try again ......')
             # Wait that finger is read again
-            while (self.f.readImage() is False):
-                pass
+            self._wait_finger(deadline)
 
             # Converts read image to characteristics
             # and stores it in charbuffer 2
@@ -94,7 +227,7 @@ class FingerPrint():
 
             # Compares the charbuffers
             if (self.f.compareCharacteristics() == 0):
-                self.message = {'code':'401', ' message':'Not matching '}
+                self._status(EVENT_ENROLL, '401', 'Not matching')
                 res = {'code': '200', 'status': 'NO',
                        'message': 'Fingers do not match'}
 
@@ -108,14 +241,22 @@ class FingerPrint():
             logging.info('Finger enrolled successfully!')
             logging.info('New template position #' + str(positionNumber))
 
-            self._enter_info(positionNumber)
-            message = {'code': '200', 'status': 'DONE',
+            if not self._enter_info(positionNumber, name):
+                # Do not keep a template without an identity
+                self.f.deleteTemplate(positionNumber)
+                raise Exception('The name could not be registered')
+
+            self._status(EVENT_ENROLL, '200', 'Finger enrolled successfully',
+                         position=positionNumber)
+            res = {'code': '200', 'status': 'DONE',
                    'message': 'Finger enrolled successfully'}
             return res
 
         except Exception as e:
             logging.error('Operation failed!')
             logging.error('Exception message: ' + str(e))
+            self._status(EVENT_ENROLL, '204', 'Please try again !!!',
+                         error=str(e))
             res = {'code': '204', 'status': 'NOT',
                    'message': 'Please try again !!!'}
             return res
@@ -137,16 +278,24 @@ class FingerPrint():
         
         position = self._delete_info(name)  # Delete infor in database
 
+        if position is None:
+            logging.info('Name is not registered: ' + name)
+            self._status(EVENT_REMOVE, '204', 'Name is not registered',
+                         name=name)
+            return
+
         try:
             positionNumber = position
             positionNumber = int(positionNumber)
 
             if (self.f.deleteTemplate(positionNumber) is True):
-                print('Template deleted!')
+                self._status(EVENT_REMOVE, '200', 'Template deleted',
+                             name=name, position=positionNumber)
 
         except Exception as e:
             logging.error('Operation failed!')
             logging.error('Exception message: ' + str(e))
+            self._status(EVENT_REMOVE, '204', 'Operation failed', error=str(e))
             exit(1)
     def remove_template_bypos(self, position):
 
@@ -166,43 +315,53 @@ class FingerPrint():
             positionNumber = int(positionNumber)
 
             if (self.f.deleteTemplate(positionNumber) is True):
-                print('Template deleted!')
+                name = self.identities.remove_position(positionNumber)
+                self._status(EVENT_REMOVE, '200', 'Template deleted',
+                             name=name, position=positionNumber)
 
         except Exception as e:
             logging.error('Operation failed!')
             logging.error('Exception message: ' + str(e))
+            self._status(EVENT_REMOVE, '204', 'Operation failed', error=str(e))
             exit(1)
 
-    def recognize(self):
+    def recognize(self, detected=False):
         """
             Matching template in fingerprint and database.
+
+        Args:
+            detected (bool): The finger image is already in the image buffer
         """
 
         try:
+            occupancy = self.f.getTemplateOccupancy()
             logging.info('Currently used templates:\t' +
-                         str(self.f.getTemplateCount()) + '/' +
-                         str(self.f.getStorageCapacity()))
+                         str(occupancy.count()) + '/' +
+                         str(occupancy.capacity))
 
             # Tries to search the finger and calculate hash
 
             logging.info('Waiting for finger...')
+            self._status(EVENT_RECOGNIZE, '101', 'Waiting for finger')
 
             # Wait that finger is read
-            # Serial read in __readPacket
-
-            while (self.f.readImage() is False):
-                pass
+            if not detected:
+                self._wait_finger()
 
             # Converts read image to characteristics
             # and stores it in charbuffer 1
             self.f.convertImage(Finger.CHARBUFFER1)
 
-            # Searchs template
-            result = self.f.searchTemplate()
+            # Searchs the used positions, recently matched ones first
+            result = self.f.searchOccupied()
             positionNumber = result[0]
             accuracyScore = result[1]
             if (positionNumber == -1):
                 logging.info('No match found!')
+                self._status(EVENT_RECOGNIZE, '204', 'No match found')
+                res = {'code': '204', 'status': 'NOT',
+                       'message': 'No match found'}
+                return res
 
             else:
                 res = {'code': '200', 'status': '200',
@@ -211,80 +370,299 @@ class FingerPrint():
                              str(positionNumber))
                 # logging.info('Accuracy: \t' + str(accuracyScore))
 
-            # Loads the found template to charbuffer 1
-            self.f.loadTemplate(positionNumber, Finger.CHARBUFFER1)
+            if self.f.getCharacteristicsCache() is not None:
+                # Local lookup, the sensor is only asked on a cache miss
+                digest = self.f.lookupCharacteristics(positionNumber)[1]
+            else:
+                # Loads the found template to charbuffer 1
+                self.f.loadTemplate(positionNumber, Finger.CHARBUFFER1)
 
-            # Downloads the characteristics of template loaded in charbuffer 1
-            characterics = str(
-                self.f.downloadCharacteristics(
-                    Finger.CHARBUFFER1)).encode('utf-8')
+                # Downloads the characteristics of template loaded in charbuffer 1
+                characterics = self.f.downloadCharacteristics(Finger.CHARBUFFER1)
+                digest = hashlib.sha256(characterics).digest()
 
             # Hashes characteristics of template
-            logging.info('SHA-2 hash of template: \t' +
-                         hashlib.sha256(characterics).hexdigest())
+            logging.info('SHA-2 hash of template: \t' + digest.hex())
 
+            self._status(EVENT_RECOGNIZE, '200', 'Register Successfully',
+                         position=positionNumber, score=accuracyScore,
+                         name=self.identities.name(positionNumber),
+                         digest=digest.hex())
             return res
 
         except Exception as e:
             logging.error('Operation failed!')
             logging.error('Exception message: ' + str(e))
+            self._status(EVENT_RECOGNIZE, '204', 'Operation failed', error=str(e))
             exit(1)
 
 
+    def recognize_stream(self, settle=0.1, lift_deadline=None):
+        """Recognize every touch until stop_stream() or the generator is closed.
+
+        Nothing but the capture, conversion and search is sent per touch.
+        After each touch the sensor is polled until the finger was lifted
+        (see FingerPoller.wait_lift), so a finger held on the sensor
+        yields one result only. A touch that fails with a sensor error
+        publishes a '204' event with the error and the stream goes on.
+
+        Example:
+            for touch in Finger.recognize_stream():
+                if touch.matched:
+                    open_turnstile(touch.name)
+
+        Args:
+            settle (float): Seconds without a finger that end a touch
+            lift_deadline (float): Longest wait for the lift in seconds,
+                a finger held longer counts as a new touch
+
+        Returns:
+            A generator of Recognition
+        """
+        self._streaming = True
+        started = time.perf_counter()
+
+        while self._streaming:
+            try:
+                touch = self._recognize_touch(started)
+            except Exception as e:
+                self._stream_error(e)
+                started = time.perf_counter()
+                continue
+            if touch is None:
+                continue
+
+            yield touch
+
+            try:
+                self.poller.wait_lift(settle, lift_deadline)
+            except Exception as e:
+                self._stream_error(e)
+            started = time.perf_counter()
+
+
+    def _recognize_touch(self, started):
+        """
+            One touch of recognize_stream(), None if no finger came within a second
+        """
+        # Short waits, so stop_stream() is seen even if it came before the wait
+        if self.poller.wait(1.0) is False:
+            return None
+        detected = time.perf_counter()
+        timings = {'wait': detected - started,
+                   'detect': self.poller.last_latency}
+        position, score, name, error = -1, -1, None, None
+
+        try:
+            self.f.convertImage(Finger.CHARBUFFER1)
+        except Exception as e:
+            # Messy image, too few feature points...
+            error = str(e)
+        now = time.perf_counter()
+        timings['convert'] = now - detected
+
+        if error is None:
+            position, score = self.f.searchOccupied()
+            timings['search'] = time.perf_counter() - now
+            now = time.perf_counter()
+            if position >= 0:
+                name = self.identities.name(position)
+            timings['identity'] = time.perf_counter() - now
+
+        timings['total'] = time.perf_counter() - detected
+
+        if position >= 0:
+            self._status(EVENT_RECOGNIZE, '200', 'Register Successfully',
+                         position=position, score=score, name=name)
+        else:
+            self._status(EVENT_RECOGNIZE, '204', 'No match found', error=error)
+
+        return Recognition(position >= 0, position, score, name, timings,
+                           time.monotonic(), error)
+
+
+    def _stream_error(self, e):
+        """
+            Reports a failed touch of recognize_stream(), the stream goes on
+        """
+        logging.error('Recognition failed: ' + str(e))
+        self._status(EVENT_RECOGNIZE, '204', 'Sensor error', error=str(e))
+        # Do not hammer a sensor that keeps failing
+        time.sleep(self.poller.idle_interval)
+
+
+    async def arecognize_stream(self, settle=0.1, lift_deadline=None):
+        """
+            recognize_stream() for `async for`, the sensor is used from a thread of its own
+        """
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        loop = asyncio.get_running_loop()
+        stream = self.recognize_stream(settle, lift_deadline)
+        # One thread, so closing the generator waits for a running step
+        executor = ThreadPoolExecutor(1, thread_name_prefix='recognize-stream')
+        try:
+            while True:
+                touch = await loop.run_in_executor(executor, next, stream, None)
+                if touch is None:
+                    return
+                yield touch
+        finally:
+            # Also on cancellation, the current step may still be running
+            self.stop_stream()
+            executor.submit(stream.close)
+            executor.shutdown(wait=False)
+
+
+    def stop_stream(self):
+        """
+            Ends recognize_stream() after the current touch
+        """
+        self._streaming = False
+        self.poller.cancel()
+
+
+    def warm_cache(self):
+        """
+            Download the stored templates missing in the characteristics cache
+        """
+        count = self.f.fillCharacteristicsCache()
+        logging.info('Cached characteristics of %d templates' % count)
+
+        return count
+
+
     def template_number(self):
         """
-            Show number of templates
+            Get the first free template position
         """
+        occupancy = self.f.getTemplateOccupancy()
         logging.info('Currently used templates:\t' +
-                     str(self.f.getTemplateCount()) + '/' +
-                     str(self.f.getStorageCapacity()))
-        # Check in database
-        for page in range(0, 4):
-            templateIndex = self.f.getTemplateIndex(page)
-            for i in range(len(templateIndex)):
-                if templateIndex[i] is False:
-                    # Calculate position number
-                    positionNumber = len(templateIndex) * page + i
-                    return positionNumber
-                    break
-
-
-    def _enter_info(self, index):
+                     str(occupancy.count()) + '/' +
+                     str(occupancy.capacity))
+
+        return occupancy.firstFree()
+
+
+    def export_templates(self, path=None, callback=None, resume=False):
+        """Stream the characteristics of all stored templates.
+
+        Only used positions are read. Every record is handed on as soon as
+        it arrived, nothing is kept for the whole database.
+
+        Example:
+            for position, characteristics in Finger.export_templates('backup.bin'):
+                pass
+            print(Finger.export_stats)
+
+        Args:
+            path (String): Backup file to write the records to
+            callback (callable): Called with (position, characteristics) per record
+            resume (bool): Continue an interrupted export into `path`
+
+        Returns:
+            A generator of (position, characteristics bytes)
+        """
+        writer = None
+        start = 0
+
+        if path is not None:
+            writer = TemplateWriter(path, resume)
+            if writer.last_position is not None:
+                start = writer.last_position + 1
+                logging.info('Resuming export after position ' +
+                             str(writer.last_position))
+
+        self.export_stats = {'templates': 0, 'bytes': 0, 'seconds': 0.0,
+                             'templates_per_s': 0.0, 'bytes_per_s': 0.0}
+        started = time.monotonic()
+
+        try:
+            for position, characteristics in self.f.exportTemplates(start):
+                if writer is not None:
+                    writer.write(position, characteristics)
+                if callback is not None:
+                    callback(position, characteristics)
+
+                seconds = time.monotonic() - started
+                stats = self.export_stats
+                stats['templates'] += 1
+                stats['bytes'] += len(characteristics)
+                stats['seconds'] = seconds
+                stats['templates_per_s'] = stats['templates'] / seconds
+                stats['bytes_per_s'] = stats['bytes'] / seconds
+
+                yield position, characteristics
+        finally:
+            if writer is not None:
+                writer.close()
+
+        logging.info('Exported %d templates in %.2f s (%.1f templates/s)',
+                     self.export_stats['templates'],
+                     self.export_stats['seconds'],
+                     self.export_stats['templates_per_s'])
+
+
+    def restore_templates(self, source, verify='sampled', clear=False):
+        """Store the templates of a backup on the sensor.
+
+        Example:
+            Finger.restore_templates('backup.bin', clear=True)
+            print(Finger.restore_stats)
+
+        Args:
+            source (String): Backup file written by export_templates(),
+                or an iterable of (position, characteristics)
+            verify (String): 'full', 'sampled' or 'checksum'
+                (see PyFingerprint.restoreTemplates)
+            clear (bool): Clear the sensor database first
+
+        Returns:
+            The number of restored templates
+        """
+        if isinstance(source, str):
+            source = read_templates(source)
+
+        started = time.monotonic()
+        restored = self.f.restoreTemplates(source, verify=verify, clear=clear)
+        seconds = time.monotonic() - started
+
+        self.restore_stats = {'templates': restored, 'seconds': seconds,
+                              'templates_per_s': restored / seconds if seconds else 0.0}
+
+        logging.info('Restored %d templates in %.2f s (%.1f templates/s)',
+                     restored, seconds, self.restore_stats['templates_per_s'])
+
+        return restored
+
+
+    def _enter_info(self, index, name=None):
         """Enter member information while registering membership
 
         Args:
             index (int): Position available for register
+            name (String): Username, asked on stdin if not given
         """
 
-        with open(self.db_path, 'a') as f:
-            db = open(self.db_path, 'r').read()
-            # Two times checking
-            for i in range(2):
+        # Two times checking
+        for i in range(2):
+            if name is not None:
+                new_name = name
+            else:
                 new_name = input('Enter your ID: ')
-                print(db.split())
-                if new_name in db.split():
-                    if i == 2:
-                        logging.info('Try again after 5 munites!!!')
-                        time.sleep(1*100)
-                        break
-                    logging.info('Name is registed!!!')
-                    new_name = input('Enter your name again:  ')
-                    i += 1
-                else:
-                    if index == 0:
-                        new_data = pd.DataFrame([{'Index': str(index),
-                                                  'Name': str(new_name)}])
-                        new_data.to_csv(f, index=False, header=True)
-                        f.close()
-                        logging.info('You is register successful!!!')
-                        break
-                    else:
-                        new_data = pd.DataFrame([{'Index': str(index),
-                                                  'Name': str(new_name)}])
-                        new_data.to_csv(f, index=False, header=False)
-                        f.close()
-                        logging.info('You is register successful!!!')
-                        break
+
+            if new_name not in self.identities:
+                self.identities.add(index, new_name)
+                logging.info('You is register successful!!!')
+                return True
+
+            logging.info('Name is registed!!!')
+            if name is not None:
+                return False
+
+        logging.info('Try again after 5 munites!!!')
+        return False
 
 
     def _delete_info(self, name):
@@ -292,27 +670,14 @@ class FingerPrint():
         """ Delete infor in db according to name
 
         Returns:
-            [int]: Retrurn position number in database
+            [int]: Position number in database, None if the name is unknown
         """
 
         logging.info('Currently used templates: ' +
                      str(self.f.getTemplateCount()) + '/' +
                      str(self.f.getStorageCapacity()))
 
-        lines = []
-        with open(self.db_path, 'r') as readfile:
-            reader = csv.reader(readfile)
-            for row in reader:
-                if row[1] == name:
-                    position = row[0]
-                else:
-                    lines.append(row)
-
-        db = pd.DataFrame(lines, columns=(['Index'], ['Name']))
-        with open(self.db_path, 'w') as writefile:
-            db.to_csv(writefile, index=False, header=False)
-
-        return position
+        return self.identities.remove(name)
 
 
     def test_infor(self, name):
@@ -320,27 +685,28 @@ class FingerPrint():
         """ Delete infor in db according to name
 
         Returns:
-            [int]: Retrurn position number in database
+            [int]: Position number in database, None if the name is unknown
         """
 
         logging.info('Currently used templates: ' +
                      str(self.f.getTemplateCount()) + '/' +
                      str(self.f.getStorageCapacity()))
 
-        lines = []
-        with open(self.db_path, 'r') as readfile:
-            reader = csv.reader(readfile)
-            for row in reader:
-                if row[1] == name:
-                    position = row[0]
-                else:
-                    lines.append(row)
+        return self.identities.remove(name)
+
 
-        db = pd.DataFrame(lines, columns=(['Index'], ['Name']))
-        with open(self.db_path, 'w') as writefile:
-            db.to_csv(writefile, index=False, header=False)
+    def _wait_finger(self, deadline=None):
+        """
+            Wait until a finger image is read into the image buffer.
+
+        Args:
+            deadline (float): Wait limit in seconds, defaults to poller.deadline
+        """
+        if self.poller.wait(deadline) is False:
+            raise Exception('No finger detected before the deadline')
 
-        return position
+        logging.debug('Finger detected after %.3f s (latency <= %.3f s)',
+                      self.poller.last_wait, self.poller.last_latency)
 
 
     def read_template(self):
@@ -349,8 +715,7 @@ class FingerPrint():
         """
 
         # Serial read from sensor
-        while(self.f.readImage() is False):
-            pass
+        self._wait_finger()
 
         self.f.convertImage(Finger.CHARBUFFER1)
 
@@ -0,0 +1,603 @@
+import os
+import random
+import struct
+import threading
+import time
+import serial
+from ..config import Finger
+from ..R305 import encodePacket, packetHeader
+
+"""Software R305 sensor speaking the packet protocol of functions/R305.py
+
+    Example:
+        sim = R305Simulator(storageCapacity=1000, latency=0.01)
+
+        # In-process transport through a pyserial URL
+        f = PyFingerprint(sim.register('door'))     # 'r305sim://door'
+
+        # Or a pseudo terminal any serial client can open
+        f = PyFingerprint(sim.openPty())            # '/dev/pts/N'
+
+        sim.placeFinger(makeCharacteristics(1))
+"""
+
+## Size of one template (two 256 byte character files)
+TEMPLATE_SIZE = 512
+
+## Size of the raw image (256x288 pixels, 4 bits each)
+IMAGE_DATA_SIZE = 256 * 288 // 2
+
+## Accuracy score reported for a match
+MATCH_SCORE = 200
+
+## Simulators reachable through the r305sim:// pyserial URL
+_simulators = {}
+
+## Let pyserial find the r305sim:// protocol handler of this package
+if ( __name__ not in serial.protocol_handler_packages ):
+    serial.protocol_handler_packages.append(__name__)
+
+
+def makeCharacteristics(seed):
+    """
+    Builds deterministic characteristics standing for one finger.
+
+    Arguments:
+        seed (int): The finger identity
+
+    Returns:
+        The characteristics (bytes).
+    """
+
+    return random.Random(seed).getrandbits(TEMPLATE_SIZE * 8).to_bytes(TEMPLATE_SIZE, 'little')
+
+
+class R305Simulator(object):
+    """
+        Software R305 fingerprint sensor.
+
+        A finger is modelled by its characteristics: `placeFinger()` puts a
+        finger on the sensor, `convertImage` copies its characteristics to a
+        char buffer and searches/compares match equal characteristics.
+    """
+
+    def __init__(self, storageCapacity = 1000, address = 0xFFFFFFFF, password = 0x00000000,
+                 packetSize = 128, baudRate = 57600, securityLevel = 3,
+                 latency = 0.0, commandLatency = None, simulateBaudRate = False,
+                 errorRate = 0.0, dropRate = 0.0, seed = None, searchLatency = 0.0):
+        """
+        Constructor
+
+        Arguments:
+            storageCapacity (int): The number of template positions
+            address (int): The sensor address
+            password (int): The sensor password
+            packetSize (int): The data packet size (32, 64, 128 or 256)
+            baudRate (int): The baud rate of the sensor
+            securityLevel (int): The security level (1 - 5)
+            latency (float): Processing time added to every response in seconds
+            commandLatency (dict): Additional processing time by instruction code
+            simulateBaudRate (bool): Add the wire time of every response at the current baud rate
+            errorRate (float): Probability of a response with a corrupted checksum
+            dropRate (float): Probability of a response that is never sent
+            seed (int): Seed of the random generator used for error injection
+            searchLatency (float): Processing time per position compared by a search in seconds
+        """
+
+        self.storageCapacity = storageCapacity
+        self.address = address
+        self.password = password
+        self.packetSize = packetSize
+        self.baudRate = baudRate
+        self.securityLevel = securityLevel
+
+        self.latency = latency
+        self.commandLatency = dict(commandLatency or {})
+        self.simulateBaudRate = simulateBaudRate
+        self.errorRate = errorRate
+        self.dropRate = dropRate
+        self.searchLatency = searchLatency
+
+        self.templates = {}
+        self.charBuffers = {Finger.CHARBUFFER1: bytes(TEMPLATE_SIZE), Finger.CHARBUFFER2: bytes(TEMPLATE_SIZE)}
+        self.finger = None
+        self.imageBuffer = None
+
+        self.stats = {'commands': 0, 'packetsReceived': 0, 'packetsSent': 0,
+                      'bytesReceived': 0, 'bytesSent': 0, 'errors': 0, 'drops': 0,
+                      'opcodes': {}}
+
+        self.__random = random.Random(seed)
+        self.__verified = (password == 0x00000000)
+        self.__receiveBuffer = bytearray()
+        self.__upload = None
+        self.__injectedStatus = {}
+        self.__processingTime = 0.0
+        self.__lock = threading.RLock()
+        self.__ptyMaster = None
+        self.__ptySlave = None
+
+    ## Sensor state helpers
+
+    def placeFinger(self, characteristics):
+        """
+        Puts a finger on the sensor.
+
+        Arguments:
+            characteristics (bytes): The characteristics of the finger, see `makeCharacteristics()`
+        """
+
+        self.finger = bytes(characteristics)
+
+    def liftFinger(self):
+        """
+        Removes the finger from the sensor.
+        """
+
+        self.finger = None
+
+    def enrollTemplate(self, positionNumber, characteristics):
+        """
+        Stores a template directly, without any packet exchange.
+        """
+
+        if ( positionNumber < 0 or positionNumber >= self.storageCapacity ):
+            raise ValueError('The given position number is invalid!')
+
+        self.templates[positionNumber] = bytes(characteristics)
+
+    def injectStatus(self, instruction, status, count = 1):
+        """
+        Makes the next commands with the given instruction fail.
+
+        Arguments:
+            instruction (int): The instruction code, e.g. `Finger.READIMAGE`
+            status (int): The status code to answer with, e.g. `Finger.ERROR_COMMUNICATION`
+            count (int): The number of commands to fail
+        """
+
+        self.__injectedStatus[instruction] = [status, count]
+
+    def resetStats(self):
+        """
+        Resets the packet and byte counters.
+        """
+
+        self.stats = {'commands': 0, 'packetsReceived': 0, 'packetsSent': 0,
+                      'bytesReceived': 0, 'bytesSent': 0, 'errors': 0, 'drops': 0,
+                      'opcodes': {}}
+
+    ## Packet layer
+
+    def receive(self, data):
+        """
+        Feeds bytes sent by the host into the sensor.
+
+        Arguments:
+            data (bytes): The received bytes (any fragmentation)
+
+        Returns:
+            A list of tuples (delay in seconds, response bytes) to send back in order.
+        """
+
+        responses = []
+
+        with self.__lock:
+            self.__receiveBuffer += data
+            self.stats['bytesReceived'] += len(data)
+
+            while ( True ):
+                ## Skip garbage until the start code
+                start = self.__receiveBuffer.find(struct.pack('>H', Finger.STARTCODE))
+
+                if ( start == -1 ):
+                    del self.__receiveBuffer[:max(0, len(self.__receiveBuffer) - 1)]
+                    break
+
+                del self.__receiveBuffer[:start]
+
+                if ( len(self.__receiveBuffer) < 9 ):
+                    break
+
+                packetLength = self.__receiveBuffer[7] << 8 | self.__receiveBuffer[8]
+
+                if ( len(self.__receiveBuffer) < 9 + packetLength ):
+                    break
+
+                packet = bytes(self.__receiveBuffer[:9 + packetLength])
+                del self.__receiveBuffer[:9 + packetLength]
+
+                response = self.__handlePacket(packet)
+
+                if ( response is not None ):
+                    responses.extend(response)
+
+        return responses
+
+    def __handlePacket(self, packet):
+        self.stats['packetsReceived'] += 1
+
+        packetAddress = struct.unpack('>I', packet[2:6])[0]
+        packetType = packet[6]
+        packetPayload = packet[9:-2]
+
+        ## A sensor only listens to its own address
+        if ( packetAddress != self.address ):
+            return None
+
+        packetChecksum = sum(packet[6:-2]) & 0xFFFF
+        receivedChecksum = packet[-2] << 8 | packet[-1]
+
+        if ( packetChecksum != receivedChecksum ):
+            return self.__respond(None, [self.__ack(Finger.ERROR_COMMUNICATION)])
+
+        if ( packetType == Finger.DATAPACKET or packetType == Finger.ENDDATAPACKET ):
+            if ( self.__upload is not None ):
+                self.__upload[1].extend(packetPayload)
+
+                if ( packetType == Finger.ENDDATAPACKET ):
+                    self.charBuffers[self.__upload[0]] = bytes(self.__upload[1])
+                    self.__upload = None
+
+            return None
+
+        if ( packetType != Finger.COMMANDPACKET or len(packetPayload) == 0 ):
+            return self.__respond(None, [self.__ack(Finger.ERROR_COMMUNICATION)])
+
+        instruction = packetPayload[0]
+
+        self.stats['commands'] += 1
+        self.stats['opcodes'][instruction] = self.stats['opcodes'].get(instruction, 0) + 1
+
+        injected = self.__injectedStatus.get(instruction)
+
+        if ( injected is not None ):
+            injected[1] -= 1
+
+            if ( injected[1] <= 0 ):
+                del self.__injectedStatus[instruction]
+
+            return self.__respond(instruction, [self.__ack(injected[0])])
+
+        if ( self.__verified == False and instruction != Finger.VERIFYPASSWORD ):
+            return self.__respond(instruction, [self.__ack(Finger.ERROR_PASSVERIFY)])
+
+        handler = self.__handlers.get(instruction)
+
+        if ( handler is None ):
+            return self.__respond(instruction, [self.__ack(Finger.ERROR_PACKETRESPONSEFAIL)])
+
+        return self.__respond(instruction, handler(self, packetPayload[1:]))
+
+    def __respond(self, instruction, packets):
+        """
+        Applies latency and error injection to the response packets of one command.
+
+        Returns:
+            A list of (delay, bytes). With simulated baud rate every packet
+            becomes readable after its own wire time, like on a real line.
+        """
+
+        processingTime = self.__processingTime
+        self.__processingTime = 0.0
+
+        if ( self.dropRate > 0 and self.__random.random() < self.dropRate ):
+            self.stats['drops'] += 1
+            return None
+
+        packets = [ bytearray(packet) for packet in packets ]
+
+        if ( self.errorRate > 0 and self.__random.random() < self.errorRate ):
+            self.stats['errors'] += 1
+            packets[-1][-1] ^= 0xFF
+
+        delay = self.latency + self.commandLatency.get(instruction, 0.0) + processingTime
+
+        self.stats['packetsSent'] += len(packets)
+        self.stats['bytesSent'] += sum(len(packet) for packet in packets)
+
+        if ( self.simulateBaudRate == False ):
+            return [(delay, b''.join(packets))]
+
+        chunks = []
+
+        for packet in packets:
+            chunks.append((delay + 10.0 * len(packet) / self.baudRate, bytes(packet)))
+            delay = 0.0
+
+        return chunks
+
+    def __packet(self, packetType, packetPayload):
+        return encodePacket(packetHeader(self.address), packetType, packetPayload)
+
+    def __ack(self, status, data = b''):
+        return self.__packet(Finger.ACKPACKET, bytes([status]) + bytes(data))
+
+    def __dataPackets(self, data):
+        packets = []
+
+        for lfrom in range(0, len(data), self.packetSize):
+            packetType = Finger.DATAPACKET if lfrom + self.packetSize < len(data) else Finger.ENDDATAPACKET
+            packets.append(self.__packet(packetType, data[lfrom:lfrom + self.packetSize]))
+
+        return packets
+
+    ## Instructions
+
+    def __verifyPassword(self, arguments):
+        if ( struct.unpack('>I', arguments[0:4])[0] != self.password ):
+            return [self.__ack(Finger.ERROR_WRONGPASSWORD)]
+
+        self.__verified = True
+        return [self.__ack(Finger.OK)]
+
+    def __setPassword(self, arguments):
+        self.password = struct.unpack('>I', arguments[0:4])[0]
+        return [self.__ack(Finger.OK)]
+
+    def __setAddress(self, arguments):
+        self.address = struct.unpack('>I', arguments[0:4])[0]
+        return [self.__ack(Finger.OK)]
+
+    def __setSystemParameter(self, arguments):
+        parameterNumber, parameterValue = arguments[0], arguments[1]
+
+        if ( parameterNumber == Finger.SETSYSTEMPARAMETER_BAUDRATE and 1 <= parameterValue <= 12 ):
+            ## The acknowledge is still sent at the old baud rate
+            packets = [self.__ack(Finger.OK)]
+            self.baudRate = parameterValue * 9600
+            return packets
+
+        elif ( parameterNumber == Finger.SETSYSTEMPARAMETER_SECURITY_LEVEL and 1 <= parameterValue <= 5 ):
+            self.securityLevel = parameterValue
+
+        elif ( parameterNumber == Finger.SETSYSTEMPARAMETER_PACKAGE_SIZE and 0 <= parameterValue <= 3 ):
+            self.packetSize = 32 << parameterValue
+
+        else:
+            return [self.__ack(Finger.ERROR_INVALIDREGISTER)]
+
+        return [self.__ack(Finger.OK)]
+
+    def __getSystemParameters(self, arguments):
+        return [self.__ack(Finger.OK, struct.pack('>HHHHIHH',
+            0x0000,
+            0x0000,
+            self.storageCapacity,
+            self.securityLevel,
+            self.address,
+            {32: 0, 64: 1, 128: 2, 256: 3}[self.packetSize],
+            self.baudRate // 9600,
+        ))]
+
+    def __templateIndex(self, arguments):
+        page = arguments[0]
+
+        if ( page > 3 ):
+            return [self.__ack(Finger.ERROR_INVALIDREGISTER)]
+
+        bits = 0
+        for positionNumber in self.templates:
+            if ( page * 256 <= positionNumber < (page + 1) * 256 ):
+                bits |= 1 << (positionNumber - page * 256)
+
+        return [self.__ack(Finger.OK, bits.to_bytes(32, 'little'))]
+
+    def __templateCount(self, arguments):
+        return [self.__ack(Finger.OK, struct.pack('>H', len(self.templates)))]
+
+    def __readImage(self, arguments):
+        if ( self.finger is None ):
+            return [self.__ack(Finger.ERROR_NOFINGER)]
+
+        self.imageBuffer = self.finger
+        return [self.__ack(Finger.OK)]
+
+    def __downloadImage(self, arguments):
+        if ( self.imageBuffer is None ):
+            return [self.__ack(Finger.ERROR_DOWNLOADIMAGE)]
+
+        ## Any deterministic picture of the finger will do
+        imageData = (self.imageBuffer * (IMAGE_DATA_SIZE // TEMPLATE_SIZE + 1))[:IMAGE_DATA_SIZE]
+        return [self.__ack(Finger.OK)] + self.__dataPackets(imageData)
+
+    def __convertImage(self, arguments):
+        if ( arguments[0] not in self.charBuffers ):
+            return [self.__ack(Finger.ERROR_INVALIDREGISTER)]
+
+        if ( self.imageBuffer is None ):
+            return [self.__ack(Finger.ERROR_INVALIDIMAGE)]
+
+        self.charBuffers[arguments[0]] = self.imageBuffer
+        return [self.__ack(Finger.OK)]
+
+    def __createTemplate(self, arguments):
+        if ( self.charBuffers[Finger.CHARBUFFER1] != self.charBuffers[Finger.CHARBUFFER2] ):
+            return [self.__ack(Finger.ERROR_CHARACTERISTICSMISMATCH)]
+
+        return [self.__ack(Finger.OK)]
+
+    def __storeTemplate(self, arguments):
+        charBufferNumber = arguments[0]
+        positionNumber = arguments[1] << 8 | arguments[2]
+
+        if ( charBufferNumber not in self.charBuffers or positionNumber >= self.storageCapacity ):
+            return [self.__ack(Finger.ERROR_INVALIDPOSITION)]
+
+        self.templates[positionNumber] = self.charBuffers[charBufferNumber]
+        return [self.__ack(Finger.OK)]
+
+    def __searchTemplate(self, arguments):
+        charBufferNumber = arguments[0]
+        positionStart = arguments[1] << 8 | arguments[2]
+        count = arguments[3] << 8 | arguments[4]
+
+        if ( charBufferNumber not in self.charBuffers ):
+            return [self.__ack(Finger.ERROR_INVALIDREGISTER)]
+
+        characteristics = self.charBuffers[charBufferNumber]
+
+        for positionNumber in range(positionStart, min(positionStart + count, self.storageCapacity)):
+            self.__processingTime += self.searchLatency
+
+            if ( self.templates.get(positionNumber) == characteristics ):
+                return [self.__ack(Finger.OK, struct.pack('>HH', positionNumber, MATCH_SCORE))]
+
+        return [self.__ack(Finger.ERROR_NOTEMPLATEFOUND)]
+
+    def __loadTemplate(self, arguments):
+        charBufferNumber = arguments[0]
+        positionNumber = arguments[1] << 8 | arguments[2]
+
+        if ( charBufferNumber not in self.charBuffers or positionNumber >= self.storageCapacity ):
+            return [self.__ack(Finger.ERROR_INVALIDPOSITION)]
+
+        if ( positionNumber not in self.templates ):
+            return [self.__ack(Finger.ERROR_LOADTEMPLATE)]
+
+        self.charBuffers[charBufferNumber] = self.templates[positionNumber]
+        return [self.__ack(Finger.OK)]
+
+    def __deleteTemplate(self, arguments):
+        positionNumber = arguments[0] << 8 | arguments[1]
+        count = arguments[2] << 8 | arguments[3]
+
+        if ( positionNumber + count > self.storageCapacity ):
+            return [self.__ack(Finger.ERROR_INVALIDPOSITION)]
+
+        for p in range(positionNumber, positionNumber + count):
+            self.templates.pop(p, None)
+
+        return [self.__ack(Finger.OK)]
+
+    def __clearDatabase(self, arguments):
+        self.templates.clear()
+        return [self.__ack(Finger.OK)]
+
+    def __generateRandomNumber(self, arguments):
+        return [self.__ack(Finger.OK, os.urandom(4))]
+
+    def __compareCharacteristics(self, arguments):
+        if ( self.charBuffers[Finger.CHARBUFFER1] != self.charBuffers[Finger.CHARBUFFER2] ):
+            return [self.__ack(Finger.ERROR_NOTMATCHING)]
+
+        return [self.__ack(Finger.OK, struct.pack('>H', MATCH_SCORE))]
+
+    def __uploadCharacteristics(self, arguments):
+        if ( arguments[0] not in self.charBuffers ):
+            return [self.__ack(Finger.ERROR_PACKETRESPONSEFAIL)]
+
+        self.__upload = (arguments[0], bytearray())
+        return [self.__ack(Finger.OK)]
+
+    def __downloadCharacteristics(self, arguments):
+        if ( arguments[0] not in self.charBuffers ):
+            return [self.__ack(Finger.ERROR_DOWNLOADCHARACTERISTICS)]
+
+        return [self.__ack(Finger.OK)] + self.__dataPackets(self.charBuffers[arguments[0]])
+
+    __handlers = {
+        Finger.VERIFYPASSWORD: __verifyPassword,
+        Finger.SETPASSWORD: __setPassword,
+        Finger.SETADDRESS: __setAddress,
+        Finger.SETSYSTEMPARAMETER: __setSystemParameter,
+        Finger.GETSYSTEMPARAMETERS: __getSystemParameters,
+        Finger.TEMPLATEINDEX: __templateIndex,
+        Finger.TEMPLATECOUNT: __templateCount,
+        Finger.READIMAGE: __readImage,
+        Finger.DOWNLOADIMAGE: __downloadImage,
+        Finger.CONVERTIMAGE: __convertImage,
+        Finger.CREATETEMPLATE: __createTemplate,
+        Finger.STORETEMPLATE: __storeTemplate,
+        Finger.SEARCHTEMPLATE: __searchTemplate,
+        Finger.LOADTEMPLATE: __loadTemplate,
+        Finger.DELETETEMPLATE: __deleteTemplate,
+        Finger.CLEARDATABASE: __clearDatabase,
+        Finger.GENERATERANDOMNUMBER: __generateRandomNumber,
+        Finger.COMPARECHARACTERISTICS: __compareCharacteristics,
+        Finger.UPLOADCHARACTERISTICS: __uploadCharacteristics,
+        Finger.DOWNLOADCHARACTERISTICS: __downloadCharacteristics,
+    }
+
+    ## Transports
+
+    def register(self, name):
+        """
+        Makes the simulator reachable as in-process pyserial URL.
+
+        Arguments:
+            name (str): The name of the simulator
+
+        Returns:
+            The URL (str) to pass as port, e.g. 'r305sim://door'.
+        """
+
+        _simulators[name] = self
+        return 'r305sim://' + name
+
+    def openPty(self):
+        """
+        Serves the simulator on a pseudo terminal (POSIX only).
+
+        Returns:
+            The path of the terminal (str) to pass as port.
+        """
+
+        import pty
+        import tty
+
+        self.__ptyMaster, self.__ptySlave = pty.openpty()
+        tty.setraw(self.__ptySlave)
+
+        thread = threading.Thread(target = self.__servePty, args = (self.__ptyMaster,))
+        thread.daemon = True
+        thread.start()
+
+        return os.ttyname(self.__ptySlave)
+
+    def __servePty(self, master):
+        while ( True ):
+            try:
+                data = os.read(master, 4096)
+
+            except OSError:
+                return
+
+            if ( len(data) == 0 ):
+                return
+
+            for (delay, response) in self.receive(data):
+                if ( delay > 0 ):
+                    time.sleep(delay)
+
+                os.write(master, response)
+
+    def close(self):
+        """
+        Stops serving the pseudo terminal and unregisters the simulator.
+        """
+
+        for name in [ name for (name, simulator) in _simulators.items() if simulator is self ]:
+            del _simulators[name]
+
+        for fd in (self.__ptySlave, self.__ptyMaster):
+            if ( fd is not None ):
+                try:
+                    os.close(fd)
+
+                except OSError:
+                    pass
+
+        self.__ptyMaster = None
+        self.__ptySlave = None
+
+
+def getSimulator(name):
+    """
+    Gets a simulator registered with `R305Simulator.register()`.
+
+    Raises:
+        KeyError: if there is no simulator with that name
+    """
+
+    return _simulators[name]
@@ -0,0 +1,146 @@
+import threading
+import time
+from serial.serialutil import SerialBase, SerialException, PortNotOpenError, to_bytes
+
+"""pyserial handler for r305sim://<name> URLs (in-process R305 simulator)"""
+
+
+class Serial(SerialBase):
+    """
+        Serial port connected to a registered `R305Simulator`.
+
+        Responses become readable after the latency the simulator asks for.
+        When the port baud rate does not match the simulator baud rate the
+        sensor does not understand the host and nothing is answered.
+    """
+
+    BAUDRATES = tuple(9600 * n for n in range(1, 13))
+
+    def __init__(self, *args, **kwargs):
+        self.simulator = None
+        self.__pending = []
+        self.__condition = threading.Condition()
+        super(Serial, self).__init__(*args, **kwargs)
+
+    def open(self):
+        from . import getSimulator
+
+        if ( self.is_open ):
+            raise SerialException('Port is already open.')
+
+        if ( self._port is None ):
+            raise SerialException('Port must be configured before it can be used.')
+
+        name = self._port.split('://', 1)[1]
+
+        try:
+            self.simulator = getSimulator(name)
+
+        except KeyError:
+            raise SerialException('There is no simulator registered as ' + repr(name))
+
+        self.__pending = []
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+        with self.__condition:
+            self.__condition.notify_all()
+
+    def _reconfigure_port(self):
+        pass
+
+    def __readyCount(self, now):
+        """
+        Returns the number of bytes whose delivery time has come.
+        """
+
+        ready = 0
+
+        for (deliveryTime, data) in self.__pending:
+            if ( deliveryTime > now ):
+                break
+
+            ready += len(data)
+
+        return ready
+
+    @property
+    def in_waiting(self):
+        if ( not self.is_open ):
+            raise PortNotOpenError()
+
+        with self.__condition:
+            return self.__readyCount(time.time())
+
+    def read(self, size = 1):
+        if ( not self.is_open ):
+            raise PortNotOpenError()
+
+        deadline = None if self._timeout is None else time.time() + self._timeout
+        receivedData = bytearray()
+
+        with self.__condition:
+            while ( len(receivedData) < size and self.is_open ):
+                now = time.time()
+
+                while ( self.__pending and self.__pending[0][0] <= now and len(receivedData) < size ):
+                    deliveryTime, data = self.__pending[0]
+                    taken = data[:size - len(receivedData)]
+                    receivedData += taken
+
+                    if ( len(taken) == len(data) ):
+                        self.__pending.pop(0)
+                    else:
+                        self.__pending[0] = (deliveryTime, data[len(taken):])
+
+                if ( len(receivedData) >= size ):
+                    break
+
+                if ( deadline is not None and now >= deadline ):
+                    break
+
+                waitUntil = deadline
+
+                if ( self.__pending ):
+                    nextDelivery = self.__pending[0][0]
+                    waitUntil = nextDelivery if waitUntil is None else min(waitUntil, nextDelivery)
+
+                self.__condition.wait(None if waitUntil is None else max(0.0, waitUntil - now))
+
+        return bytes(receivedData)
+
+    def write(self, data):
+        if ( not self.is_open ):
+            raise PortNotOpenError()
+
+        data = to_bytes(data)
+
+        ## The sensor cannot decode frames sent at a different speed
+        if ( self._baudrate != self.simulator.baudRate ):
+            return len(data)
+
+        responses = self.simulator.receive(data)
+
+        with self.__condition:
+            now = time.time()
+            start = self.__pending[-1][0] if self.__pending else now
+
+            for (delay, response) in responses:
+                start = max(start, now) + delay
+                self.__pending.append((start, response))
+
+            self.__condition.notify_all()
+
+        return len(data)
+
+    def reset_input_buffer(self):
+        with self.__condition:
+            self.__pending = []
+
+    def reset_output_buffer(self):
+        pass
+
+    def flush(self):
+        pass
@@ -0,0 +1,444 @@
+import heapq
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from .backup import read_templates
+
+"""One thread owning the sensor, requests from any thread"""
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 10
+PRIORITY_BACKGROUND = 20
+
+PRIORITIES = {
+    'recognize': PRIORITY_INTERACTIVE,
+    'enroll': PRIORITY_INTERACTIVE,
+    'remove_template_byname': PRIORITY_NORMAL,
+    'template_number': PRIORITY_NORMAL,
+    'export_templates': PRIORITY_BACKGROUND,
+    'restore_templates': PRIORITY_BACKGROUND,
+    'template_index': PRIORITY_BACKGROUND,
+}
+
+# Requests changing the stored templates wait while a restore is queued
+# or running: the restore would overwrite the positions they use
+RESTORE_JOBS = {'restore_templates'}
+DEFERRED_DURING_RESTORE = {'enroll', 'remove_template_byname', 'storeTemplate',
+                           'deleteTemplate', 'clearDatabase', 'restoreTemplates'}
+
+# Queued after everything else, see shutdown()
+_STOP = float('inf')
+
+
+def summarize(samples):
+    """
+        Returns count, mean, p50 and p99 of samples (seconds) in milliseconds
+    """
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        'count': count,
+        'mean_ms': sum(ordered) / count * 1000,
+        'p50_ms': ordered[count // 2] * 1000,
+        'p99_ms': ordered[min(count - 1, int(count * 0.99))] * 1000,
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+def record_sample(times, name, value):
+    """
+        Appends value to the samples of name, the last 1000 are kept
+    """
+    samples = times.setdefault(name, [])
+    samples.append(value)
+    del samples[:-1000]
+
+
+def _export_job(service, path, resume):
+    for _ in service.export_templates(path, resume=resume):
+        yield
+    return service.export_stats
+
+
+def _restore_job(service, source, verify, clear):
+    if isinstance(source, str):
+        source = read_templates(source)
+
+    restored = 0
+    for _ in service.f.iterRestoreTemplates(source, verify=verify, clear=clear):
+        restored += 1
+        yield
+    return restored
+
+
+def _index_job(service):
+    capacity = service.f.getStorageCapacity()
+    index = []
+    # One index page covers 256 positions
+    for page in range(min(4, (capacity + 255) // 256)):
+        index.extend(service.f.getTemplateIndex(page))
+        yield
+    return index[:capacity]
+
+
+class _Request():
+
+    def __init__(self, name, func, args, kwargs, job, background):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.job = job
+        self.background = background
+        self.steps = None
+        self.future = Future()
+        self.queued = time.perf_counter()
+
+
+class SensorWorker():
+    """Serializes all use of a FingerPrint service on its own thread.
+
+    Every request is queued and answered with a concurrent.futures.Future,
+    so any number of application threads can share one sensor. Requests
+    are served by priority (PRIORITIES, lower first), then in order.
+
+    Background jobs (export, restore, index scan) are generators that
+    stop at command boundaries where the sensor holds no state of the
+    job. After every step the job goes back to the queue, so a waiting
+    recognize() runs before the next step and the job resumes afterwards.
+    A step may yield a pause in seconds: the job leaves the queue for that
+    long and the sensor serves everything else meanwhile.
+
+    recognize() and enroll() poll for the finger that way, one readImage()
+    per step, and run the service at once when it was detected. A pending
+    recognition without a finger never holds up counts or exports.
+
+    Requests that change stored templates (DEFERRED_DURING_RESTORE) wait
+    until no restore job is queued or running, so an enrollment cannot
+    take a position the restore writes later.
+
+    Example:
+        worker = SensorWorker(FingerPrint('/dev/ttyS0'))
+        backup = worker.export_templates('backup.bin')
+        result = worker.recognize().result()     # does not wait for the export
+        count = worker.command('getTemplateCount').result()
+        print(worker.stats()['latency_under_load'])
+        worker.shutdown()
+
+    Nothing else may use the service or its PyFingerprint once the
+    worker owns it.
+    """
+
+    def __init__(self, service, priorities=None, name='sensor-worker',
+                 poll_interval=0.05, touch_deadline=10.0):
+        """
+        Args:
+            service (FingerPrint): The service to own
+            priorities (dict): Priority by request name, overrides PRIORITIES
+            name (str): The thread name
+            poll_interval (float): Pause between two finger polls in seconds
+            touch_deadline (float): Wait limit for the second touch of an
+                enrollment in seconds, that wait runs on the sensor thread
+        """
+        self.service = service
+        self.poll_interval = poll_interval
+        self.touch_deadline = touch_deadline
+        self.priorities = dict(PRIORITIES)
+        if priorities is not None:
+            self.priorities.update(priorities)
+
+        self._requests = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._max_depth = 0
+        self._completed = 0
+        self._failed = 0
+        self._jobs = 0
+        self._restores = 0
+        self._deferred = []
+        self._paused = []
+        self._stopping = None
+        self._service_times = {}
+        self._wait_times = {}
+        self._latencies = {}
+        self._loaded_latencies = {}
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _put(self, name, func, args, kwargs, priority, job, background=True):
+        request = _Request(name, func, args, kwargs, job, job and background)
+        if priority is None:
+            priority = self.priorities.get(
+                name, PRIORITY_BACKGROUND if job else PRIORITY_NORMAL)
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('The sensor worker is shut down')
+            self._depth += 1
+            self._max_depth = max(self._max_depth, self._depth)
+            if job and name in RESTORE_JOBS:
+                self._restores += 1
+            self._requests.put((priority, next(self._order), request))
+        return request.future
+
+    def _restore_done(self):
+        """
+            Queues the deferred requests again after the last restore, call with the lock
+        """
+        self._restores -= 1
+        if self._restores == 0:
+            for item in self._deferred:
+                self._requests.put(item)
+            self._deferred = []
+
+    def submit(self, name, func, *args, priority=None, **kwargs):
+        """Queues func(service, *args, **kwargs).
+
+        Args:
+            name (str): Request name for the priority and the statistics
+            priority (int): Overrides the priority of the name
+
+        Returns:
+            A concurrent.futures.Future with the result
+        """
+        return self._put(name, func, args, kwargs, priority, False)
+
+    def submit_job(self, name, job, *args, priority=None, **kwargs):
+        """Queues a background job.
+
+        job(service, *args, **kwargs) must return a generator that sends
+        one command sequence per step and yields where other requests may
+        use the sensor. The return value of the generator is the result.
+
+        Args:
+            name (str): Request name for the priority and the statistics
+            priority (int): Overrides the priority of the name
+
+        Returns:
+            A concurrent.futures.Future with the result
+        """
+        return self._put(name, job, args, kwargs, priority, True)
+
+    def _next(self):
+        """
+            Returns the next queued item, paused jobs are queued again when due
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._paused and self._paused[0][0] <= now:
+                    self._requests.put(heapq.heappop(self._paused)[2])
+                if self._stopping is not None and not self._paused:
+                    self._requests.put(self._stopping)
+                    self._stopping = None
+                timeout = self._paused[0][0] - now if self._paused else None
+            try:
+                return self._requests.get(timeout=timeout)
+            except queue.Empty:
+                pass
+
+    def _run(self):
+        while True:
+            item = self._next()
+            priority, order, request = item
+            if request is None:
+                with self._lock:
+                    if self._paused:
+                        # Paused jobs are still served, the stop is queued after them
+                        self._stopping = item
+                        continue
+                return
+
+            started = time.perf_counter()
+            if request.steps is None:
+                with self._lock:
+                    if self._restores and request.name in DEFERRED_DURING_RESTORE \
+                            and not request.background:
+                        self._deferred.append((priority, order, request))
+                        continue
+                    self._depth -= 1
+                    if request.background:
+                        self._jobs += 1
+
+                if not request.future.set_running_or_notify_cancel():
+                    if request.background:
+                        with self._lock:
+                            self._jobs -= 1
+                            if request.name in RESTORE_JOBS:
+                                self._restore_done()
+                    continue
+                with self._lock:
+                    record_sample(self._wait_times, request.name, started - request.queued)
+
+            done = True
+            pause = None
+            failed = 0
+            try:
+                if not request.job:
+                    request.future.set_result(
+                        request.func(self.service, *request.args, **request.kwargs))
+                else:
+                    if request.steps is None:
+                        request.steps = request.func(self.service, *request.args,
+                                                     **request.kwargs)
+                    try:
+                        pause = next(request.steps)
+                    except StopIteration as e:
+                        request.future.set_result(e.value)
+                    else:
+                        done = False
+            except BaseException as e:
+                # The service ends failed operations with exit(1)
+                request.future.set_exception(e)
+                failed = 1
+
+            finished = time.perf_counter()
+            with self._lock:
+                # Jobs: the time of one step, the longest a request waits for it
+                record_sample(self._service_times, request.name, finished - started)
+                if not done:
+                    # Same priority and order, requests queued meanwhile go first
+                    if pause:
+                        heapq.heappush(self._paused, (time.monotonic() + pause, order,
+                                                      (priority, order, request)))
+                    else:
+                        self._requests.put((priority, order, request))
+                    continue
+
+                self._completed += 1
+                self._failed += failed
+                if request.background:
+                    self._jobs -= 1
+                    if request.name in RESTORE_JOBS:
+                        self._restore_done()
+                else:
+                    record_sample(self._latencies, request.name, finished - request.queued)
+                    if self._jobs:
+                        record_sample(self._loaded_latencies, request.name,
+                                      finished - request.queued)
+
+    def _finger_job(self, service, action, deadline):
+        end = None if deadline is None else time.monotonic() + deadline
+        while service.f.readImage() is not True:
+            if self._closed:
+                raise RuntimeError('The sensor worker is shut down')
+            if end is not None and time.monotonic() >= end:
+                raise Exception('No finger detected before the deadline')
+            yield self.poll_interval
+        # The image is in the image buffer, nothing ran in between
+        return action(service)
+
+    def submit_touch(self, name, action, deadline=None, priority=None):
+        """Queues action(service) for when a finger is on the sensor.
+
+        The sensor is polled once per poll_interval, other requests run
+        in between. action() starts right after the detecting readImage(),
+        the finger image is in the image buffer.
+
+        Args:
+            name (str): Request name for the priority and the statistics
+            deadline (float): Wait limit for the finger in seconds, None waits forever
+            priority (int): Overrides the priority of the name
+
+        Returns:
+            A concurrent.futures.Future with the result
+        """
+        return self._put(name, self._finger_job, (action, deadline), {}, priority,
+                         True, background=False)
+
+    def recognize(self, deadline=None):
+        return self.submit_touch(
+            'recognize', lambda service: service.recognize(detected=True), deadline)
+
+    def enroll(self, name=None, deadline=None):
+        return self.submit_touch(
+            'enroll', lambda service: service.enroll(name, detected=True,
+                                                     deadline=self.touch_deadline),
+            deadline)
+
+    def remove_template_byname(self, name):
+        return self.submit('remove_template_byname',
+                           lambda service: service.remove_template_byname(name))
+
+    def template_number(self):
+        return self.submit('template_number', lambda service: service.template_number())
+
+    def command(self, command, *args, **kwargs):
+        """Queues a raw PyFingerprint command, e.g. command('getTemplateCount').
+
+        Returns:
+            A concurrent.futures.Future with the result
+        """
+        method = getattr(self.service.f, command)
+        return self.submit(command, lambda service: method(*args, **kwargs))
+
+    def export_templates(self, path, resume=False):
+        """
+            Background FingerPrint.export_templates(), the result is export_stats
+        """
+        return self.submit_job('export_templates', _export_job, path, resume)
+
+    def restore_templates(self, source, verify='sampled', clear=False):
+        """
+            Background FingerPrint.restore_templates(), the result is the count
+
+            Enrollments and removals queued meanwhile run after the restore.
+        """
+        return self.submit_job('restore_templates', _restore_job, source, verify, clear)
+
+    def template_index(self):
+        """
+            Background scan of all index pages, the result is a list of bool
+        """
+        return self.submit_job('template_index', _index_job)
+
+    @property
+    def queue_depth(self):
+        return self._depth
+
+    def stats(self):
+        """Returns queue depth, counters and per request times.
+
+        service_time is per step for jobs. latency (queued to answered) of
+        the requests served while a job was running is in
+        latency_under_load as well.
+        """
+        with self._lock:
+            return {
+                'queue_depth': self._depth,
+                'max_queue_depth': self._max_depth,
+                'completed': self._completed,
+                'failed': self._failed,
+                'running_jobs': self._jobs,
+                'service_time': {name: summarize(samples)
+                                 for name, samples in self._service_times.items()},
+                'wait_time': {name: summarize(samples)
+                              for name, samples in self._wait_times.items()},
+                'latency': {name: summarize(samples)
+                            for name, samples in self._latencies.items()},
+                'latency_under_load': {name: summarize(samples)
+                                       for name, samples in self._loaded_latencies.items()},
+            }
+
+    def shutdown(self, wait=True):
+        """
+            Stops accepting requests, the queued ones (and jobs) are still served
+        """
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._requests.put((_STOP, next(self._order), None))
+        if wait:
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
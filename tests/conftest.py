@@ -0,0 +1,72 @@
+import itertools
+import os
+import sys
+import pytest
+
+# The tests import the `functions` package from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions.simulator import R305Simulator  # noqa: E402
+
+_names = itertools.count()
+
+
+@pytest.fixture
+def simulator():
+    """
+        A factory of simulators reachable through r305sim:// URLs
+    """
+    simulators = []
+
+    def make(**kwargs):
+        sim = R305Simulator(**kwargs)
+        sim.url = sim.register('test-%d' % next(_names))
+        simulators.append(sim)
+        return sim
+
+    yield make
+
+    for sim in simulators:
+        sim.close()
+
+
+@pytest.fixture
+def sensor():
+    """
+        A factory of drivers with a verified password on a simulator, closed afterwards
+    """
+    from functions.R305 import PyFingerprint
+
+    sensors = []
+
+    def make(sim):
+        f = PyFingerprint(sim.url)
+        assert f.verifyPassword() is True
+        sensors.append(f)
+        return f
+
+    yield make
+
+    for f in sensors:
+        f.close()
+
+
+@pytest.fixture
+def open_service(tmp_path):
+    """
+        A factory of FingerPrint services on a simulator with their own identity database
+    """
+    from functions.services import FingerPrint
+
+    services = []
+
+    def make(sim, **kwargs):
+        fp = FingerPrint(sim.url, **kwargs)
+        fp.db_path = str(tmp_path / ('database-%d.csv' % len(services)))
+        services.append(fp)
+        return fp
+
+    yield make
+
+    for fp in services:
+        fp.close()
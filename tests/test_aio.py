@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+from functions.aio import AsyncPyFingerprint
+from functions.config import Finger
+from functions.simulator import makeCharacteristics
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_late_answer_is_not_taken_for_the_next_command(simulator):
+    sim = simulator(latency=0.3)
+    sim.enrollTemplate(0, makeCharacteristics(0))
+
+    async def main():
+        async with AsyncPyFingerprint(sim.openPty()) as f:
+            assert await f.verifyPassword() is True
+            with pytest.raises(asyncio.TimeoutError):
+                await f.getTemplateCount(timeout=0.1)
+
+            sim.latency = 0.0
+            assert await f.readImage() is False
+            assert await f.getTemplateCount() == 1
+
+    _run(main())
+
+
+def test_short_acknowledge_is_rejected(simulator):
+    sim = simulator()
+
+    async def main():
+        async with AsyncPyFingerprint(sim.openPty()) as f:
+            assert await f.verifyPassword() is True
+            # An acknowledge without the count, as a readImage answer would be
+            sim.injectStatus(Finger.TEMPLATECOUNT, Finger.OK)
+            with pytest.raises(Exception, match='too short'):
+                await f.getTemplateCount()
+            assert await f.getTemplateCount() == 0
+
+    _run(main())
+
+
+def test_cancelled_while_waiting_for_the_sensor(simulator):
+    sim = simulator(latency=0.2)
+
+    async def command():
+        return 'never sent'
+
+    async def main():
+        async with AsyncPyFingerprint(sim.openPty()) as f:
+            assert await f.verifyPassword() is True
+            running = asyncio.ensure_future(f.getTemplateCount())
+            await asyncio.sleep(0.05)
+            coroutine = command()
+            waiting = asyncio.ensure_future(f._run(coroutine, None))
+            await asyncio.sleep(0.05)
+            waiting.cancel()
+
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+            # Closed, so it does not warn that it was never awaited
+            assert coroutine.cr_frame is None
+            assert await running == 0
+
+    _run(main())
+
+
+def test_upload_without_verify(simulator):
+    sim = simulator()
+    characteristics = makeCharacteristics(3)
+
+    async def main():
+        async with AsyncPyFingerprint(sim.openPty()) as f:
+            assert await f.verifyPassword() is True
+            sim.resetStats()
+            assert await f.uploadCharacteristics(characteristicsData=characteristics,
+                                                 verify=False) is True
+            assert Finger.DOWNLOADCHARACTERISTICS not in sim.stats['opcodes']
+            assert await f.downloadCharacteristics() == characteristics
+
+    _run(main())
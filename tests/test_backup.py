@@ -0,0 +1,64 @@
+import pytest
+from functions.backup import TemplateWriter, read_templates, scan
+from functions.config import Finger
+from functions.simulator import makeCharacteristics
+
+
+def test_export_restore_round_trip(simulator, open_service, tmp_path):
+    source = simulator()
+    for position in (0, 3, 17, 99):
+        source.enrollTemplate(position, makeCharacteristics(position))
+    path = str(tmp_path / 'backup.bin')
+
+    fp = open_service(source)
+    assert [position for position, _ in fp.export_templates(path)] == [0, 3, 17, 99]
+
+    replacement = simulator()
+    replacement.enrollTemplate(5, makeCharacteristics(5))
+    fp = open_service(replacement)
+    assert fp.restore_templates(path, verify='full', clear=True) == 4
+
+    assert replacement.templates == source.templates
+
+
+def test_resumed_backup_drops_cut_record(tmp_path):
+    path = str(tmp_path / 'backup.bin')
+    with TemplateWriter(path) as writer:
+        writer.write(1, makeCharacteristics(1))
+        writer.write(2, makeCharacteristics(2))
+    with open(path, 'r+b') as f:
+        f.truncate(f.seek(0, 2) - 10)
+
+    assert scan(path)[0] == 1
+    with TemplateWriter(path, resume=True) as writer:
+        writer.write(2, makeCharacteristics(2))
+
+    assert [position for position, _ in read_templates(path)] == [1, 2]
+
+
+@pytest.mark.parametrize('verify, sampleEvery', [('sampled', 0), ('sampled', -1), ('quick', 10)])
+def test_invalid_restore_arguments_fail_before_writing(simulator, sensor, verify, sampleEvery):
+    sim = simulator()
+    sim.enrollTemplate(0, makeCharacteristics(0))
+    f = sensor(sim)
+    sim.resetStats()
+    records = [(position, makeCharacteristics(position)) for position in range(20)]
+
+    with pytest.raises(ValueError):
+        f.iterRestoreTemplates(records, verify=verify, sampleEvery=sampleEvery, clear=True)
+    with pytest.raises(ValueError):
+        f.restoreTemplates(records, verify=verify, sampleEvery=sampleEvery, clear=True)
+
+    assert sim.stats['commands'] == 0
+    assert list(sim.templates) == [0]
+
+
+def test_sampled_restore_verifies_every_nth_template(simulator, sensor):
+    sim = simulator()
+    f = sensor(sim)
+    sim.resetStats()
+    records = [(position, makeCharacteristics(position)) for position in range(7)]
+
+    assert f.restoreTemplates(records, verify='sampled', sampleEvery=3) == 7
+    # Templates 0, 3 and 6 are read back
+    assert sim.stats['opcodes'][Finger.DOWNLOADCHARACTERISTICS] == 3
@@ -0,0 +1,62 @@
+import hashlib
+from functions.cache import CharacteristicsCache
+from functions.simulator import makeCharacteristics
+
+
+def test_put_get_discard(tmp_path):
+    path = str(tmp_path / 'characteristics.cache')
+    characteristics = makeCharacteristics(1)
+
+    with CharacteristicsCache(path, 10) as cache:
+        assert cache.get(3) is None
+        digest = cache.put(3, characteristics)
+        assert digest == hashlib.sha256(characteristics).digest()
+        assert cache.get(3) == (characteristics, digest)
+        assert list(cache.positions()) == [3]
+
+        cache.discard(3)
+        assert 3 not in cache
+
+
+def test_reopened_for_another_sensor_is_reset(tmp_path):
+    path = str(tmp_path / 'characteristics.cache')
+
+    with CharacteristicsCache(path, 10, address=1) as cache:
+        cache.put(0, makeCharacteristics(0))
+
+    with CharacteristicsCache(path, 10, address=1) as cache:
+        assert 0 in cache
+
+    with CharacteristicsCache(path, 10, address=2) as cache:
+        assert list(cache.positions()) == []
+
+
+def test_service_cache_is_opt_in(simulator, open_service):
+    fp = open_service(simulator())
+    assert fp.f.getCharacteristicsCache() is None
+
+
+def test_attach_drops_positions_freed_meanwhile(simulator, sensor, tmp_path):
+    sim = simulator()
+    for position in range(3):
+        sim.enrollTemplate(position, makeCharacteristics(position))
+    path = str(tmp_path / 'characteristics.cache')
+
+    f = sensor(sim)
+    f.setCharacteristicsCache(CharacteristicsCache(path, f.getStorageCapacity()))
+    assert f.fillCharacteristicsCache() == 3
+    f.getCharacteristicsCache().close()
+    f.close()
+
+    # Another host deletes a template while this one is not running
+    del sim.templates[1]
+
+    f = sensor(sim)
+    cache = CharacteristicsCache(path, f.getStorageCapacity())
+    f.setCharacteristicsCache(cache)
+    assert list(cache.positions()) == [0, 2]
+
+    sim.resetStats()
+    assert f.lookupCharacteristics(2)[0] == makeCharacteristics(2)
+    assert sim.stats['commands'] == 0
+    cache.close()
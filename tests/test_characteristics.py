@@ -0,0 +1,19 @@
+from functions.config import Finger
+from functions.simulator import makeCharacteristics
+
+
+def test_bytes_round_trip_and_list_shim(simulator, sensor):
+    f = sensor(simulator())
+    characteristics = makeCharacteristics(7)
+
+    assert f.uploadCharacteristics(Finger.CHARBUFFER2, characteristics) is True
+    downloaded = f.downloadCharacteristics(Finger.CHARBUFFER2)
+    assert isinstance(downloaded, bytes)
+    assert downloaded == characteristics
+
+    # The former list form, for callers that still expect it
+    assert f.downloadCharacteristicsList(Finger.CHARBUFFER2) == list(characteristics)
+
+    # Lists are still accepted for the upload
+    assert f.uploadCharacteristics(Finger.CHARBUFFER1, list(characteristics)) is True
+    assert f.downloadCharacteristics(Finger.CHARBUFFER1) == characteristics
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import pytest
+from functions.events import EventBus
+
+
+def test_subscribers_get_events_published_after_subscribing():
+    bus = EventBus()
+    bus.publish('enroll', '100', 'Please give template simple')
+    with bus.subscribe() as events:
+        bus.publish('enroll', '200', 'Finger enrolled successfully', position=4)
+        event = events.get(0)
+
+    assert (event.kind, event.code, event.data) == ('enroll', '200', {'position': 4})
+    assert bus.last is event
+
+
+def test_full_queue_drops_the_oldest_event():
+    bus = EventBus()
+    events = bus.subscribe(maxsize=2)
+    for code in ('100', '101', '102'):
+        bus.publish('enroll', code, '')
+
+    assert [events.get(0).code, events.get(0).code] == ['101', '102']
+    assert events.dropped == 1
+    events.close()
+    assert events.get() is None
+
+
+def test_blocking_subscription_makes_the_publisher_wait():
+    bus = EventBus(publish_timeout=5)
+    events = bus.subscribe(maxsize=1, block=True)
+    bus.publish('recognize', '200', '')
+    publisher = threading.Thread(target=bus.publish, args=('recognize', '204', ''))
+    publisher.start()
+    publisher.join(0.1)
+    assert publisher.is_alive()
+
+    assert events.get(1).code == '200'
+    publisher.join(1)
+    assert events.get(1).code == '204'
+    assert events.dropped == 0
+
+
+def test_async_iteration_ends_on_close():
+    bus = EventBus()
+    events = bus.subscribe()
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, bus.publish, 'remove', '200', 'Template deleted')
+        threading.Timer(0.1, events.close).start()
+        return [event.code async for event in events]
+
+    assert asyncio.run(main()) == ['200']
+
+
+def test_cancelled_async_consumer_leaves_no_thread():
+    bus = EventBus()
+    threads = threading.active_count()
+
+    async def consume(events):
+        async for _ in events:
+            pass
+
+    async def main():
+        subscriptions = [bus.subscribe() for _ in range(20)]
+        tasks = [asyncio.ensure_future(consume(events)) for events in subscriptions]
+        await asyncio.sleep(0.05)
+        assert threading.active_count() == threads
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        assert all(events._waiters == [] for events in subscriptions)
+
+    asyncio.run(main())
+    assert threading.active_count() == threads
@@ -0,0 +1,95 @@
+import pytest
+from functions.config import Finger
+from functions.R305 import PyFingerprint
+from functions.services import FingerPrint
+
+
+def test_enable_fast_link_and_restore(simulator):
+    sim = simulator()
+    f = PyFingerprint(sim.url)
+    assert f.enableFastLink() == (115200, 256)
+    assert sim.baudRate == 115200
+
+    f.close()
+    assert sim.baudRate == 57600
+
+
+def test_recover_after_unclean_shutdown(simulator):
+    sim = simulator()
+    f = PyFingerprint(sim.url)
+    f.enableFastLink()
+    # The process dies without close()
+    del f
+
+    f = PyFingerprint(sim.url)
+    assert f.recoverBaudRate() == 115200
+    assert sim.baudRate == 57600
+    assert f.verifyPassword() is True
+    f.close()
+
+
+def test_service_recovers_fast_link(simulator):
+    sim = simulator()
+    PyFingerprint(sim.url).enableFastLink(restoreOnClose=False)
+
+    fp = FingerPrint(sim.url, fast_link=True)
+    assert fp.f.getTemplateCount() == 0
+    fp.close()
+    assert sim.baudRate == 57600
+
+
+def test_service_without_fast_link_does_not_sweep(simulator):
+    sim = simulator()
+    PyFingerprint(sim.url).enableFastLink(restoreOnClose=False)
+    sim.resetStats()
+
+    with pytest.raises(SystemExit):
+        FingerPrint(sim.url)
+    assert sim.baudRate == 115200
+    assert sim.stats['commands'] == 0
+
+
+def test_service_recovers_only_on_timeout(simulator):
+    sim = simulator()
+    sim.injectStatus(Finger.VERIFYPASSWORD, Finger.ERROR_COMMUNICATION)
+
+    with pytest.raises(SystemExit):
+        FingerPrint(sim.url, fast_link=True)
+    assert sim.stats['opcodes'][Finger.VERIFYPASSWORD] == 1
+
+
+def test_recover_tries_the_port_speed_first(simulator):
+    sim = simulator()
+    f = PyFingerprint(sim.url)
+    sim.resetStats()
+
+    assert f.recoverBaudRate() == 57600
+    assert sim.stats['opcodes'][Finger.VERIFYPASSWORD] == 1
+    assert Finger.SETSYSTEMPARAMETER not in sim.stats['opcodes']
+    f.close()
+
+
+def test_fallback_sets_previous_baud_rate(simulator):
+    sim = simulator()
+    f = PyFingerprint(sim.url)
+    # The sensor switches, but the first probe at the new speed fails
+    sim.injectStatus(Finger.VERIFYPASSWORD, Finger.ERROR_COMMUNICATION)
+    f.verifyPassword = _skip_first(f.verifyPassword)
+
+    assert f.enableFastLink()[0] == 57600
+    assert sim.baudRate == 57600
+    assert f.verifyPassword() is True
+    f.close()
+
+
+def _skip_first(verify):
+    # enableFastLink() probes before switching, keep the injected error for after the switch
+    calls = []
+
+    def wrapper():
+        calls.append(1)
+        if len(calls) == 1:
+            return True
+        return verify()
+
+    return wrapper
@@ -0,0 +1,49 @@
+import pytest
+from functions.config import Finger
+from functions.R305 import encodePacket, packetHeader
+from functions.simulator import makeCharacteristics
+
+
+def test_encoded_packet_layout():
+    packet = encodePacket(packetHeader(0xFFFFFFFF), Finger.COMMANDPACKET, (Finger.TEMPLATECOUNT,))
+    # Start code, address, type, length (payload and checksum), payload, checksum
+    assert packet == bytes([0xEF, 0x01, 0xFF, 0xFF, 0xFF, 0xFF, 0x01, 0x00, 0x03,
+                            Finger.TEMPLATECOUNT, 0x00, 0x04 + Finger.TEMPLATECOUNT])
+
+
+def test_packets_arriving_in_pieces(simulator, sensor):
+    # Every packet becomes readable after its own wire time
+    sim = simulator(simulateBaudRate=True)
+    sim.enrollTemplate(2, makeCharacteristics(2))
+    f = sensor(sim)
+
+    f.loadTemplate(2, Finger.CHARBUFFER1)
+    assert f.downloadCharacteristics(Finger.CHARBUFFER1) == makeCharacteristics(2)
+    assert f.getTemplateCount() == 1
+
+
+def test_corrupted_packet_does_not_shift_the_next_answer(simulator, sensor):
+    sim = simulator(seed=1)
+    sim.enrollTemplate(0, makeCharacteristics(0))
+    f = sensor(sim)
+
+    sim.errorRate = 1.0
+    with pytest.raises(Exception, match='checksum'):
+        f.getTemplateCount()
+
+    # The whole announced length was read, the next answer starts clean
+    sim.errorRate = 0.0
+    assert f.getTemplateCount() == 1
+    assert f.readImage() is False
+
+
+def test_empty_acknowledge_is_rejected(simulator, sensor):
+    sim = simulator()
+    f = sensor(sim)
+
+    sim.receive = lambda data: [(0, encodePacket(packetHeader(0xFFFFFFFF), Finger.ACKPACKET, b''))]
+    with pytest.raises(Exception, match='no confirmation code'):
+        f.getTemplateCount()
+
+    del sim.receive
+    assert f.getTemplateCount() == 0
@@ -0,0 +1,81 @@
+import threading
+import pytest
+from functions.identity import IdentityStore, SQLiteIdentityStore, read_rows
+
+
+def test_changes_survive_reopening(tmp_path):
+    path = str(tmp_path / 'database.csv')
+    with IdentityStore(path) as store:
+        store.add(3, 'thanh')
+        store.add(4, 'linh')
+        assert store.remove('linh') == 4
+        with pytest.raises(ValueError):
+            store.add(5, 'thanh')
+
+    with IdentityStore(path) as store:
+        assert store.position('thanh') == 3
+        assert store.name(3) == 'thanh'
+        assert 'linh' not in store
+        assert len(store) == 1
+
+
+def test_log_is_compacted(tmp_path):
+    path = str(tmp_path / 'database.csv')
+    with IdentityStore(path, compact_garbage=10) as store:
+        for i in range(20):
+            store.add(i, 'user-%d' % i)
+            store.remove('user-%d' % i)
+        store.add(1, 'thanh')
+        assert store.compactions > 0
+
+    # 41 rows without compaction
+    assert len(list(read_rows(path))) < 20
+    with IdentityStore(path) as store:
+        assert len(store) == 1
+
+
+def test_import_with_duplicate_headers_and_removals(tmp_path):
+    legacy = tmp_path / 'legacy.csv'
+    legacy.write_text('Index,Name\n0,thanh\nIndex,Name\n1,linh\n0,\n2,minh')
+
+    with IdentityStore(str(tmp_path / 'database.csv')) as store:
+        assert store.import_csv(str(legacy)) == 2
+        assert store.name(0) is None
+        assert store.position('minh') == 2
+
+
+def test_sqlite_store_has_the_same_interface(tmp_path):
+    path = str(tmp_path / 'identities.db')
+    with SQLiteIdentityStore(path) as store:
+        store.add(3, 'thanh')
+        store.add(4, 'linh', device=1)
+        with pytest.raises(ValueError):
+            store.add(5, 'thanh')
+
+        assert store.locate('linh') == (1, 4)
+        assert store.name(4) is None and store.name(4, device=1) == 'linh'
+        assert store.remove_position(3) == 'thanh'
+
+    with SQLiteIdentityStore(path) as store:
+        assert 'thanh' not in store
+        assert store.position('linh') == 4
+        assert len(store) == 1
+
+
+def test_sqlite_batch_rolls_back_on_error(tmp_path):
+    with SQLiteIdentityStore(str(tmp_path / 'identities.db')) as store:
+        with pytest.raises(RuntimeError):
+            with store.batch():
+                store.add(0, 'thanh')
+                raise RuntimeError('enrollment failed')
+        assert len(store) == 0
+
+
+def test_sqlite_readers_on_other_threads(tmp_path):
+    with SQLiteIdentityStore(str(tmp_path / 'identities.db')) as store:
+        store.add(7, 'thanh')
+        names = []
+        reader = threading.Thread(target=lambda: names.append(store.name(7)))
+        reader.start()
+        reader.join()
+        assert names == ['thanh']
@@ -0,0 +1,74 @@
+from functions.config import Finger
+from functions.metrics import LatencyHistogram
+from functions.simulator import makeCharacteristics
+
+
+def test_metrics_patch_one_instance_until_disabled(simulator, sensor):
+    sim = simulator()
+    f, other = sensor(sim), sensor(sim)
+
+    metrics = f.enableMetrics()
+    assert 'getTemplateCount' in vars(f)
+    assert '_PyFingerprint__readPacket' in vars(f)
+    assert 'getTemplateCount' not in vars(other)
+    assert f.getTemplateCount.__name__ == 'getTemplateCount'
+
+    assert f.getTemplateCount() == 0
+    other.getTemplateCount()
+    assert metrics.commands['getTemplateCount'].count == 1
+    assert metrics.opcode(Finger.TEMPLATECOUNT).packetsSent == 1
+
+    f.disableMetrics()
+    assert f.getMetrics() is None
+    for name in ('getTemplateCount', '_PyFingerprint__readPacket', '_PyFingerprint__writePacket'):
+        assert name not in vars(f)
+    assert 'write' not in vars(f._PyFingerprint__serial)
+    f.getTemplateCount()
+    assert metrics.commands['getTemplateCount'].count == 1
+
+
+def test_combined_writes_are_answered_in_order(simulator, sensor):
+    sim = simulator()
+    for position in (0, 1):
+        sim.enrollTemplate(position, makeCharacteristics(position))
+    f = sensor(sim)
+    metrics = f.enableMetrics()
+
+    # Load and download of a position go out in one write
+    assert len(list(f.exportTemplates())) == 2
+
+    load = metrics.opcode(Finger.LOADTEMPLATE)
+    download = metrics.opcode(Finger.DOWNLOADCHARACTERISTICS)
+    assert (load.packetsSent, load.packetsReceived, load.roundtrip.count) == (2, 2, 2)
+    dataPackets = len(makeCharacteristics(0)) // f.getMaxPacketSize()
+    assert (download.packetsSent, download.roundtrip.count) == (2, 2)
+    assert download.packetsReceived == 2 * (1 + dataPackets)
+    assert load.statuses == download.statuses == {Finger.OK: 2}
+
+
+def test_prometheus_text(simulator, sensor):
+    f = sensor(simulator())
+    metrics = f.enableMetrics()
+    f.getTemplateCount()
+
+    lines = metrics.prometheus(labels={'sensor': 'door'}).splitlines()
+    assert '# TYPE r305_command_seconds histogram' in lines
+    assert 'r305_command_seconds_bucket{command="getTemplateCount",sensor="door",le="+Inf"} 1' in lines
+    assert 'r305_command_seconds_count{command="getTemplateCount",sensor="door"} 1' in lines
+    assert 'r305_command_errors_total{command="getTemplateCount",sensor="door"} 0' in lines
+    assert 'r305_packets_sent_total{opcode="templateCount",sensor="door"} 1' in lines
+    assert 'r305_ack_status_total{opcode="templateCount",status="0x00",sensor="door"} 1' in lines
+
+
+def test_quantile_is_the_bucket_upper_bound():
+    histogram = LatencyHistogram((0.01, 0.1))
+    assert histogram.quantile(0.5) is None
+
+    for seconds in (0.002, 0.004, 0.006, 0.05):
+        histogram.observe(seconds)
+    assert histogram.quantile(0.5) == 0.01
+    assert histogram.quantile(1.0) == 0.1
+
+    histogram.observe(1.0)
+    assert histogram.quantile(1.0) == float('inf')
+    assert histogram.toDict()['buckets'] == {0.01: 3, 0.1: 1, float('inf'): 1}
@@ -0,0 +1,50 @@
+import pytest
+from functions.occupancy import TemplateOccupancy
+from functions.simulator import makeCharacteristics
+
+
+def test_bitmap_operations():
+    occupancy = TemplateOccupancy(10)
+    assert occupancy.firstFree() == 0
+
+    occupancy.setOccupied(0, 3)
+    occupancy.setOccupied(5)
+    assert occupancy.firstFree() == 3
+    assert list(occupancy.ranges()) == [(0, 3), (5, 1)]
+    assert list(occupancy.positions()) == [0, 1, 2, 5]
+    assert len(occupancy) == 4 and 5 in occupancy and 4 not in occupancy
+
+    occupancy.setFree(1)
+    assert occupancy.firstFree() == 1
+
+    occupancy.setOccupied(0, 10)
+    assert occupancy.firstFree() == -1
+
+    with pytest.raises(ValueError):
+        occupancy.setOccupied(9, 2)
+    for position in (-1, 10):
+        with pytest.raises(ValueError):
+            occupancy.isOccupied(position)
+        assert position not in occupancy
+
+
+def test_index_pages_use_the_sensor_bit_order():
+    # Page 0 byte 0 bit 1 is position 1, page 1 starts at position 256
+    occupancy = TemplateOccupancy.fromIndexPages(300, [bytes([0x02]) + bytes(31), bytes([0x01]) + bytes(31)])
+    assert list(occupancy.positions()) == [1, 256]
+
+
+def test_driver_keeps_the_bitmap_in_sync(simulator, sensor):
+    sim = simulator(storageCapacity=300)
+    for position in (0, 1, 260):
+        sim.enrollTemplate(position, makeCharacteristics(position))
+    f = sensor(sim)
+
+    occupancy = f.getTemplateOccupancy()
+    assert list(occupancy.positions()) == [0, 1, 260]
+
+    f.uploadCharacteristics(characteristicsData=makeCharacteristics(9), verify=False)
+    assert f.storeTemplate() == 2
+    f.deleteTemplate(0)
+    assert list(f.getTemplateOccupancy().positions()) == [1, 2, 260]
+    assert list(f.getTemplateOccupancy(refresh=True).positions()) == sorted(sim.templates)
@@ -0,0 +1,30 @@
+from functions.config import Finger
+
+
+def test_cached_parameters_follow_the_setters(simulator, sensor):
+    sim = simulator()
+    f = sensor(sim)
+    assert (f.getStorageCapacity(), f.getSecurityLevel(), f.getMaxPacketSize()) == (1000, 3, 128)
+
+    sim.resetStats()
+    f.setSecurityLevel(5)
+    assert f.enableFastLink() == (115200, 256)
+    assert (f.getSecurityLevel(), f.getMaxPacketSize(), f.getBaudRate()) == (5, 256, 115200)
+    assert Finger.GETSYSTEMPARAMETERS not in sim.stats['opcodes']
+    f.close()
+
+
+def test_refresh_reads_the_parameters_again(simulator, sensor):
+    sim = simulator()
+    f = sensor(sim)
+    f.getSecurityLevel()
+
+    # Changed by another host, the cache does not know
+    sim.securityLevel = 1
+    sim.resetStats()
+    assert f.getSecurityLevel() == 3
+    assert sim.stats['commands'] == 0
+
+    assert f.refresh()[3] == 1
+    assert f.getSecurityLevel() == 1
+    assert sim.stats['opcodes'] == {Finger.GETSYSTEMPARAMETERS: 1}
@@ -0,0 +1,46 @@
+import pytest
+from functions.config import Finger
+from functions.pool import SensorPool
+from functions.simulator import makeCharacteristics
+
+
+def test_search_spans_devices(simulator):
+    first, second = simulator(), simulator()
+    first.enrollTemplate(0, makeCharacteristics(1))
+    second.enrollTemplate(5, makeCharacteristics(2))
+
+    with SensorPool([first.url, second.url]) as pool:
+        assert len(pool.healthy_devices()) == 2
+        assert pool.template_count() == 2
+        device, position, score = pool.search(makeCharacteristics(2))
+        assert (device, position) == (1, 5)
+        assert score > 0
+
+
+def test_device_failing_every_other_command_gets_unhealthy(simulator):
+    sim = simulator()
+    with SensorPool([sim.url], max_failures=3) as pool:
+        device = pool.device(0)
+        for _ in range(3):
+            sim.injectStatus(Finger.TEMPLATECOUNT, Finger.ERROR_COMMUNICATION)
+            with pytest.raises(Exception):
+                device.submit('count', lambda sensor: sensor.getTemplateCount()).result()
+            device.submit('count', lambda sensor: sensor.getTemplateCount()).result()
+
+        assert device.failures == 0
+        assert device.healthy is False
+        assert pool.healthy_devices() == []
+
+        # A later success does not count, only probe() makes it healthy again
+        device.submit('count', lambda sensor: sensor.getTemplateCount()).result()
+        assert device.healthy is False
+        assert pool.probe() == 1
+        assert device.stats()['recent_failures'] == 0
+
+
+def test_capture_on_device_that_never_opened(simulator):
+    sim = simulator()
+    with SensorPool([sim.url, 'r305sim://not-registered']) as pool:
+        assert pool.healthy_devices() == [pool.device(0)]
+        with pytest.raises(RuntimeError, match='not open'):
+            pool.capture(1, deadline=0.1)
@@ -0,0 +1,81 @@
+import pytest
+from functions.simulator import makeCharacteristics
+
+
+def _searches(f):
+    # Records the (position start, count) of every searchTemplate() call
+    calls = []
+    search = f.searchTemplate
+
+    def wrapper(charBufferNumber, positionStart=0, count=-1):
+        calls.append((positionStart, count))
+        return search(charBufferNumber, positionStart, count)
+
+    f.searchTemplate = wrapper
+    return calls
+
+
+def _touch(sim, f, position):
+    sim.placeFinger(makeCharacteristics(position))
+    assert f.readImage() is True
+    f.convertImage()
+
+
+def test_search_windows(simulator, sensor):
+    sim = simulator()
+    for position in (0, 1, 2, 20, 500):
+        sim.enrollTemplate(position, makeCharacteristics(position))
+    f = sensor(sim)
+
+    assert f.searchWindows() == [(0, 3), (20, 1), (500, 1)]
+    assert f.searchWindows(maxGap=20) == [(0, 21), (500, 1)]
+    assert f.searchWindows(windowSize=2) == [(0, 2), (2, 1), (20, 1), (500, 1)]
+
+    _touch(sim, f, 500)
+    assert f.searchOccupied()[0] == 500
+    # The recent match comes first
+    assert f.searchWindows() == [(500, 1), (0, 3), (20, 1)]
+
+    with pytest.raises(ValueError):
+        f.searchWindows(windowSize=0)
+
+
+def test_few_small_windows_are_searched_one_by_one(simulator, sensor):
+    sim = simulator()
+    for position in (0, 100):
+        sim.enrollTemplate(position, makeCharacteristics(position))
+    f = sensor(sim)
+    calls = _searches(f)
+
+    _touch(sim, f, 100)
+    assert f.searchOccupied()[0] == 100
+    assert calls == [(0, 1), (100, 1)]
+
+
+def test_many_windows_fall_back_to_one_full_search(simulator, sensor):
+    sim = simulator()
+    for position in (0, 100, 200):
+        sim.enrollTemplate(position, makeCharacteristics(position))
+    f = sensor(sim)
+    calls = _searches(f)
+
+    _touch(sim, f, 200)
+    assert f.searchOccupied()[0] == 200
+    assert calls == [(0, 1000)]
+
+    del calls[:]
+    assert f.searchOccupied(maxWindows=3)[0] == 200
+    # The recent match comes first and ends the search
+    assert calls == [(200, 1)]
+
+
+def test_windows_over_most_positions_fall_back_to_one_full_search(simulator, sensor):
+    sim = simulator(storageCapacity=10)
+    for position in range(6):
+        sim.enrollTemplate(position, makeCharacteristics(position))
+    f = sensor(sim)
+    calls = _searches(f)
+
+    _touch(sim, f, 3)
+    assert f.searchOccupied()[0] == 3
+    assert calls == [(0, 10)]
@@ -0,0 +1,120 @@
+import os
+import socket
+import threading
+import time
+import pytest
+from functions.server import FingerprintServer, ServiceClient
+from functions.simulator import makeCharacteristics
+
+
+@pytest.fixture
+def service(simulator, open_service):
+    sim = simulator(latency=0.05)
+    for position in range(3):
+        sim.enrollTemplate(position, makeCharacteristics(position))
+    return open_service(sim)
+
+
+def test_identical_requests_are_coalesced(service, tmp_path):
+    path = str(tmp_path / 'r305.sock')
+    counts = []
+
+    def client():
+        with ServiceClient(path) as connection:
+            counts.append(connection.template_count())
+
+    with FingerprintServer(service, unix_path=path).start() as server:
+        threads = [threading.Thread(target=client) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = server.stats()
+
+    assert counts == [3] * 8
+    assert stats['coalesced'] > 0
+    assert stats['worker']['completed'] + stats['coalesced'] == 8
+    assert not os.path.exists(path)
+
+
+def test_stale_socket_is_replaced(service, tmp_path):
+    path = str(tmp_path / 'r305.sock')
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+
+    with FingerprintServer(service, unix_path=path).start():
+        with ServiceClient(path) as client:
+            assert client.template_count() == 3
+
+
+def test_live_socket_and_other_files_are_kept(service, tmp_path):
+    path = str(tmp_path / 'r305.sock')
+    with FingerprintServer(service, unix_path=path).start():
+        with pytest.raises(OSError, match='already listening'):
+            FingerprintServer(service, unix_path=path)
+
+    other = tmp_path / 'notes.txt'
+    other.write_text('keep me')
+    with pytest.raises(OSError, match='Not a socket'):
+        FingerprintServer(service, unix_path=str(other))
+    assert other.read_text() == 'keep me'
+
+
+def test_idle_event_stream_notices_disconnect(service, tmp_path):
+    path = str(tmp_path / 'r305.sock')
+    with FingerprintServer(service, unix_path=path).start() as server:
+        server.keepalive = 0.05
+        client = ServiceClient(path)
+        events = client.events()
+        # The subscription only exists once the stream started
+        threading.Timer(0.2, service._status,
+                        ('recognize', '204', 'No match found')).start()
+        assert next(events)['code'] == '204'
+        assert len(server._streams) == 1
+
+        events.close()
+        client.close()
+        deadline = time.monotonic() + 2
+        while server._streams and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert len(server._streams) == 0
+
+
+def test_pending_recognize_does_not_block_count(simulator, open_service, tmp_path):
+    sim = simulator(latency=0.01)
+    for position in range(3):
+        sim.enrollTemplate(position, makeCharacteristics(position))
+    path = str(tmp_path / 'r305.sock')
+    results = []
+
+    def recognize():
+        with ServiceClient(path) as client:
+            results.append(client.recognize())
+
+    with FingerprintServer(open_service(sim), unix_path=path).start() as server:
+        thread = threading.Thread(target=recognize)
+        thread.start()
+        deadline = time.monotonic() + 2
+        while not server._inflight and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # No finger yet, the recognition is still waiting
+        started = time.monotonic()
+        with ServiceClient(path) as client:
+            assert client.template_count() == 3
+        assert time.monotonic() - started < 1
+        assert thread.is_alive()
+
+        sim.placeFinger(makeCharacteristics(2))
+        thread.join(5)
+
+    assert results[0]['code'] == '200'
+
+
+def test_metrics_endpoint_needs_enabled_metrics(service, tmp_path):
+    path = str(tmp_path / 'r305.sock')
+    with FingerprintServer(service, unix_path=path).start():
+        with ServiceClient(path) as client:
+            with pytest.raises(Exception, match='404 The driver metrics are disabled'):
+                client.request('GET', '/metrics')
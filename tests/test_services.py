@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+import pytest
+from functions.config import Finger
+from functions.events import EVENT_ENROLL
+from functions.simulator import makeCharacteristics
+
+
+@pytest.fixture
+def service(simulator, open_service):
+    sim = simulator()
+    fp = open_service(sim)
+    fp.enroll_delay = 0
+    fp.poller.deadline = 1.0
+    return sim, fp
+
+
+def test_enroll_stores_template_and_name(service):
+    sim, fp = service
+    sim.placeFinger(makeCharacteristics(7))
+
+    assert fp.enroll('thanh')['code'] == '200'
+    assert fp.identities.name(0) == 'thanh'
+    assert 0 in sim.templates
+
+
+def test_enroll_refuses_registered_name_before_capture(service):
+    sim, fp = service
+    fp.identities.add(3, 'thanh')
+    sim.placeFinger(makeCharacteristics(7))
+    sim.resetStats()
+
+    result = fp.enroll('thanh')
+    assert result['code'] == '204'
+    assert fp.events.last.kind == EVENT_ENROLL
+    assert fp.events.last.code == '204'
+    assert Finger.READIMAGE not in sim.stats['opcodes']
+    assert sim.templates == {}
+
+
+def test_enroll_deletes_template_without_identity(service, monkeypatch):
+    sim, fp = service
+    sim.placeFinger(makeCharacteristics(7))
+    # Another client registered the name meanwhile
+    monkeypatch.setattr(fp, '_enter_info', lambda index, name=None: False)
+
+    assert fp.enroll('thanh')['code'] == '204'
+    assert sim.templates == {}
+    assert fp.f.getTemplateCount() == 0
+
+
+def test_stream_goes_on_after_sensor_errors(service):
+    sim, fp = service
+    sim.enrollTemplate(4, makeCharacteristics(4))
+    fp.identities.add(4, 'thanh')
+    sim.injectStatus(Finger.READIMAGE, Finger.ERROR_COMMUNICATION)
+    sim.placeFinger(makeCharacteristics(4))
+    events = fp.events.subscribe()
+
+    stream = fp.recognize_stream()
+    touch = next(stream)
+    assert touch.matched and touch.name == 'thanh'
+
+    sim.liftFinger()
+    sim.injectStatus(Finger.SEARCHTEMPLATE, Finger.ERROR_COMMUNICATION)
+    # After the lift was seen
+    threading.Timer(0.5, sim.placeFinger, (makeCharacteristics(4),)).start()
+    touch = next(stream)
+    assert touch.matched and touch.position == 4
+    stream.close()
+
+    errors = [event for event in iter(lambda: events.get(0), None)
+              if event.data.get('error')]
+    assert len(errors) == 2
+    assert all(event.code == '204' for event in errors)
+    events.close()
+
+
+def test_async_stream_stops_on_cancellation(service):
+    sim, fp = service
+
+    async def consume():
+        async for touch in fp.arecognize_stream():
+            pass
+
+    async def main():
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert fp._streaming is False
+
+    # The running step ends within the 1 s poll of recognize_stream()
+    time.sleep(1.2)
+    polls = sim.stats['commands']
+    time.sleep(0.5)
+    assert sim.stats['commands'] == polls
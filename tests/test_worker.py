@@ -0,0 +1,134 @@
+import threading
+import pytest
+from types import SimpleNamespace
+from functions.simulator import makeCharacteristics
+from functions.worker import SensorWorker, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+
+
+@pytest.fixture
+def service(simulator, sensor):
+    """
+        The driver alone, wrapped like a FingerPrint service
+    """
+    sim = simulator()
+    return sim, SimpleNamespace(f=sensor(sim))
+
+
+def _blocked(worker):
+    """
+        Occupies the worker until the returned event is set
+    """
+    release = threading.Event()
+    started = threading.Event()
+    worker.submit('block', lambda service: (started.set(), release.wait()))
+    started.wait()
+    return release
+
+
+def test_priorities_and_order(service):
+    worker = SensorWorker(service[1])
+    release = _blocked(worker)
+    served = []
+    futures = [
+        worker.submit('background', lambda service: served.append('background'),
+                      priority=PRIORITY_BACKGROUND),
+        worker.submit('first', lambda service: served.append('first')),
+        worker.submit('second', lambda service: served.append('second')),
+        worker.submit('interactive', lambda service: served.append('interactive'),
+                      priority=PRIORITY_INTERACTIVE),
+    ]
+    release.set()
+    for future in futures:
+        future.result(5)
+    worker.shutdown()
+
+    assert served == ['interactive', 'first', 'second', 'background']
+
+
+def test_request_runs_between_job_steps(service):
+    worker = SensorWorker(service[1])
+    served = []
+    queued = threading.Event()
+
+    def job(service):
+        for step in range(3):
+            served.append(step)
+            # The first step lasts until the recognition is queued
+            queued.wait(5)
+            yield
+        return 'done'
+
+    future = worker.submit_job('job', job)
+    recognized = worker.submit('recognize', lambda service: served.append('recognize'),
+                               priority=PRIORITY_INTERACTIVE)
+    queued.set()
+    recognized.result(5)
+    assert future.result(5) == 'done'
+    worker.shutdown()
+
+    assert served.index('recognize') < served.index(2)
+
+
+def test_enroll_waits_for_restore(service):
+    sim, service = service
+    worker = SensorWorker(service)
+    records = [(position, makeCharacteristics(position)) for position in range(5)]
+
+    def enroll(service):
+        # Stores at the first free position, like FingerPrint.enroll()
+        service.f.uploadCharacteristics(characteristicsData=list(makeCharacteristics(99)))
+        return service.f.storeTemplate()
+
+    release = _blocked(worker)
+    restored = worker.restore_templates(records)
+    enrolled = worker.submit('enroll', enroll)
+    release.set()
+
+    assert restored.result(10) == 5
+    assert enrolled.result(10) == 5
+    worker.shutdown()
+
+    for position in range(5):
+        assert bytes(sim.templates[position]) == makeCharacteristics(position)
+    assert bytes(sim.templates[5]) == makeCharacteristics(99)
+
+
+def test_deferred_requests_run_after_failed_restore(service):
+    worker = SensorWorker(service[1])
+    release = _blocked(worker)
+    restored = worker.restore_templates([(-1, makeCharacteristics(0))])
+    removed = worker.submit('remove_template_byname', lambda service: 'removed')
+    release.set()
+
+    assert isinstance(restored.exception(5), ValueError)
+    assert removed.result(5) == 'removed'
+    worker.shutdown()
+
+
+def test_pending_recognize_does_not_block(simulator, open_service, tmp_path):
+    sim = simulator()
+    for position in range(3):
+        sim.enrollTemplate(position, makeCharacteristics(position))
+    worker = SensorWorker(open_service(sim), poll_interval=0.02)
+
+    # Nobody touches the sensor yet
+    recognized = worker.recognize()
+    assert worker.command('getTemplateCount').result(2) == 3
+    exported = worker.export_templates(str(tmp_path / 'backup.bin'))
+    assert exported.result(5)['templates'] == 3
+    assert not recognized.done()
+
+    sim.placeFinger(makeCharacteristics(1))
+    assert recognized.result(5)['code'] == '200'
+    worker.shutdown()
+
+
+def test_recognize_deadline_and_shutdown(service):
+    worker = SensorWorker(service[1], poll_interval=0.02)
+    with pytest.raises(Exception, match='No finger'):
+        worker.recognize(deadline=0.1).result(5)
+
+    pending = worker.recognize()
+    worker.shutdown()
+    with pytest.raises(RuntimeError, match='shut down'):
+        pending.result(0)